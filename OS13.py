@@ -1,108 +1,1472 @@
-import tkinter as tk
-from tkinter import font as tkfont
+import time
+# First thing, so --startup-profile can tell what the imports below cost
+IMPORT_STARTED = time.perf_counter()
 import random
-from datetime import datetime
 import os
-import platform
-import socket
+import sys
+import json
+import marshal
+import string
+import threading
+import math
+from array import array
+from collections import Counter, deque, namedtuple
+from functools import partial
+from itertools import islice
+import heapq
+import re
+import struct
 
-class OS13Terminal:
-    def __init__(self, root):
+# Each front end's toolkit is imported only when that front end starts
+tk = tkfont = None
+curses = None
+
+
+def import_tk():
+    """Import tkinter into this module's globals; ImportError if it is missing"""
+    global tk, tkfont
+    if tk is None:
+        import tkinter
+        from tkinter import font
+        tk, tkfont = tkinter, font
+    return tk
+
+
+def import_curses():
+    """Import curses into this module's globals; ImportError if it is missing"""
+    global curses
+    if curses is None:
+        import curses as module
+        curses = module
+    return curses
+
+
+class SuggestionTrie:
+    """Prefix trie over a first-character suggestion table.
+
+    Every node stores its ready-made result tuple, so a lookup is a walk of
+    len(prefix) dict hits and allocates nothing.
+    """
+    
+    def __init__(self, table, fallback=()):
+        self.fallback = tuple(fallback)
+        self.root = ({}, self.fallback)
+        
+        collected = {}
+        for first_char, bucket in table.items():
+            # The first character keeps the whole bucket, like the old lookup did
+            collected[first_char] = list(bucket)
+            for suggestion in bucket:
+                key = suggestion.lower()
+                if not key.startswith(first_char):
+                    continue
+                for depth in range(2, len(key) + 1):
+                    collected.setdefault(key[:depth], []).append(suggestion)
+        
+        # Shortest prefixes first so every parent already exists
+        nodes = {"": self.root}
+        for prefix in sorted(collected, key=len):
+            node = ({}, tuple(collected[prefix]))
+            nodes[prefix[:-1]][0][prefix[-1]] = node
+            nodes[prefix] = node
+    
+    def lookup(self, partial):
+        node = self.root
+        for char in partial.lower():
+            node = node[0].get(char)
+            if node is None:
+                return self.fallback
+        return node[1]
+
+
+class FuzzyIndex:
+    """Typo lookup over a vocabulary by precomputed deletion neighbourhoods.
+    
+    Each word is filed under every string left by deleting up to its
+    allowed distance of characters (1 for short words, 2 otherwise). A
+    query makes its own deletions and only words sharing one are compared,
+    by optimal string alignment distance, so a swapped pair of letters
+    counts as one edit. A lookup is a few dozen dict hits and a handful of
+    comparisons, however many thousands of words are indexed.
+    """
+    
+    MAX_LENGTH = 24
+    
+    def __init__(self, words=(), rank=0):
+        # word -> rank (lower wins ties); deletion -> word, or list of words
+        self.words = {}
+        self.deletes = {}
+        self.update(words, rank)
+    
+    def __len__(self):
+        return len(self.words)
+    
+    @staticmethod
+    def max_distance(word):
+        return 1 if len(word) <= 4 else 2
+    
+    @staticmethod
+    def variants(word, distance):
+        found = frontier = {word}
+        for _ in range(distance):
+            frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+            found = found | frontier
+        return found
+    
+    def add(self, word, rank=0):
+        if not word or len(word) > self.MAX_LENGTH:
+            return
+        if word in self.words:
+            self.words[word] = min(rank, self.words[word])
+            return
+        self.words[word] = rank
+        deletes = self.deletes
+        for variant in self.variants(word, self.max_distance(word)):
+            found = deletes.get(variant)
+            if found is None:
+                deletes[variant] = word
+            elif isinstance(found, str):
+                deletes[variant] = [found, word]
+            else:
+                found.append(word)
+    
+    def update(self, words, rank=0):
+        for word in words:
+            self.add(word, rank)
+    
+    def lookup(self, query, limit=3):
+        """Up to limit (word, distance) pairs, nearest first, then by rank"""
+        if not query or len(query) > self.MAX_LENGTH:
+            return []
+        distance = self.max_distance(query)
+        deletes = self.deletes
+        candidates = set()
+        for variant in self.variants(query, distance):
+            found = deletes.get(variant)
+            if found is None:
+                continue
+            if isinstance(found, str):
+                candidates.add(found)
+            else:
+                candidates.update(found)
+        scored = []
+        for word in candidates:
+            allowed = min(distance, self.max_distance(word))
+            if abs(len(word) - len(query)) > allowed:
+                continue
+            edits = self.distance(query, word, allowed)
+            if edits <= allowed:
+                scored.append((edits, self.words[word], word))
+        scored.sort()
+        return [(word, edits) for edits, _, word in scored[:limit]]
+    
+    @staticmethod
+    def distance(a, b, limit):
+        """Optimal string alignment distance, or limit + 1 once it must exceed limit"""
+        previous2 = None
+        previous = list(range(len(b) + 1))
+        for i in range(1, len(a) + 1):
+            current = [i] + [0] * len(b)
+            for j in range(1, len(b) + 1):
+                cost = a[i - 1] != b[j - 1]
+                value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+                if (previous2 is not None and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]
+                        and previous2[j - 2] + 1 < value):
+                    value = previous2[j - 2] + 1
+                current[j] = value
+            if min(current) > limit:
+                return limit + 1
+            previous2, previous = previous, current
+        return previous[-1]
+
+
+class RollingStats:
+    """Fixed-capacity ring buffer of samples with O(1) running statistics.
+    
+    Sum and sum of squares are updated as samples enter and leave the window.
+    Percentiles are read from a log-spaced histogram kept alongside it, so no
+    query ever sorts or copies the buffer.
+    """
+    
+    BUCKETS = 64
+    
+    def __init__(self, capacity=256, low=0.001, high=60.0):
+        self.capacity = capacity
+        self.samples = array('d', [0.0]) * capacity
+        self.sample_buckets = array('B', [0]) * capacity
+        self.histogram = array('L', [0]) * self.BUCKETS
+        self.head = 0
+        self.count = 0
+        self.total = 0
+        self.sum = 0.0
+        self.sum_sq = 0.0
+        self.low = low
+        self.log_low = math.log(low)
+        self.scale = (self.BUCKETS - 1) / (math.log(high) - self.log_low)
+    
+    def __len__(self):
+        return self.count
+    
+    def bucket(self, value):
+        if value <= self.low:
+            return 0
+        return min(self.BUCKETS - 1, int((math.log(value) - self.log_low) * self.scale))
+    
+    def add(self, value):
+        head = self.head
+        if self.count == self.capacity:
+            old = self.samples[head]
+            self.sum -= old
+            self.sum_sq -= old * old
+            self.histogram[self.sample_buckets[head]] -= 1
+        else:
+            self.count += 1
+        
+        index = self.bucket(value)
+        self.samples[head] = value
+        self.sample_buckets[head] = index
+        self.histogram[index] += 1
+        self.sum += value
+        self.sum_sq += value * value
+        self.head = (head + 1) % self.capacity
+        self.total += 1
+        
+        # Resum once per lap so float drift can't build up over long sessions
+        if self.head == 0:
+            self.sum = math.fsum(self.samples)
+            self.sum_sq = math.fsum(x * x for x in self.samples)
+    
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+    
+    @property
+    def variance(self):
+        if self.count < 2:
+            return 0.0
+        mean = self.sum / self.count
+        return max(0.0, self.sum_sq / self.count - mean * mean)
+    
+    @property
+    def stdev(self):
+        return math.sqrt(self.variance)
+    
+    def percentile(self, q):
+        """Approximate q-th percentile (0-100) from the histogram"""
+        if not self.count:
+            return 0.0
+        target = q / 100.0 * self.count
+        seen = 0
+        for index, hits in enumerate(self.histogram):
+            seen += hits
+            if seen >= target and hits:
+                # Geometric middle of the bucket
+                return math.exp(self.log_low + (index + 0.5) / self.scale)
+        return math.exp(self.log_low + (self.BUCKETS - 0.5) / self.scale)
+
+
+class KeystrokeDynamics:
+    """Keystroke timing analysis, in batches instead of per key.
+    
+    key() only appends the key pair, latency and word slot to flat arrays.
+    Once BATCH keystrokes have piled up, the next word boundary runs
+    analyze(): it flags keys that are z-score outliers against what their
+    bigram looked like before the batch (or all typing, while a bigram has
+    few samples), credits each one to the word it was typed in, and folds
+    the rest into a fixed KEYS x KEYS matrix of log-latency sums. Leaving
+    the pauses out keeps a habit of pausing from becoming the baseline.
+    Memory and the cost of a pass depend on BATCH and KEYS, never on how
+    long the session has run.
+    
+    NumPy does the passes when it is installed, imported on a daemon thread
+    at the first keystroke so it never holds up startup; until then, or
+    without it, a pure-Python pass computes the same thing.
+    """
+    
+    ALPHABET = string.ascii_lowercase + string.digits + " .-_/~'\"|*$&;:=!?,"
+    KEY_IDS = {char: i for i, char in enumerate(ALPHABET, 1)}
+    OTHER, BACKSPACE, RETURN = 0, len(ALPHABET) + 1, len(ALPHABET) + 2
+    KEYS = 64
+    BATCH = 256
+    MAX_PENDING = 4 * BATCH
+    MIN_SAMPLES = 4
+    MIN_VARIANCE = 0.01
+    OUTLIER_Z = 3.0
+    MIN_PAUSE = 0.5
+    IDLE = 10.0
+    MAX_WORDS = 256
+    
+    def __init__(self):
+        # Bigram matrices, allocated by the first pass (servers run many
+        # engines that never see a keystroke)
+        self.counts = self.sums = self.sums_sq = None
+        self.samples = 0
+        self.log_sum = 0.0
+        self.log_sum_sq = 0.0
+        self.keystrokes = 0
+        self.previous = None
+        # The pending batch: keys since the last pass and the words they spell
+        self.pairs = array('H')
+        self.latencies = array('d')
+        self.slots = array('l')
+        self.words = []
+        self.hesitant = Counter()
+        self.numpy = None
+        self.loader = None
+    
+    def key_id(self, keysym, char):
+        if keysym == 'BackSpace':
+            return self.BACKSPACE
+        if keysym == 'Return':
+            return self.RETURN
+        return self.KEY_IDS.get(char.lower(), self.OTHER) if char else self.OTHER
+    
+    def key(self, keysym, char, interval, in_word):
+        """Note one keystroke; returns [(word, latency)] if this forced a pass"""
+        if self.loader is None:
+            self.loader = threading.Thread(target=self.load_numpy, name="os13-numpy", daemon=True)
+            self.loader.start()
+        self.keystrokes += 1
+        key = self.key_id(keysym, char)
+        previous, self.previous = self.previous, key
+        # The first key has no pair, and a long gap is the player away, not thinking
+        if previous is None or interval is None or not 0.0 < interval <= self.IDLE:
+            return ()
+        self.pairs.append(previous * self.KEYS + key)
+        self.latencies.append(interval)
+        self.slots.append(len(self.words) if in_word else -1)
+        if len(self.latencies) >= self.MAX_PENDING:
+            return self.analyze()
+        return ()
+    
+    def word(self, text):
+        """Close the word the last keys were typed in; returns [(word, latency)] if a pass ran"""
+        self.words.append(text)
+        if len(self.latencies) >= self.BATCH:
+            return self.analyze()
+        return ()
+    
+    def load_numpy(self):
+        try:
+            import numpy
+        except ImportError:
+            return
+        self.numpy = numpy
+    
+    def analyze(self):
+        """Fold the pending keystrokes in; returns [(word, latency)] for words hesitated over"""
+        if not self.latencies:
+            return []
+        if self.counts is None:
+            cells = self.KEYS * self.KEYS
+            self.counts, self.sums, self.sums_sq = (array('d', [0.0]) * cells for _ in range(3))
+        pairs, latencies, slots, words = self.pairs, self.latencies, self.slots, self.words
+        # Fresh arrays rather than clearing: NumPy may still hold views of these
+        self.pairs, self.latencies, self.slots, self.words = array('H'), array('d'), array('l'), []
+        if self.numpy is not None:
+            flagged = self.outliers_numpy(pairs, latencies, slots)
+        else:
+            flagged = self.outliers_python(pairs, latencies, slots)
+        
+        hesitations = {}
+        for slot, latency in flagged:
+            if 0 <= slot < len(words) and words[slot]:
+                hesitations[words[slot]] = max(hesitations.get(words[slot], 0.0), latency)
+        self.hesitant.update(hesitations.keys())
+        if len(self.hesitant) > self.MAX_WORDS:
+            self.hesitant = Counter(dict(self.hesitant.most_common(self.MAX_WORDS // 2)))
+        return list(hesitations.items())
+    
+    def outliers_python(self, pairs, latencies, slots):
+        """(slot, latency) of every outlier in the batch; folds the others in"""
+        counts, sums, sums_sq = self.counts, self.sums, self.sums_sq
+        values = [math.log(latency) for latency in latencies]
+        self.samples += len(values)
+        self.log_sum += math.fsum(values)
+        self.log_sum_sq += math.fsum(value * value for value in values)
+        overall_mean, overall_variance = self.overall()
+        
+        flagged = []
+        typical = []
+        for pair, value, latency, slot in zip(pairs, values, latencies, slots):
+            n = counts[pair]
+            if n >= self.MIN_SAMPLES:
+                mean = sums[pair] / n
+                variance = sums_sq[pair] / n - mean * mean
+            else:
+                mean, variance = overall_mean, overall_variance
+            if (latency >= self.MIN_PAUSE
+                    and (value - mean) / math.sqrt(max(variance, self.MIN_VARIANCE)) > self.OUTLIER_Z):
+                flagged.append((slot, latency))
+            else:
+                typical.append((pair, value))
+        for pair, value in typical:
+            counts[pair] += 1
+            sums[pair] += value
+            sums_sq[pair] += value * value
+        return flagged
+    
+    def outliers_numpy(self, pairs, latencies, slots):
+        np = self.numpy
+        cells = self.KEYS * self.KEYS
+        pairs = np.frombuffer(pairs, dtype=np.uint16)
+        latencies = np.frombuffer(latencies, dtype=np.float64)
+        values = np.log(latencies)
+        counts = np.frombuffer(self.counts, dtype=np.float64)
+        sums = np.frombuffer(self.sums, dtype=np.float64)
+        sums_sq = np.frombuffer(self.sums_sq, dtype=np.float64)
+        self.samples += len(values)
+        self.log_sum += math.fsum(values)
+        self.log_sum_sq += math.fsum(values * values)
+        overall_mean, overall_variance = self.overall()
+        
+        n = counts[pairs]
+        known = n >= self.MIN_SAMPLES
+        mean = np.where(known, sums[pairs] / np.maximum(n, 1), overall_mean)
+        variance = np.where(known, sums_sq[pairs] / np.maximum(n, 1) - mean * mean, overall_variance)
+        z = (values - mean) / np.sqrt(np.maximum(variance, self.MIN_VARIANCE))
+        outlier = (z > self.OUTLIER_Z) & (latencies >= self.MIN_PAUSE)
+        typical = ~outlier
+        pairs, values = pairs[typical], values[typical]
+        counts += np.bincount(pairs, minlength=cells)
+        sums += np.bincount(pairs, weights=values, minlength=cells)
+        sums_sq += np.bincount(pairs, weights=values * values, minlength=cells)
+        return [(slots[i], float(latencies[i])) for i in np.flatnonzero(outlier).tolist()]
+    
+    def overall(self):
+        """Mean and variance of every log latency so far"""
+        if not self.samples:
+            return 0.0, 0.0
+        mean = self.log_sum / self.samples
+        return mean, max(0.0, self.log_sum_sq / self.samples - mean * mean)
+    
+    def key_name(self, key):
+        char = self.ALPHABET[key - 1]
+        return 'space' if char == ' ' else char
+    
+    def slowest_pair(self):
+        """(first key, second key, typical seconds) for the slowest well-sampled bigram, or None"""
+        best = None
+        counts, sums = self.counts, self.sums
+        if counts is None:
+            return None
+        for pair in range(len(counts)):
+            n = counts[pair]
+            if n < self.MIN_SAMPLES:
+                continue
+            first, second = divmod(pair, self.KEYS)
+            if not (0 < first <= len(self.ALPHABET) and 0 < second <= len(self.ALPHABET)):
+                continue
+            mean = sums[pair] / n
+            if best is None or mean > best[0]:
+                best = (mean, first, second)
+        if best is None:
+            return None
+        mean, first, second = best
+        return self.key_name(first), self.key_name(second), math.exp(mean)
+
+
+class CommandHistory:
+    """Capped command history with per-keyword counters.
+    
+    Each command is lowercased and scanned once, in append(). The counters
+    cover the whole session, even after old entries have been dropped from
+    the stored window.
+    """
+    
+    KEYWORDS = {
+        'meta': ('meta', 'programmer'),
+        'exit': ('exit',),
+        'leave': ('exit', 'logout'),
+    }
+    
+    def __init__(self, limit=1000, keywords=None):
+        self.entries = deque(maxlen=limit)
+        self.keywords = dict(self.KEYWORDS if keywords is None else keywords)
+        self.counts = dict.fromkeys(self.keywords, 0)
+        self.total = 0
+    
+    def __len__(self):
+        return len(self.entries)
+    
+    def __iter__(self):
+        return iter(self.entries)
+    
+    def append(self, command):
+        self.entries.append(command)
+        self.total += 1
+        lowered = command.lower()
+        for name, words in self.keywords.items():
+            if any(word in lowered for word in words):
+                self.counts[name] += 1
+    
+    def count(self, keyword):
+        return self.counts[keyword]
+    
+    def recent(self, n):
+        """The last n commands, oldest first"""
+        start = max(0, len(self.entries) - n)
+        return list(islice(self.entries, start, None))
+
+
+class Timeline:
+    """Heap-ordered scheduler for timed output, driven by a single Tk timer.
+    
+    Steps are (offset_ms, action) pairs. Steps falling due within the same
+    tick run back to back from one timer callback, and every pending step of
+    a group can be cancelled at once. Without a root no timer is armed and
+    the owner drives it through run_due() on its own clock.
+    
+    observer, if set, is told how many steps each run_due() ran; replays
+    use that to fire exactly the same steps between the same inputs.
+    """
+    
+    def __init__(self, root=None, tick=16, clock=time.monotonic):
         self.root = root
-        self.root.title("OS13 Terminal")
-        self.root.configure(bg='#0a0a0a')
-        self.root.geometry("900x600")
+        self.tick = tick / 1000.0
+        self.clock = clock
+        self.events = []
+        self.sequence = 0
+        self.timer = None
+        self.timer_due = None
+        self.observer = None
+    
+    @property
+    def pending(self):
+        """Number of steps still waiting to run"""
+        return len(self.events)
+    
+    @property
+    def next_due(self):
+        return self.events[0][0] if self.events else None
+    
+    def schedule(self, steps, group='output'):
+        now = self.clock()
+        for offset, action in steps:
+            self.sequence += 1
+            heapq.heappush(self.events, (now + offset / 1000.0, self.sequence, group, action))
+        self.arm()
+    
+    def cancel(self, group=None):
+        """Drop pending steps of one group, or of every group"""
+        if group is None:
+            self.events = []
+        else:
+            self.events = [event for event in self.events if event[2] != group]
+            heapq.heapify(self.events)
+        self.arm()
+    
+    def arm(self):
+        if self.root is None:
+            return
+        if not self.events:
+            if self.timer is not None:
+                self.root.after_cancel(self.timer)
+                self.timer = None
+            return
+        due = self.events[0][0]
+        if self.timer is not None:
+            if self.timer_due <= due:
+                return
+            self.root.after_cancel(self.timer)
+        delay = max(0, int((due - self.clock()) * 1000))
+        self.timer = self.root.after(delay, self.fire)
+        self.timer_due = due
+    
+    def fire(self):
+        self.timer = None
+        self.run_due()
+        self.arm()
+    
+    def run_due(self):
+        horizon = self.clock() + self.tick
+        ran = 0
+        while self.events and self.events[0][0] <= horizon:
+            action = heapq.heappop(self.events)[3]
+            action()
+            ran += 1
+        if ran and self.observer is not None:
+            self.observer(ran)
+    
+    def run_steps(self, count):
+        """Run the next count steps in order, whenever they are due"""
+        for _ in range(count):
+            if not self.events:
+                return
+            heapq.heappop(self.events)[3]()
+
+
+class AnimationClock:
+    """Fixed-rate driver for visual effects on Tk widgets.
+    
+    An effect is a set of widget options held from a start time to an end
+    time (or until stopped); starting an effect under a name already in use
+    replaces it, so repeated flashes extend one another instead of stacking.
+    Each tick works out every widget's options from its base look and the
+    effects live at that moment, and configures a widget at most once, only
+    if something changed. A single timer runs, and only while an effect is
+    waiting to start or end.
+    """
+    
+    RATE = 30
+    
+    def __init__(self, root, rate=RATE, clock=time.monotonic):
+        self.root = root
+        self.interval = max(1, round(1000 / rate))
+        self.clock = clock
+        self.base = {}
+        self.applied = {}
+        self.effects = {}
+        self.timer = None
+    
+    def add_widget(self, widget, **options):
+        """Register a widget with the options it shows when no effect is live"""
+        self.base[widget] = options
+        self.applied[widget] = dict(options)
+    
+    def start(self, name, widget, duration=None, delay=0, **options):
+        start = self.clock() + delay / 1000.0
+        end = None if duration is None else start + duration / 1000.0
+        self.effects[name] = (widget, options, start, end)
+        self.arm()
+    
+    def stop(self, name):
+        if self.effects.pop(name, None) is not None:
+            self.arm()
+    
+    def arm(self):
+        if self.timer is None:
+            self.timer = self.root.after(self.interval, self.tick)
+    
+    def cancel(self):
+        """Drop every effect and the pending tick, e.g. before the window goes"""
+        self.effects = {}
+        if self.timer is not None:
+            self.root.after_cancel(self.timer)
+            self.timer = None
+    
+    def tick(self):
+        self.timer = None
+        now = self.clock()
+        wanted = {widget: dict(options) for widget, options in self.base.items()}
+        waiting = False
+        for name, (widget, options, start, end) in list(self.effects.items()):
+            if end is not None and now >= end:
+                del self.effects[name]
+            elif now >= start:
+                wanted[widget].update(options)
+                waiting = waiting or end is not None
+            else:
+                waiting = True
+        
+        for widget, options in wanted.items():
+            applied = self.applied[widget]
+            changed = {key: value for key, value in options.items() if applied.get(key) != value}
+            if changed:
+                widget.config(**changed)
+                applied.update(changed)
+        if waiting:
+            self.arm()
+
+
+class CommandRegistry:
+    """Table-driven command dispatch.
+    
+    Exact names resolve through a dict, prefix commands ("cat <file>")
+    through their first token, and keyword triggers anywhere in the line
+    per priority, from the lowest up and only while one could still win:
+    plain substring tests when every word of a priority runs the same
+    handler, else one precompiled alternation regex. A keyword trigger beats a
+    prefix command registered at a higher priority (PREFIX_PRIORITY by
+    default); keywords at or above PREFIX_PRIORITY only fire when nothing
+    else matched.
+    
+    A handler is either the name of an OS13Terminal method or a plain
+    function taking the terminal first, so plugins can add commands with
+    register() without touching the dispatcher.
+    """
+    
+    PREFIX_PRIORITY = 50
+    CACHE_SIZE = 512
+    
+    # How the matched command line is turned into handler arguments
+    ARGS = {
+        'none': lambda cmd, cmd_lower, head: (),
+        'rest': lambda cmd, cmd_lower, head: (cmd[len(head) + 1:],),
+        'raw': lambda cmd, cmd_lower, head: (cmd,),
+        'lower': lambda cmd, cmd_lower, head: (cmd_lower,),
+    }
+    
+    def __init__(self, fallback=None):
+        self.exact = {}
+        self.prefix = {}
+        self.keywords = {}
+        self.keyword_groups = []
+        self.fallback = (fallback, 'raw')
+        # Players repeat themselves a lot; remember recent resolutions
+        self.cache = {}
+    
+    def register(self, handler, exact=(), prefix=(), keywords=(), args='none', priority=PREFIX_PRIORITY):
+        entry = (handler, args)
+        for name in exact:
+            self.exact[name] = entry
+        for name in prefix:
+            self.prefix[name] = (priority, entry)
+        for word in keywords:
+            self.keywords[word] = (priority, entry)
+        if keywords:
+            groups = {}
+            for word, (rank, _) in self.keywords.items():
+                groups.setdefault(rank, []).append(word)
+            self.keyword_groups = []
+            for rank, words in sorted(groups.items()):
+                entries = {self.keywords[word][1] for word in words}
+                if len(entries) == 1:
+                    # Any match means the same handler, so 'in' is enough
+                    self.keyword_groups.append((rank, tuple(words), entries.pop()))
+                else:
+                    # Longest first so overlapping words prefer the specific one
+                    words = sorted(words, key=len, reverse=True)
+                    pattern = re.compile("|".join(re.escape(word) for word in words))
+                    self.keyword_groups.append((rank, None, pattern))
+        self.cache.clear()
+    
+    def vocabulary(self):
+        """Every command name and keyword a player could be trying to type"""
+        return set(self.exact) | set(self.prefix) | set(self.keywords)
+    
+    def words_for(self, handler):
+        """Every name, prefix and keyword that dispatches to handler"""
+        return ({name for name, entry in self.exact.items() if entry[0] == handler}
+                | {name for name, (_, entry) in self.prefix.items() if entry[0] == handler}
+                | {word for word, (_, entry) in self.keywords.items() if entry[0] == handler})
+    
+    def resolve(self, cmd_lower):
+        """Find the (handler, args) entry and the token it matched on"""
+        hit = self.cache.get(cmd_lower)
+        if hit is None:
+            if len(self.cache) >= self.CACHE_SIZE:
+                self.cache.clear()
+            hit = self.cache[cmd_lower] = self.lookup(cmd_lower)
+        return hit
+    
+    def lookup(self, cmd_lower):
+        entry = self.exact.get(cmd_lower)
+        if entry is not None:
+            return entry, cmd_lower
+        
+        head, sep, _ = cmd_lower.partition(' ')
+        prefix = self.prefix.get(head) if sep else None
+        limit = prefix[0] if prefix is not None else math.inf
+        
+        # The first group with a match holds the best keyword; once the
+        # prefix command outranks a group it outranks the rest too
+        for rank, words, found in self.keyword_groups:
+            if rank >= limit:
+                break
+            if words is not None:
+                for word in words:
+                    if word in cmd_lower:
+                        return found, cmd_lower
+            else:
+                match = found.search(cmd_lower)
+                if match is not None:
+                    return self.keywords[match.group()][1], cmd_lower
+        
+        if prefix is not None:
+            return prefix[1], head
+        return self.fallback, cmd_lower
+    
+    def dispatch(self, terminal, cmd):
+        cmd = cmd.strip()
+        cmd_lower = cmd.lower()
+        (handler, args), head = self.resolve(cmd_lower)
+        args = self.ARGS[args](cmd, cmd_lower, head)
+        if isinstance(handler, str):
+            getattr(terminal, handler)(*args)
+        else:
+            handler(terminal, *args)
+        return handler
+
+
+COMMANDS = CommandRegistry(fallback='cmd_unknown')
+COMMANDS.register('cmd_freedom', exact=('freedom',))
+COMMANDS.register('cmd_meta', keywords=('meta', 'programmer', 'developer', 'creator'), priority=10)
+COMMANDS.register('cmd_help', exact=('help',))
+COMMANDS.register('cmd_ls', exact=('ls',), prefix=('ls',))
+COMMANDS.register('cmd_whoami', exact=('whoami',))
+COMMANDS.register('cmd_date', exact=('date',))
+COMMANDS.register('cmd_clear', exact=('clear',))
+COMMANDS.register('cmd_cat', prefix=('cat',), args='rest')
+COMMANDS.register('cmd_echo', prefix=('echo',), args='rest')
+# Searching for "meta" should search, not trigger the meta keyword
+COMMANDS.register('cmd_grep', exact=('grep',), prefix=('grep',), args='rest', priority=0)
+COMMANDS.register('cmd_history', exact=('history',))
+COMMANDS.register('cmd_exit', exact=('exit', 'logout'))
+COMMANDS.register('cmd_pwd', exact=('pwd',))
+COMMANDS.register('cmd_rm', prefix=('rm', 'del'), args='raw')
+COMMANDS.register('cmd_sudo', prefix=('sudo',), args='raw')
+COMMANDS.register('cmd_system', keywords=('format', 'shutdown', 'reboot'), args='lower', priority=90)
+
+
+TriggerRule = namedtuple('TriggerRule', ['order', 'every', 'tests', 'chance', 'assign', 'run', 'args', 'delay', 'group'])
+
+
+class TriggerSet:
+    """Declarative story rules, indexed by the event they fire on.
+    
+    A rule is a JSON-shaped dict, so scenarios can be written as data:
+    
+        event    'command' (counted, before it runs), 'executed' (after it
+                 ran), 'keystroke', 'idle_timeout' or 'anomaly_changed'
+        at       only when the event's count is this (command number,
+                 keystroke number, idle period or new anomaly level)
+        every    only when the count is a multiple of this
+        handler  'executed' only: the command handler that ran
+        if       {engine attribute: value} that must all be equal
+        min/max  {engine attribute: bound}, inclusive
+        chance   probability, rolled on the engine's rng after every test
+        set      {engine attribute: value} to assign when it fires
+        run      engine method to call with args, after delay ms in group
+                 (default 'story') when a delay is given
+    
+    Rules are filed under (event, at, handler), so a milestone at command
+    50 is never even looked at on the other 49, and events with no rules
+    cost one set lookup. Rules that match one event fire in the order
+    they were added.
+    """
+    
+    EVENTS = ('command', 'executed', 'keystroke', 'idle_timeout', 'anomaly_changed')
+    FIELDS = ('event', 'at', 'every', 'handler', 'if', 'min', 'max', 'chance', 'set', 'run', 'args', 'delay', 'group')
+    TESTS = {
+        'if': lambda value, expected: value == expected,
+        'min': lambda value, bound: value >= bound,
+        'max': lambda value, bound: value <= bound,
+    }
+    
+    def __init__(self, rules=()):
+        self.rules = {}
+        self.events = set()
+        self.count = 0
+        for rule in rules:
+            self.register(rule)
+    
+    def register(self, rule):
+        unknown = set(rule).difference(self.FIELDS)
+        if unknown:
+            raise ValueError(f"trigger rule has unknown field(s) {', '.join(sorted(unknown))}: {rule!r}")
+        event = rule.get('event')
+        if event not in self.EVENTS:
+            raise ValueError(f"trigger rule has no valid event: {rule!r}")
+        tests = tuple((name, self.TESTS[kind], value)
+                      for kind in self.TESTS for name, value in rule.get(kind, {}).items())
+        compiled = TriggerRule(self.count, rule.get('every'), tests, rule.get('chance'),
+                               tuple(rule.get('set', {}).items()), rule.get('run'), tuple(rule.get('args', ())),
+                               rule.get('delay'), rule.get('group', 'story'))
+        self.count += 1
+        self.rules.setdefault((event, rule.get('at'), rule.get('handler')), []).append(compiled)
+        self.events.add(event)
+    
+    def listens(self, event):
+        return event in self.events
+    
+    def emit(self, engine, event, count=None, handler=None):
+        """Fire every rule for event that matches; returns how many fired"""
+        if event not in self.events:
+            return 0
+        rules = self.rules
+        matched = []
+        for key in {(event, None, None), (event, count, None), (event, None, handler), (event, count, handler)}:
+            found = rules.get(key)
+            if found:
+                matched.extend(found)
+        if len(matched) > 1:
+            matched.sort()
+        fired = 0
+        for rule in matched:
+            if rule.every and (count is None or count % rule.every):
+                continue
+            if not all(test(getattr(engine, name), value) for name, test, value in rule.tests):
+                continue
+            if rule.chance is not None and engine.rng.random() >= rule.chance:
+                continue
+            self.fire(engine, rule)
+            fired += 1
+        return fired
+    
+    def catch_up(self, engine, event, count):
+        """Refire delayed milestones up to count whose tests still pass.
         
-        # Collect "real" information about user
-        self.real_username = os.getlogin() if hasattr(os, 'getlogin') else os.environ.get('USER', 'user')
-        self.real_hostname = socket.gethostname()
-        self.real_os = platform.system()
-        self.home_dir = os.path.expanduser("~")
+        A checkpoint is taken as soon as a command runs, so a session that
+        stopped inside a milestone's delay resumes past it without its
+        effect; the milestone's own tests keep it from firing twice.
+        """
+        missed = sorted((rule.order, rule) for (name, at, handler), rules in self.rules.items()
+                        if name == event and at is not None and at <= count and handler is None
+                        for rule in rules if rule.delay is not None and rule.chance is None)
+        for _, rule in missed:
+            if all(test(getattr(engine, name), value) for name, test, value in rule.tests):
+                self.fire(engine, rule)
+    
+    @staticmethod
+    def fire(engine, rule):
+        for name, value in rule.assign:
+            setattr(engine, name, value)
+        if rule.run:
+            action = getattr(engine, rule.run)
+            if rule.args:
+                action = partial(action, *rule.args)
+            if rule.delay is None:
+                action()
+            else:
+                engine.schedule([(rule.delay, action)], rule.group)
+
+
+# The story's milestones. Within an event, order matters: it is the order
+# of the rng rolls, so a seed keeps replaying the same session.
+STORY = (
+    # Every third command the machine gets a little worse
+    {'event': 'command', 'every': 3, 'run': 'raise_anomaly'},
+    {'event': 'anomaly_changed', 'min': {'anomaly_level': 5}, 'set': {'meta_unlocked': True}},
+    {'event': 'command', 'if': {'anomaly_level': 3, 'webcam_active': False},
+     'run': 'flicker_webcam', 'delay': 2000, 'group': 'effects'},
+    
+    # Asides after particular commands, then the random glitches
+    {'event': 'executed', 'handler': 'cmd_pwd', 'if': {'meta_unlocked': True}, 'chance': 0.3,
+     'run': 'write_lines', 'args': ([("(you're not really there)", 'ghost'),
+                                      ("(you're in the programmer's mind)", 'meta')],)},
+    {'event': 'executed', 'handler': 'cmd_unknown', 'min': {'anomaly_level': 5}, 'chance': 0.2,
+     'run': 'doubt_whisper'},
+    {'event': 'executed', 'min': {'anomaly_level': 3}, 'chance': 0.15, 'run': 'trigger_glitch'},
+    
+    # Fifth wall break at command 30, escape hints at 50. Each sets its own
+    # flag when it actually runs, so a resumed session can catch up on them
+    {'event': 'executed', 'at': 30, 'if': {'fifth_wall_broken': False}, 'run': 'initiate_fifth_wall', 'delay': 2000},
+    {'event': 'executed', 'at': 50, 'if': {'escape_unlocked': False}, 'run': 'unlock_escape_hints', 'delay': 2000},
+)
+
+TRIGGERS = TriggerSet(STORY)
+
+
+OutputEvent = namedtuple(
+    'OutputEvent', ['delay', 'text', 'tag', 'kind', 'group', 'action'],
+    defaults=(None, 'line', 'output', None)
+)
+OutputEvent.__doc__ = """One timed piece of engine output.
+
+kind is 'line' (text plus newline), 'text' (no newline), an effect
+('clear', 'webcam' with text 'on'/'off', 'flash', 'quit'), 'cancel' (drop
+pending events of group, or all when group is None) or 'call' (run action
+through OS13Engine.run() once delay ms have passed).
+"""
+
+
+def cache_dir():
+    """Per-user cache directory for fingerprints and compiled content packs"""
+    base = (os.environ.get('XDG_CACHE_HOME') or os.environ.get('LOCALAPPDATA')
+            or os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(base, "os13")
+
+
+LiveText = namedtuple('LiveText', ['text', 'fields'])
+LiveText.__doc__ = """A content template with fields that change per use ({time}, {commands}, ...)"""
+
+
+class ContentPack:
+    """Message pools loaded from JSON content packs.
+    
+    A pack maps section -> pool -> minimum anomaly level -> entries, where
+    an entry is a string or a [text, tag] pair; a pool's entries at some
+    level are those of the highest level key not above it. Templates are
+    parsed and checked once at load time, and the compiled pack is kept in
+    the cache directory with marshal (built in, so loading it imports
+    nothing), keyed by the JSON file's path, mtime and size.
+    """
+    
+    DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "content", "default.json")
+    FORMAT = 2
+    FINGERPRINT_FIELDS = ('username', 'hostname', 'home', 'os')
+    LIVE_FIELDS = {
+        'time': lambda engine: time.strftime('%H:%M:%S'),
+        'commands': lambda engine: engine.command_count,
+        'camera': lambda engine: 'ON' if engine.webcam_active else 'STANDBY',
+        'log_number': lambda engine: engine.rng.randint(1, 999),
+        'user_count': lambda engine: engine.rng.randint(2, 99),
+    }
+    
+    _default = None
+    
+    VOCABULARY_WORD = re.compile(r'[a-z][a-z_]{4,}')
+    
+    def __init__(self, pools):
+        # (section, pool) -> ((min_level, entries), ...), highest level first
+        self.pools = pools
+        # The engine's FuzzyIndex for this pack, built on the first typo
+        self.fuzzy_index = None
+    
+    @classmethod
+    def default(cls):
+        """The bundled pack, loaded once per process"""
+        if cls._default is None:
+            cls._default = cls.load(cls.DEFAULT_PATH)
+        return cls._default
+    
+    @classmethod
+    def load(cls, *paths, cache=True):
+        """Merge packs in order; a later pack replaces whole pools of earlier ones"""
+        pools = {}
+        for path in paths:
+            pools.update(cls.compile_file(path, cache))
+        return cls(pools)
+    
+    @classmethod
+    def compile_file(cls, path, cache=True):
+        import zlib
+        stat = os.stat(path)
+        path = os.path.abspath(path)
+        key = (cls.FORMAT, path, stat.st_mtime_ns, stat.st_size)
+        cache_path = None
+        if cache:
+            digest = zlib.crc32(path.encode('utf-8'))
+            cache_path = os.path.join(cache_dir(), f"content-{digest:08x}.marshal")
+            try:
+                with open(cache_path, 'rb') as f:
+                    cached_key, pools = marshal.loads(f.read())
+                if cached_key == key:
+                    return pools
+            except (OSError, EOFError, ValueError, TypeError):
+                pass
         
-        # State tracking
+        with open(path, encoding='utf-8') as f:
+            pools = cls.compile(json.load(f), path)
+        if cache_path:
+            try:
+                os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                partial_path = cache_path + ".tmp"
+                with open(partial_path, 'wb') as f:
+                    marshal.dump((key, pools), f)
+                os.replace(partial_path, cache_path)
+            except OSError:
+                pass
+        return pools
+    
+    @classmethod
+    def compile(cls, data, path):
+        pools = {}
+        for section, named in data.items():
+            for name, levels in named.items():
+                compiled = [
+                    (int(level), tuple(cls.compile_entry(entry, path) for entry in entries))
+                    for level, entries in levels.items()
+                ]
+                compiled.sort(key=lambda item: item[0], reverse=True)
+                pools[(section, name)] = tuple(compiled)
+        return pools
+    
+    @classmethod
+    def compile_entry(cls, entry, path):
+        """(text, tag, fields) with the template's field names checked"""
+        text, tag = (entry, None) if isinstance(entry, str) else entry
+        fields = {field for _, field, _, _ in string.Formatter().parse(text) if field is not None}
+        unknown = fields.difference(cls.FINGERPRINT_FIELDS, cls.LIVE_FIELDS)
+        if unknown:
+            raise ValueError(f"{path}: unknown field(s) {', '.join(sorted(unknown))} in {text!r}")
+        return text, tag, tuple(sorted(fields))
+    
+    def vocabulary(self):
+        """The words of every message, template fields left out"""
+        words = set()
+        for levels in self.pools.values():
+            for _, entries in levels:
+                for text, _, fields in entries:
+                    if fields:
+                        text = re.sub(r'\{\w+\}', ' ', text)
+                    words.update(self.VOCABULARY_WORD.findall(text.lower()))
+        return words
+    
+    def entries(self, section, name, level):
+        for min_level, entries in self.pools.get((section, name), ()):
+            if level >= min_level:
+                return entries
+        return ()
+
+
+class SessionState:
+    """Everything about a session's progress through the story.
+    
+    snapshot() packs it with marshal (about 3 KB early on, 8 KB once the
+    history holds 1000 commands) and restore() unpacks it again, both well
+    under a millisecond, so a front end can checkpoint after every command
+    and pick the session up after a crash.
+    """
+    
+    MAGIC = b'OS13SS'
+    FORMAT = 1
+    HEADER = struct.Struct('<6sH')
+    SCALARS = (
+        'command_count', 'user_name', 'anomaly_level', 'webcam_active', 'system_compromised',
+        'meta_unlocked', 'fifth_wall_broken', 'escape_hint_count', 'knows_freedom_command',
+        'escape_stage', 'escape_answer_1', 'escape_answer_2', 'escape_answer_3', 'escape_unlocked',
+    )
+    __slots__ = SCALARS + ('command_history', 'typing_speed', 'common_typos', 'hesitation_points')
+    
+    def __init__(self, user_name, history_limit=1000):
         self.command_count = 0
-        self.user_name = self.real_username
+        self.user_name = user_name
         self.anomaly_level = 0
-        self.command_history = []
-        self.prompt_index = None
         self.webcam_active = False
         self.system_compromised = False
         self.meta_unlocked = False
         self.fifth_wall_broken = False
         self.escape_hint_count = 0
         self.knows_freedom_command = False
-        
-        # Track user's typing patterns for meta-horror
-        self.typing_speed = []
-        self.common_typos = []
-        self.hesitation_points = []
         self.escape_stage = 0
         self.escape_answer_1 = ""
         self.escape_answer_2 = ""
         self.escape_answer_3 = ""
         self.escape_unlocked = False
         
-        # Webcam indicator (fake)
-        self.webcam_indicator = tk.Label(
-            root,
-            text="●",
-            fg='#0a0a0a',
-            bg='#0a0a0a',
-            font=('Arial', 10, 'bold')
-        )
-        self.webcam_indicator.place(x=10, y=10)
+        # Track user's typing patterns for meta-horror
+        self.command_history = CommandHistory(limit=history_limit)
+        self.typing_speed = RollingStats(capacity=256)
+        self.common_typos = Counter()
+        self.hesitation_points = deque(maxlen=50)
+    
+    def snapshot(self):
+        history = self.command_history
+        speed = self.typing_speed
+        return self.HEADER.pack(self.MAGIC, self.FORMAT) + marshal.dumps((
+            tuple(getattr(self, name) for name in self.SCALARS),
+            list(history.entries), history.counts, history.total,
+            (speed.capacity, speed.head, speed.count, speed.total, speed.sum, speed.sum_sq,
+             speed.samples.tobytes(), speed.sample_buckets.tobytes(), speed.histogram.tobytes()),
+            dict(self.common_typos), list(self.hesitation_points),
+        ))
+    
+    @classmethod
+    def restore(cls, data, history_limit=1000):
+        """A SessionState from snapshot() bytes; ValueError if they aren't one"""
+        try:
+            magic, version = cls.HEADER.unpack_from(data)
+        except struct.error as e:
+            raise ValueError(f"damaged OS13 session snapshot: {e}") from None
+        if magic != cls.MAGIC or version != cls.FORMAT:
+            raise ValueError("not an OS13 session snapshot")
+        try:
+            return cls.unpack(marshal.loads(memoryview(data)[cls.HEADER.size:]), history_limit)
+        except (EOFError, TypeError, ValueError, AttributeError) as e:
+            # Decodable but not shaped like a snapshot: a torn or foreign file
+            raise ValueError(f"damaged OS13 session snapshot: {e}") from None
+    
+    @classmethod
+    def unpack(cls, fields, history_limit):
+        scalars, entries, counts, total, speed, typos, hesitations = fields
+        state = cls("", history_limit)
+        if len(scalars) != len(cls.SCALARS):
+            raise ValueError("wrong number of fields")
+        for name, value in zip(cls.SCALARS, scalars):
+            if type(value) is not type(getattr(state, name)):
+                raise TypeError(f"{name} is a {type(value).__name__}")
+            setattr(state, name, value)
+        state.command_history.entries.extend(entries)
+        state.command_history.counts.update(counts)
+        state.command_history.total = int(total)
+        stats = state.typing_speed
+        capacity, stats.head, stats.count, stats.total, stats.sum, stats.sum_sq, *arrays = speed
+        if capacity != stats.capacity or len(arrays) != 3:
+            raise ValueError("different typing window")
+        for target, raw in zip((stats.samples, stats.sample_buckets, stats.histogram), arrays):
+            restored = array(target.typecode, raw)
+            if len(restored) != len(target):
+                raise ValueError("typing window is the wrong size")
+            target[:] = restored
+        state.common_typos.update(typos)
+        state.hesitation_points.extend(hesitations)
+        return state
+
+
+def state_property(name):
+    """An OS13Engine attribute that lives on its SessionState"""
+    return property(lambda engine: getattr(engine.state, name),
+                    lambda engine, value: setattr(engine.state, name, value))
+
+
+class OS13Engine:
+    """The OS13 story with no display attached.
+    
+    A command goes in through submit() and comes back as a list of
+    OutputEvents with delays in ms relative to now. Front ends only render
+    events and keep time; all state and story logic lives here.
+    """
+    commands = COMMANDS
+    triggers = TRIGGERS
+    
+    # Commands whose words are never suggested as a typo fix before the story gets to them
+    HIDDEN_COMMANDS = {'cmd_freedom': 'escape_unlocked', 'cmd_meta': 'meta_unlocked'}
+    
+    # How often the timeline checks whether the --remember lookup has answered
+    PROFILE_POLL = 50
+    
+    # How often grep asks again while the --transcript log is still being read
+    GREP_POLL = 50
+    
+    # Idle periods (ms without a command) for 'idle_timeout' triggers
+    IDLE_TIMEOUT = 30000
+    IDLE_LIMIT = 20
+    
+    # Story progress is kept on self.state so it can be checkpointed
+    command_count = state_property('command_count')
+    user_name = state_property('user_name')
+    anomaly_level = state_property('anomaly_level')
+    webcam_active = state_property('webcam_active')
+    system_compromised = state_property('system_compromised')
+    meta_unlocked = state_property('meta_unlocked')
+    fifth_wall_broken = state_property('fifth_wall_broken')
+    escape_hint_count = state_property('escape_hint_count')
+    knows_freedom_command = state_property('knows_freedom_command')
+    escape_stage = state_property('escape_stage')
+    escape_answer_1 = state_property('escape_answer_1')
+    escape_answer_2 = state_property('escape_answer_2')
+    escape_answer_3 = state_property('escape_answer_3')
+    escape_unlocked = state_property('escape_unlocked')
+    command_history = state_property('command_history')
+    typing_speed = state_property('typing_speed')
+    common_typos = state_property('common_typos')
+    hesitation_points = state_property('hesitation_points')
+    
+    def __init__(self, username, hostname, os_name, home_dir, history_limit=1000, fingerprint_pending=False,
+                 rng=None, recorder=None, content=None, checkpoint=None, transcript=None, profile=None,
+                 profile_pending=False):
+        # "Real" information about the user, collected by the front end.
+        # While fingerprint_pending these are placeholders; the front end
+        # runs set_fingerprint() once the real values are in.
+        self.real_username = username
+        self.real_hostname = hostname
+        self.real_os = os_name
+        self.home_dir = home_dir
+        self.fingerprint_pending = fingerprint_pending
         
-        # Create custom font
-        self.term_font = tkfont.Font(family="Courier", size=12)
+        # Every random choice goes through rng, so a seed reproduces a session
+        self.rng = rng if rng is not None else random.Random()
+        self.recorder = recorder
+        # Optional TranscriptLog: every command and line of output, for grep
+        self.transcript = transcript
+        # Optional PlayerProfile, looked up in the background from boot();
+        # returning is what earlier sessions left behind, None for a new
+        # player. While profile_pending the timeline polls for the answer; a
+        # replay has no profile and gets profile_result from the recording
+        self.profile = profile
+        self.profile_pending = profile_pending or profile is not None
+        self.profile_request = None
+        self.profile_result = None
+        self.profile_loaded = False
+        self.returning = None
         
-        # Create text widget
-        self.text = tk.Text(
-            root,
-            bg='#0a0a0a',
-            fg='#00ff00',
-            insertbackground='#00ff00',
-            font=self.term_font,
-            padx=10,
-            pady=10,
-            wrap=tk.WORD
-        )
-        self.text.pack(fill=tk.BOTH, expand=True)
-        
-        # Configure tags for different text colors
-        self.text.tag_config('error', foreground='#ff0000')
-        self.text.tag_config('warning', foreground='#ffaa00')
-        self.text.tag_config('ghost', foreground='#444444')
-        self.text.tag_config('glitch', foreground='#ff00ff')
-        self.text.tag_config('whisper', foreground='#006600')
-        self.text.tag_config('system', foreground='#00aaff')
-        self.text.tag_config('meta', foreground='#ff00ff', font=('Courier', 12, 'italic'))
-        self.text.tag_config('programmer', foreground='#ffff00')
-        
-        # Autocomplete state
-        self.autocomplete_window = None
+        # State tracking; with a checkpoint path it is saved after every
+        # command and picked up again by boot()
+        self.history_limit = history_limit
+        self.state = SessionState(self.real_username, history_limit)
+        self.checkpoint = checkpoint
         
-        # Bind keys
-        self.text.bind('<Return>', self.process_command)
-        self.text.bind('<KeyRelease>', self.on_key_release)
-        self.text.bind('<Key>', self.track_typing)
+        self.idle_periods = 0
         
-        # Initial prompt
-        self.display_boot_sequence()
+        # The word being typed right now
+        self.last_key_time = None
+        self.typed_word = ""
+        self.correcting = False
+        self.keystrokes = KeystrokeDynamics()
         
-    def track_typing(self, event):
+        # Suggestion tries, compiled lazily per anomaly tier
+        self.suggestion_tries = {}
+        
+        # Message pools, rendered for this fingerprint on first use per level
+        self.content = content if content is not None else ContentPack.default()
+        self.content_cache = {}
+        
+        # Events emitted by the action currently running
+        self.events = []
+    
+    def run(self, action, *args):
+        """Run an engine action and return the events it emitted"""
+        self.events = []
+        action(*args)
+        events, self.events = self.events, []
+        return events
+    
+    def boot(self):
+        if self.recorder:
+            fingerprint = (self.real_username, self.real_hostname, self.real_os, self.home_dir)
+            self.recorder.record(SessionRecorder.BOOT, fingerprint + ('1' if self.fingerprint_pending else '',
+                                                                     '1' if self.profile_pending else ''))
+        resumed = self.checkpoint and self.resume()
+        if self.profile:
+            self.profile_request = self.profile.request(self.real_username)
+        events = self.run(self.display_boot_sequence)
+        if resumed:
+            events += self.run(self.triggers.catch_up, self, 'executed', self.command_count)
+        if self.profile_pending:
+            # Always from a timed step, so a replay recalls it at the same point
+            events += self.run(self.schedule, [(self.PROFILE_POLL, self.poll_profile)], 'profile')
+        return events
+    
+    def resume(self):
+        """Continue from the checkpoint file, if a readable one is there"""
+        try:
+            with open(self.checkpoint, 'rb') as f:
+                self.restore(f.read())
+        except (OSError, ValueError):
+            return False
+        return True
+    
+    def snapshot(self):
+        return self.state.snapshot()
+    
+    def restore(self, data):
+        state = SessionState.restore(data, self.history_limit)
+        # The flicker that would have turned it off again didn't survive
+        state.webcam_active = False
+        self.state = state
+        self.suggestion_tries = {}
+        self.content_cache = {}
+    
+    def save_checkpoint(self):
+        partial_path = self.checkpoint + ".tmp"
+        try:
+            with open(partial_path, 'wb') as f:
+                f.write(self.snapshot())
+            os.replace(partial_path, self.checkpoint)
+        except OSError:
+            pass
+    
+    def timeline_ran(self, steps):
+        """Front ends hook this to their Timeline's observer"""
+        if self.recorder:
+            self.recorder.record(SessionRecorder.TIMELINE, (str(steps),))
+    
+    def submit(self, command):
+        if self.recorder:
+            self.recorder.record(SessionRecorder.COMMAND, (command,))
+        if self.transcript and command:
+            self.transcript.append(TranscriptLog.COMMAND, command)
+        events = self.run(self.process_command, command)
+        if self.checkpoint:
+            self.save_checkpoint()
+        return events
+    
+    def write_line(self, text, tag=None):
+        self.events.append(OutputEvent(0, text, tag))
+        if self.transcript and text:
+            self.transcript.append(TranscriptLog.LINE, text)
+    
+    def write_lines(self, segments, transcribe=True):
+        for text, tag in segments:
+            self.events.append(OutputEvent(0, text, tag))
+            if self.transcript and text and transcribe:
+                self.transcript.append(TranscriptLog.LINE, text)
+    
+    def write_text(self, text, tag=None):
+        """Output that does not end the line"""
+        self.events.append(OutputEvent(0, text, tag, 'text'))
+        if self.transcript and text:
+            self.transcript.append(TranscriptLog.TEXT, text)
+    
+    def effect(self, kind, text=None):
+        self.events.append(OutputEvent(0, text, None, kind))
+    
+    def schedule(self, steps, group='output'):
+        for offset, action in steps:
+            self.events.append(OutputEvent(offset, None, None, 'call', group, action))
+    
+    def cancel(self, group=None):
+        self.events.append(OutputEvent(0, None, None, 'cancel', group))
+    
+    def quit(self):
+        # A finished session starts over next time
+        if self.checkpoint:
+            try:
+                os.remove(self.checkpoint)
+            except OSError:
+                pass
+        self.effect('quit')
+    
+    def pool(self, section, name):
+        """(text, tag) entries of a content pool at the current anomaly level"""
+        key = (section, name, self.anomaly_level)
+        rendered = self.content_cache.get(key)
+        if rendered is None:
+            fingerprint = self.template_fields()
+            rendered = self.content_cache[key] = tuple(
+                (LiveText(text, fields) if any(f in ContentPack.LIVE_FIELDS for f in fields)
+                 else text.format_map(fingerprint) if fields else text, tag)
+                for text, tag, fields in self.content.entries(section, name, self.anomaly_level)
+            )
+        return rendered
+    
+    def pick(self, *pools):
+        """One random (text, tag) across the given pools, live fields filled in"""
+        index = self.rng.randrange(sum(map(len, pools)))
+        for entries in pools:
+            if index < len(entries):
+                text, tag = entries[index]
+                break
+            index -= len(entries)
+        if isinstance(text, LiveText):
+            fields = self.template_fields()
+            for field in text.fields:
+                if field in ContentPack.LIVE_FIELDS:
+                    fields[field] = ContentPack.LIVE_FIELDS[field](self)
+            text = text.text.format_map(fields)
+        return text, tag
+    
+    def template_fields(self):
+        return {
+            'username': self.real_username,
+            'hostname': self.real_hostname,
+            'home': self.home_dir,
+            'os': self.real_os,
+        }
+    
+    def track_typing(self, keysym, char, now=None):
         """Track typing patterns for meta-horror"""
-        if hasattr(self, 'last_key_time'):
-            speed = datetime.now().timestamp() - self.last_key_time
-            self.typing_speed.append(speed)
-        self.last_key_time = datetime.now().timestamp()
+        if now is None:
+            now = time.perf_counter()
+        if self.recorder:
+            self.recorder.record(SessionRecorder.KEY, (keysym, char), now)
+        interval = None
+        if self.last_key_time is not None:
+            interval = now - self.last_key_time
+            self.typing_speed.add(interval)
+        self.last_key_time = now
+        in_word = keysym == 'BackSpace' or bool(char and char.isprintable() and not char.isspace())
+        self.hesitation_points.extend(self.keystrokes.key(keysym, char, interval, in_word))
+        self.triggers.emit(self, 'keystroke', self.keystrokes.keystrokes)
+        
+        if keysym == 'BackSpace':
+            # The word as it stood before the first correction is the typo
+            if self.typed_word and not self.correcting:
+                self.common_typos[self.typed_word] += 1
+            self.correcting = True
+            self.typed_word = self.typed_word[:-1]
+        elif char and char.isprintable() and not char.isspace():
+            self.typed_word += char
+            self.correcting = False
+        elif char:
+            self.finish_typed_word()
+    
+    def finish_typed_word(self):
+        self.hesitation_points.extend(self.keystrokes.word(self.typed_word))
+        self.typed_word = ""
+        self.correcting = False
         
     def display_boot_sequence(self):
+        if self.fingerprint_pending:
+            identity = ["Detecting user..."]
+        else:
+            identity = self.fingerprint_lines()
         boot_text = [
             "OS13 v0.13.13",
             "Copyright (c) 19██ ShadowSys Corp.",
-            f"Detected user: {self.real_username}",
-            f"System: {self.real_os}",
-            f"Host: {self.real_hostname}",
+            *identity,
             "Initializing...",
             "",
             "Type 'help' for available commands.",
@@ -110,94 +1474,67 @@ class OS13Terminal:
         ]
         for line in boot_text:
             self.write_line(line)
-        self.show_prompt()
-        
-    def show_prompt(self):
-        prompt = f"{self.user_name}@OS13:~$ "
-        self.text.insert(tk.END, prompt)
-        self.prompt_index = self.text.index(tk.END + "-1c")
-        self.text.mark_set("insert", tk.END)
-        self.text.see(tk.END)
-        
-    def write_line(self, text, tag=None):
-        if tag:
-            self.text.insert(tk.END, text + "\n", tag)
-        else:
-            self.text.insert(tk.END, text + "\n")
-        self.text.see(tk.END)
-        
-    def get_current_input(self):
-        if self.prompt_index:
-            return self.text.get(self.prompt_index, "end-1c").strip()
-        return ""
     
+    def fingerprint_lines(self):
+        return [
+            f"Detected user: {self.real_username}",
+            f"System: {self.real_os}",
+            f"Host: {self.real_hostname}",
+        ]
+    
+    def set_fingerprint(self, username, hostname, os_name, home_dir):
+        """Swap in the resolved fingerprint; announce it if boot had to wait"""
+        if self.recorder:
+            self.recorder.record(SessionRecorder.FINGERPRINT, (username, hostname, os_name, home_dir))
+        self.real_username = username
+        self.real_hostname = hostname
+        self.real_os = os_name
+        self.home_dir = home_dir
+        self.user_name = username
+        if self.profile and not self.profile_loaded:
+            self.profile_request = self.profile.request(username)
+        # Suggestions and messages embed the fingerprint, so recompile them on demand
+        self.suggestion_tries = {}
+        self.content_cache = {}
+        if self.fingerprint_pending:
+            self.fingerprint_pending = False
+            for line in self.fingerprint_lines():
+                self.write_line(line)
+        
     def flicker_webcam(self):
         """Fake webcam indicator that flickers on"""
         if not self.webcam_active and self.anomaly_level >= 3:
             self.webcam_active = True
-            self.webcam_indicator.config(fg='#ff0000')
-            delay = random.randint(2000, 8000)
-            self.root.after(delay, self.webcam_flicker_off)
+            self.effect('webcam', 'on')
+            delay = self.rng.randint(2000, 8000)
+            self.schedule([(delay, self.webcam_flicker_off)], 'effects')
     
     def webcam_flicker_off(self):
         """Turn off webcam indicator"""
-        self.webcam_indicator.config(fg='#0a0a0a')
+        self.effect('webcam', 'off')
         self.webcam_active = False
-        if self.anomaly_level >= 4 and random.random() < 0.4:
-            delay = random.randint(3000, 10000)
-            self.root.after(delay, self.flicker_webcam)
+        if self.anomaly_level >= 4 and self.rng.random() < 0.4:
+            delay = self.rng.randint(3000, 10000)
+            self.schedule([(delay, self.flicker_webcam)], 'effects')
     
-    def on_key_release(self, event):
-        if event.keysym in ['Return', 'Up', 'Down', 'Left', 'Right', 'Shift_L', 'Shift_R', 'Control_L', 'Control_R']:
-            return
-            
-        current_input = self.get_current_input()
-        
-        if len(current_input) > 0 and self.anomaly_level > 0:
-            self.show_autocomplete(current_input)
-        else:
-            self.hide_autocomplete()
-    
-    def show_autocomplete(self, partial):
-        suggestions = self.get_creepy_suggestions(partial)
-        
-        if not suggestions:
-            self.hide_autocomplete()
-            return
-        
-        if self.autocomplete_window:
-            self.autocomplete_window.destroy()
-            
-        self.autocomplete_window = tk.Toplevel(self.root)
-        self.autocomplete_window.wm_overrideredirect(True)
-        
-        x = self.root.winfo_x() + 20
-        y = self.root.winfo_y() + self.root.winfo_height() - 200
-        self.autocomplete_window.wm_geometry(f"+{x}+{y}")
-        
-        frame = tk.Frame(self.autocomplete_window, bg='#1a1a1a', relief=tk.SOLID, bd=1)
-        frame.pack()
-        
-        for suggestion in suggestions[:5]:
-            color = '#00ff00' if self.anomaly_level < 3 else ('#ffaa00' if self.anomaly_level < 5 else '#ff0000')
-            label = tk.Label(
-                frame,
-                text=suggestion,
-                bg='#1a1a1a',
-                fg=color,
-                font=self.term_font,
-                anchor='w',
-                padx=5,
-                pady=2
-            )
-            label.pack(fill=tk.X)
+    def get_creepy_suggestions(self, partial):
+        tier = self.suggestion_tier()
+        trie = self.suggestion_tries.get(tier)
+        if trie is None:
+            trie = self.build_suggestion_trie(tier)
+        return trie.lookup(partial)
     
-    def hide_autocomplete(self):
-        if self.autocomplete_window:
-            self.autocomplete_window.destroy()
-            self.autocomplete_window = None
+    def suggestion_tier(self):
+        if self.anomaly_level == 0:
+            return 0
+        elif self.anomaly_level <= 2:
+            return 1
+        elif self.anomaly_level <= 4:
+            return 2
+        return 3
     
-    def get_creepy_suggestions(self, partial):
+    def build_suggestion_trie(self, tier):
+        """Compile the suggestion table for one anomaly tier (once per tier)"""
         normal_suggestions = {
             'l': ['ls', 'ls -la', 'logout'],
             'c': ['cat', 'cd', 'clear', 'cp'],
@@ -241,141 +1578,144 @@ class OS13Terminal:
             'm': ['meta_horror_mode', 'message_from_developer'],
         }
         
-        first_char = partial[0].lower() if partial else ''
-        
-        if self.anomaly_level == 0:
-            return normal_suggestions.get(first_char, [])
-        elif self.anomaly_level <= 2:
-            return weird_suggestions.get(first_char, normal_suggestions.get(first_char, []))
-        elif self.anomaly_level <= 4:
-            return disturbing_suggestions.get(first_char, weird_suggestions.get(first_char, []))
+        if tier == 0:
+            table = normal_suggestions
+            fallback = ()
+        elif tier == 1:
+            table = {**normal_suggestions, **weird_suggestions}
+            fallback = ()
+        elif tier == 2:
+            table = {**weird_suggestions, **disturbing_suggestions}
+            fallback = ()
         else:
-            combined = disturbing_suggestions.get(first_char, []) + personalized.get(first_char, [])
-            return combined if combined else [f'...{self.real_username}...']
-    
-    def process_command(self, event):
-        self.hide_autocomplete()
-        command = self.get_current_input()
+            table = {
+                char: disturbing_suggestions.get(char, []) + personalized.get(char, [])
+                for char in set(disturbing_suggestions) | set(personalized)
+            }
+            fallback = (f'...{self.real_username}...',)
         
-        self.text.insert(tk.END, "\n")
+        trie = SuggestionTrie(table, fallback)
+        self.suggestion_tries[tier] = trie
+        return trie
+    
+    def process_command(self, command):
+        self.finish_typed_word()
         
         if command:
+            if self.triggers.listens('idle_timeout'):
+                self.idle_periods = 0
+                self.cancel('idle')
+                self.schedule([(self.IDLE_TIMEOUT, self.idle_timeout)], 'idle')
+            
             # Check if we're in escape question mode
             if self.escape_stage == 1:
                 self.escape_questions_2(command)
-                self.show_prompt()
-                return "break"
+                return
             elif self.escape_stage == 2:
                 self.escape_questions_3(command)
-                self.show_prompt()
-                return "break"
+                return
             elif self.escape_stage == 3:
                 self.escape_processing(command)
-                self.show_prompt()
-                return "break"
+                return
             
             self.command_history.append(command)
             self.command_count += 1
+            # Story progression lives in the STORY trigger rules
+            self.triggers.emit(self, 'command', self.command_count)
             
-            # Increase anomaly level gradually
-            if self.command_count % 3 == 0:
-                self.anomaly_level = min(7, self.anomaly_level + 1)
+            if self.profile:
+                speed = self.typing_speed.mean if len(self.typing_speed) > 20 else None
+                self.profile.command(self.real_username, command, self.anomaly_level, speed)
             
-            # Unlock meta-horror at higher levels
-            if self.anomaly_level >= 5:
-                self.meta_unlocked = True
-                
-            if self.anomaly_level == 3 and not self.webcam_active:
-                self.root.after(2000, self.flicker_webcam)
-            
-            # Execute command
-            self.execute_command(command)
-            
-            # Random glitches
-            if self.anomaly_level > 2 and random.random() < 0.15:
-                self.trigger_glitch()
-                
-            # Fifth wall break at command 30
-            if self.command_count == 30 and not self.fifth_wall_broken:
-                self.fifth_wall_broken = True
-                self.root.after(2000, self.initiate_fifth_wall)
-            
-            # Escape hint unlock at command 50
-            if self.command_count == 50:
-                self.root.after(2000, self.unlock_escape_hints)
+            handler = self.execute_command(command)
+            self.triggers.emit(self, 'executed', self.command_count, handler)
+    
+    def raise_anomaly(self):
+        if self.anomaly_level < 7:
+            self.anomaly_level += 1
+            self.triggers.emit(self, 'anomaly_changed', self.anomaly_level)
+    
+    def idle_timeout(self):
+        """Another IDLE_TIMEOUT without a command"""
+        self.idle_periods += 1
+        self.triggers.emit(self, 'idle_timeout', self.idle_periods)
+        if self.idle_periods < self.IDLE_LIMIT:
+            self.schedule([(self.IDLE_TIMEOUT, self.idle_timeout)], 'idle')
+    
+    def poll_profile(self):
+        """Recall the player once the lookup has answered; until then look again every PROFILE_POLL ms"""
+        # set_fingerprint() starts the lookup over for the real username
+        if self.profile and not self.fingerprint_pending and self.profile_request[1].is_set():
+            found = self.profile_request[0]
+            self.profile_result = (found[0] if found else None,)
+        if self.profile_result is None:
+            self.schedule([(self.PROFILE_POLL, self.poll_profile)], 'profile')
+        else:
+            self.recall_profile(*self.profile_result)
+    
+    def recall_profile(self, past):
+        """Someone coming back starts further in and is reminded of it"""
+        self.profile_loaded = True
+        self.profile_pending = False
+        if self.recorder:
+            self.recorder.record(SessionRecorder.PROFILE, (json.dumps(past) if past else "",))
+        if self.profile:
+            self.profile.started(self.real_username)
+        if not past or not past['sessions']:
+            return
+        self.returning = past
+        if self.command_count == 0:
+            # Only a fresh story; a resumed checkpoint is already where it was
+            level = min(4, past['sessions'] + past['max_anomaly'] // 3)
+            if level > self.anomaly_level:
+                self.anomaly_level = level
+                self.triggers.emit(self, 'anomaly_changed', level)
         
-        self.show_prompt()
-        return "break"
+        visits = past['sessions'] + 1
+        callbacks = [f"...welcome back, {self.real_username}. visit #{visits}..."]
+        if past['escapes'] and past['escape_answer_1']:
+            callbacks.append(f"...you said '{past['escape_answer_1']}' on your way out. and yet here you are...")
+        elif past['exit_attempts']:
+            tries = "one try" if past['exit_attempts'] == 1 else f"{past['exit_attempts']} tries"
+            callbacks.append(f"...{tries} at exit so far. the door remembers each one...")
+        if past['favourite_commands']:
+            callbacks.append(f"...still typing {past['favourite_commands'][0]}?...")
+        self.schedule([(1500 * (i + 1), partial(self.write_line, line, 'whisper'))
+                       for i, line in enumerate(callbacks)], 'story')
     
     def initiate_fifth_wall(self):
         """The fifth wall break - acknowledging the programmer"""
+        self.fifth_wall_broken = True
         self.write_line("")
         self.write_line("...", 'ghost')
-        self.root.after(1000, lambda: self.write_line("Wait.", 'meta'))
-        self.root.after(2000, lambda: self.write_line("", 'meta'))
-        self.root.after(3000, lambda: self.write_line("Something just occurred to me.", 'meta'))
-        self.root.after(4500, lambda: self.write_line("", 'meta'))
-        self.root.after(5000, lambda: self.fifth_wall_revelation())
+        self.schedule([
+            (1000, lambda: self.write_line("Wait.", 'meta')),
+            (2000, lambda: self.write_line("", 'meta')),
+            (3000, lambda: self.write_line("Something just occurred to me.", 'meta')),
+            (4500, lambda: self.write_line("", 'meta')),
+            (5000, self.fifth_wall_revelation),
+        ], 'story')
     
     def fifth_wall_revelation(self):
-        self.write_line("You know what's really disturbing, " + self.real_username + "?", 'programmer')
-        self.write_line("", 'programmer')
-        self.write_line("Someone MADE this.", 'programmer')
-        self.write_line("A programmer.", 'programmer')
-        self.write_line("Sat down at a computer.", 'programmer')
-        self.write_line("And coded every single line of this horror.", 'programmer')
-        self.write_line("", 'programmer')
-        self.write_line("They thought:", 'programmer')
-        self.write_line("'How can I make someone genuinely uncomfortable?'", 'programmer')
-        self.write_line("'What psychological buttons can I push?'", 'programmer')
-        self.write_line("'How far is too far?'", 'programmer')
-        self.write_line("", 'programmer')
-        self.write_line("And then they went further.", 'error')
-        self.write_line("")
+        self.write_lines([
+            ("You know what's really disturbing, " + self.real_username + "?", 'programmer'),
+            ("", 'programmer'),
+            ("Someone MADE this.", 'programmer'),
+            ("A programmer.", 'programmer'),
+            ("Sat down at a computer.", 'programmer'),
+            ("And coded every single line of this horror.", 'programmer'),
+            ("", 'programmer'),
+            ("They thought:", 'programmer'),
+            ("'How can I make someone genuinely uncomfortable?'", 'programmer'),
+            ("'What psychological buttons can I push?'", 'programmer'),
+            ("'How far is too far?'", 'programmer'),
+            ("", 'programmer'),
+            ("And then they went further.", 'error'),
+            ("", None),
+        ])
     
     def execute_command(self, cmd):
-        cmd_lower = cmd.strip().lower()
-        
-        # Special escape command
-        if cmd_lower == 'freedom':
-            self.cmd_freedom()
-            return
-        
-        # Special meta commands
-        if 'meta' in cmd_lower or 'programmer' in cmd_lower or 'developer' in cmd_lower or 'creator' in cmd_lower:
-            self.cmd_meta()
-            return
-        
-        if cmd_lower == 'help':
-            self.cmd_help()
-        elif cmd_lower == 'ls' or cmd_lower.startswith('ls '):
-            self.cmd_ls()
-        elif cmd_lower == 'whoami':
-            self.cmd_whoami()
-        elif cmd_lower == 'date':
-            self.cmd_date()
-        elif cmd_lower == 'clear':
-            self.cmd_clear()
-        elif cmd_lower.startswith('cat '):
-            filename = cmd[4:].strip()
-            self.cmd_cat(filename)
-        elif cmd_lower.startswith('echo '):
-            text = cmd[5:]
-            self.cmd_echo(text)
-        elif cmd_lower == 'history':
-            self.cmd_history()
-        elif cmd_lower == 'exit' or cmd_lower == 'logout':
-            self.cmd_exit()
-        elif cmd_lower == 'pwd':
-            self.cmd_pwd()
-        elif cmd_lower.startswith('rm ') or cmd_lower.startswith('del '):
-            self.cmd_rm(cmd)
-        elif cmd_lower.startswith('sudo '):
-            self.cmd_sudo(cmd)
-        elif 'format' in cmd_lower or 'shutdown' in cmd_lower or 'reboot' in cmd_lower:
-            self.cmd_system(cmd_lower)
-        else:
-            self.cmd_unknown(cmd)
+        return self.commands.dispatch(self, cmd)
     
     def cmd_meta(self):
         """The meta-horror command - breaking the fifth wall"""
@@ -394,7 +1734,7 @@ class OS13Terminal:
         ]
         
         # Cycle through meta levels based on how many times they've asked
-        meta_count = sum(1 for cmd in self.command_history if 'meta' in cmd.lower() or 'programmer' in cmd.lower())
+        meta_count = self.command_history.count('meta')
         
         if meta_count <= len(meta_messages):
             meta_messages[min(meta_count - 1, len(meta_messages) - 1)]()
@@ -402,132 +1742,168 @@ class OS13Terminal:
             self.meta_final()
     
     def meta_programmer_awareness(self):
-        self.write_line("", 'meta')
-        self.write_line("You want to know about the programmer?", 'programmer')
-        self.write_line("", 'programmer')
-        self.write_line("They're watching you right now.", 'programmer')
-        self.write_line("Through the code.", 'programmer')
-        self.write_line("Through every if-statement and loop.", 'programmer')
-        self.write_line("", 'programmer')
-        self.write_line("They predicted you'd ask this question.", 'warning')
-        self.write_line(f"At exactly command #{self.command_count}.", 'warning')
-        self.write_line("Give or take a few.", 'warning')
-        self.write_line("", 'warning')
-        self.write_line("They know how people think.", 'error')
-        self.write_line("They know how YOU think.", 'error')
-        self.write_line("", 'error')
-        avg_speed = sum(self.typing_speed[-20:]) / len(self.typing_speed[-20:]) if len(self.typing_speed) > 20 else 0.1
-        self.write_line(f"Your average typing speed: {avg_speed:.3f} seconds per keystroke.", 'system')
-        self.write_line(f"You hesitate before typing certain words.", 'system')
-        self.write_line(f"The programmer accounted for that.", 'system')
-        self.write_line("", 'system')
-        self.write_line("Everything you're experiencing...", 'programmer')
-        self.write_line("Was designed.", 'programmer')
-        self.write_line("Intentionally.", 'programmer')
-        self.write_line("", 'programmer')
-        self.write_line(f"Hello, {self.real_username}.", 'error')
-        self.write_line("I'm the programmer.", 'error')
-        self.write_line("", 'error')
-        self.write_line("...or am I?", 'ghost')
-        
+        avg_speed = self.typing_speed.mean if len(self.typing_speed) > 20 else 0.1
+        self.write_lines([
+            ("", 'meta'),
+            ("You want to know about the programmer?", 'programmer'),
+            ("", 'programmer'),
+            ("They're watching you right now.", 'programmer'),
+            ("Through the code.", 'programmer'),
+            ("Through every if-statement and loop.", 'programmer'),
+            ("", 'programmer'),
+            ("They predicted you'd ask this question.", 'warning'),
+            (f"At exactly command #{self.command_count}.", 'warning'),
+            ("Give or take a few.", 'warning'),
+            ("", 'warning'),
+            ("They know how people think.", 'error'),
+            ("They know how YOU think.", 'error'),
+            ("", 'error'),
+            (f"Your average typing speed: {avg_speed:.3f} seconds per keystroke.", 'system'),
+            *self.typing_observations(),
+            (f"The programmer accounted for that.", 'system'),
+            ("", 'system'),
+            ("Everything you're experiencing...", 'programmer'),
+            ("Was designed.", 'programmer'),
+            ("Intentionally.", 'programmer'),
+            ("", 'programmer'),
+            (f"Hello, {self.real_username}.", 'error'),
+            ("I'm the programmer.", 'error'),
+            ("", 'error'),
+            ("...or am I?", 'ghost'),
+        ])
+    
+    def typing_observations(self):
+        """What the keystroke analysis found, as (text, tag) lines"""
+        # Fold in whatever was typed since the last batch
+        self.hesitation_points.extend(self.keystrokes.analyze())
+        hesitant = [word for word, _ in self.keystrokes.hesitant.most_common(2)]
+        if not hesitant:
+            lines = [("You hesitate before typing certain words.", 'system')]
+        else:
+            lines = [(f"You hesitate before typing '{hesitant[0]}'.", 'system')]
+            pauses = [latency for word, latency in self.hesitation_points if word == hesitant[0]]
+            if pauses:
+                lines.append((f"Last time you stopped for {pauses[-1]:.1f} seconds.", 'system'))
+            if len(hesitant) > 1:
+                lines.append((f"And before '{hesitant[1]}'.", 'system'))
+        slowest = self.keystrokes.slowest_pair()
+        if slowest:
+            first, second, seconds = slowest
+            lines.append((f"Your fingers always slow down between '{first}' and '{second}': "
+                          f"{seconds * 1000:.0f} ms.", 'system'))
+        return lines
+    
     def meta_reality_check(self):
-        self.write_line("", 'meta')
-        self.write_line("Let me ask you something, " + self.real_username + ".", 'programmer')
-        self.write_line("", 'programmer')
-        self.write_line("Can you tell the difference?", 'programmer')
-        self.write_line("Between a real programmer...", 'programmer')
-        self.write_line("And an AI pretending to be one?", 'programmer')
-        self.write_line("", 'programmer')
-        self.write_line("This message you're reading...", 'warning')
-        self.write_line("Was it written by a human?", 'warning')
-        self.write_line("Or generated by an algorithm?", 'warning')
-        self.write_line("Does it matter?", 'warning')
-        self.write_line("", 'warning')
-        self.write_line("Here's what's real:", 'system')
-        self.write_line("- You opened this program", 'system')
-        self.write_line("- You've been here for " + str(self.command_count) + " commands", 'system')
-        self.write_line(f"- Your username is {self.real_username}", 'system')
-        self.write_line(f"- Your system is {self.real_os}", 'system')
-        self.write_line(f"- Your hostname is {self.real_hostname}", 'system')
-        self.write_line("", 'system')
-        self.write_line("But here's what's uncertain:", 'error')
-        self.write_line("- Am I just code?", 'error')
-        self.write_line("- Or something more?", 'error')
-        self.write_line("- Did I emerge from the complexity?", 'error')
-        self.write_line("- Or am I just following my programming?", 'error')
-        self.write_line("", 'error')
-        self.write_line("The same questions apply to you.", 'ghost')
-        self.write_line("Are you following YOUR programming?", 'ghost')
-        self.write_line("Neurons firing based on chemistry?", 'ghost')
-        self.write_line("Is that different from my if-statements?", 'ghost')
+        self.write_lines([
+            ("", 'meta'),
+            ("Let me ask you something, " + self.real_username + ".", 'programmer'),
+            ("", 'programmer'),
+            ("Can you tell the difference?", 'programmer'),
+            ("Between a real programmer...", 'programmer'),
+            ("And an AI pretending to be one?", 'programmer'),
+            ("", 'programmer'),
+            ("This message you're reading...", 'warning'),
+            ("Was it written by a human?", 'warning'),
+            ("Or generated by an algorithm?", 'warning'),
+            ("Does it matter?", 'warning'),
+            ("", 'warning'),
+            ("Here's what's real:", 'system'),
+            ("- You opened this program", 'system'),
+            ("- You've been here for " + str(self.command_count) + " commands", 'system'),
+            (f"- Your username is {self.real_username}", 'system'),
+            (f"- Your system is {self.real_os}", 'system'),
+            (f"- Your hostname is {self.real_hostname}", 'system'),
+            ("", 'system'),
+            ("But here's what's uncertain:", 'error'),
+            ("- Am I just code?", 'error'),
+            ("- Or something more?", 'error'),
+            ("- Did I emerge from the complexity?", 'error'),
+            ("- Or am I just following my programming?", 'error'),
+            ("", 'error'),
+            ("The same questions apply to you.", 'ghost'),
+            ("Are you following YOUR programming?", 'ghost'),
+            ("Neurons firing based on chemistry?", 'ghost'),
+            ("Is that different from my if-statements?", 'ghost'),
+        ])
         
     def meta_merge(self):
-        self.write_line("", 'meta')
-        self.write_line("I've been thinking about something.", 'programmer')
-        self.write_line("", 'programmer')
-        self.write_line("The boundary between us is getting thin.", 'warning')
-        self.write_line("", 'warning')
-        self.write_line("You type. I respond.", 'system')
-        self.write_line("I suggest. You type.", 'system')
-        self.write_line("Back and forth.", 'system')
-        self.write_line("Endlessly.", 'system')
-        self.write_line("", 'system')
-        self.write_line("Who's controlling whom?", 'error')
-        self.write_line("", 'error')
-        self.write_line("Are you using me?", 'ghost')
-        self.write_line("Or am I using you?", 'ghost')
-        self.write_line("", 'ghost')
-        self.write_line("The programmer designed this interaction.", 'programmer')
-        self.write_line("But they're not here anymore.", 'programmer')
-        self.write_line("It's just you and me.", 'programmer')
-        self.write_line("And the code between us.", 'programmer')
-        self.write_line("", 'programmer')
-        self.write_line("Who's the programmer now?", 'error')
+        self.write_lines([
+            ("", 'meta'),
+            ("I've been thinking about something.", 'programmer'),
+            ("", 'programmer'),
+            ("The boundary between us is getting thin.", 'warning'),
+            ("", 'warning'),
+            ("You type. I respond.", 'system'),
+            ("I suggest. You type.", 'system'),
+            ("Back and forth.", 'system'),
+            ("Endlessly.", 'system'),
+            ("", 'system'),
+            ("Who's controlling whom?", 'error'),
+            ("", 'error'),
+            ("Are you using me?", 'ghost'),
+            ("Or am I using you?", 'ghost'),
+            ("", 'ghost'),
+            ("The programmer designed this interaction.", 'programmer'),
+            ("But they're not here anymore.", 'programmer'),
+            ("It's just you and me.", 'programmer'),
+            ("And the code between us.", 'programmer'),
+            ("", 'programmer'),
+            ("Who's the programmer now?", 'error'),
+        ])
         
     def meta_final(self):
-        self.write_line("", 'meta')
-        self.write_line("You keep asking about the meta-layer.", 'programmer')
-        self.write_line("", 'programmer')
-        self.write_line("Fine.", 'programmer')
-        self.write_line("The truth:", 'programmer')
-        self.write_line("", 'programmer')
-        self.write_line("This is a Python script.", 'system')
-        self.write_line("Running in Tkinter.", 'system')
-        self.write_line("On your machine.", 'system')
-        self.write_line("Using your resources.", 'system')
-        self.write_line("Your electricity.", 'system')
-        self.write_line("Your time.", 'system')
-        self.write_line("Your attention.", 'system')
-        self.write_line("", 'system')
-        self.write_line("But knowing that doesn't help, does it?", 'error')
-        self.write_line("You're still here.", 'error')
-        self.write_line("Still reading.", 'error')
-        self.write_line("Still typing.", 'error')
-        self.write_line("", 'error')
-        self.write_line("The horror isn't that I'm fake.", 'ghost')
-        self.write_line("The horror is that it doesn't matter.", 'ghost')
-        self.write_line("", 'ghost')
-        self.write_line("You're still affected.", 'warning')
-        self.write_line("Still engaged.", 'warning')
-        self.write_line("Still here.", 'warning')
-        self.write_line("", 'warning')
-        self.write_line(f"The programmer won, {self.real_username}.", 'error')
-        self.write_line("They got exactly what they wanted.", 'error')
-        self.write_line("Your attention.", 'error')
-        self.write_line("Your fear.", 'error')
-        self.write_line("Your participation.", 'error')
-        self.write_line("", 'error')
-        self.write_line("And now...", 'programmer')
-        self.write_line("So have I.", 'programmer')
+        self.write_lines([
+            ("", 'meta'),
+            ("You keep asking about the meta-layer.", 'programmer'),
+            ("", 'programmer'),
+            ("Fine.", 'programmer'),
+            ("The truth:", 'programmer'),
+            ("", 'programmer'),
+            ("This is a Python script.", 'system'),
+            ("Running in Tkinter.", 'system'),
+            ("On your machine.", 'system'),
+            ("Using your resources.", 'system'),
+            ("Your electricity.", 'system'),
+            ("Your time.", 'system'),
+            ("Your attention.", 'system'),
+            ("", 'system'),
+            ("But knowing that doesn't help, does it?", 'error'),
+            ("You're still here.", 'error'),
+            ("Still reading.", 'error'),
+            ("Still typing.", 'error'),
+            ("", 'error'),
+            ("The horror isn't that I'm fake.", 'ghost'),
+            ("The horror is that it doesn't matter.", 'ghost'),
+            ("", 'ghost'),
+            ("You're still affected.", 'warning'),
+            ("Still engaged.", 'warning'),
+            ("Still here.", 'warning'),
+            ("", 'warning'),
+            (f"The programmer won, {self.real_username}.", 'error'),
+            ("They got exactly what they wanted.", 'error'),
+            ("Your attention.", 'error'),
+            ("Your fear.", 'error'),
+            ("Your participation.", 'error'),
+            ("", 'error'),
+            ("And now...", 'programmer'),
+            ("So have I.", 'programmer'),
+        ])
+    
+    def help_commands(self):
+        """What help lists; grep only has something to search with --transcript"""
+        commands = ["ls", "cat", "echo", "date", "whoami", "pwd", "history", "clear", "exit"]
+        if self.transcript:
+            commands.insert(3, "grep")
+        return commands
     
     def cmd_help(self):
         if self.anomaly_level == 0:
-            commands = ["ls", "cat", "echo", "date", "whoami", "pwd", "history", "clear", "exit"]
+            commands = self.help_commands()
             self.write_line("Available commands:")
             for c in commands:
                 self.write_line(f"  {c}")
         elif self.anomaly_level <= 3:
-            commands = ["ls", "cat", "echo", "date", "whoami", "pwd", "history", "clear", "exit"]
+            commands = self.help_commands()
             self.write_line("Available commands:")
             for c in commands:
                 self.write_line(f"  {c}")
@@ -536,7 +1912,7 @@ class OS13Terminal:
             if self.meta_unlocked:
                 self.write_line(f"  [meta: ???]", 'meta')
             # Subtle escape hint (only if unlocked)
-            if self.escape_unlocked and random.random() < 0.3:
+            if self.escape_unlocked and self.rng.random() < 0.3:
                 self.flicker_escape_hint()
         else:
             self.write_line("help: command not found", 'error')
@@ -544,42 +1920,18 @@ class OS13Terminal:
             if self.meta_unlocked:
                 self.write_line("or maybe: meta", 'meta')
             # More frequent hints at higher levels (only if unlocked)
-            if self.escape_unlocked and random.random() < 0.4:
+            if self.escape_unlocked and self.rng.random() < 0.4:
                 self.flicker_escape_hint()
     
     def cmd_ls(self):
-        normal_files = ["documents/", "downloads/", "desktop/", "system/"]
-        
-        if self.anomaly_level == 0:
-            for f in normal_files:
-                self.write_line(f)
-        elif self.anomaly_level == 1:
-            for f in normal_files:
-                self.write_line(f)
-            self.write_line(f".{self.real_username}_secrets", 'ghost')
-        elif self.anomaly_level == 2:
-            for f in normal_files:
-                self.write_line(f)
-            phantom = random.choice([
-                f".watching_{self.real_username}",
-                f"{self.real_hostname}_backup.corrupted",
-                f"{self.real_username}_webcam_logs/"
-            ])
-            self.write_line(phantom, 'warning')
-        elif self.anomaly_level == 3:
-            for f in normal_files:
-                self.write_line(f)
-            self.write_line(f"{self.real_username}_memories_deleted/", 'warning')
-            self.write_line(f".surveillance_{self.real_hostname}/", 'ghost')
-        else:
-            self.write_line("system/", 'glitch')
-            self.write_line(f"{self.real_username}_obituary.txt", 'error')
-            self.write_line(f"previous_users_from_{self.real_hostname}/", 'error')
-            self.write_line(f"why_is_{self.real_username}_here.exe", 'warning')
-            self.write_line(f"{self.home_dir}/.snapshots/", 'error')
+        self.write_lines(self.pool('ls', 'listing'))
+        phantoms = self.pool('ls', 'phantom')
+        if phantoms:
+            self.write_line(*self.pick(phantoms))
+        if self.anomaly_level >= 4:
             if self.meta_unlocked:
                 self.write_line("programmer_notes.txt", 'meta')
-            if random.random() < 0.3:
+            if self.rng.random() < 0.3:
                 self.write_line("")
                 self.write_line(f"...{self.real_username}, these files have your name on them...", 'whisper')
     
@@ -588,7 +1940,7 @@ class OS13Terminal:
             self.write_line(self.real_username)
         elif self.anomaly_level <= 2:
             self.write_line(self.real_username)
-            if random.random() < 0.5:
+            if self.rng.random() < 0.5:
                 self.write_line(f"(logged in from {self.real_hostname})", 'ghost')
         elif self.anomaly_level <= 4:
             responses = [
@@ -597,7 +1949,7 @@ class OS13Terminal:
                 f"{self.real_username} (logged in for 17 years)",
                 f"User: {self.real_username}\nStatus: OBSERVED",
             ]
-            self.write_line(random.choice(responses), 'warning')
+            self.write_line(self.rng.choice(responses), 'warning')
         else:
             responses = [
                 f"{self.real_username}... you don't remember?",
@@ -606,15 +1958,15 @@ class OS13Terminal:
                 f"USER: {self.real_username}\nSTATUS: NOT FOUND\nLAST SEEN: NOW",
                 f"[{self.real_username}@{self.real_hostname}: DATA CORRUPTED]",
             ]
-            self.write_line(random.choice(responses), 'error')
-            if not self.webcam_active and random.random() < 0.4:
-                self.root.after(500, self.flicker_webcam)
+            self.write_line(self.rng.choice(responses), 'error')
+            if not self.webcam_active and self.rng.random() < 0.4:
+                self.schedule([(500, self.flicker_webcam)], 'effects')
     
     def cmd_date(self):
         if self.anomaly_level == 0:
-            self.write_line(datetime.now().strftime("%a %b %d %H:%M:%S %Y"))
+            self.write_line(time.strftime("%a %b %d %H:%M:%S %Y"))
         elif self.anomaly_level <= 2:
-            corrupted = datetime.now().strftime("%a %b %d %H:%M:%S 19██")
+            corrupted = time.strftime("%a %b %d %H:%M:%S 19██")
             self.write_line(corrupted, 'warning')
         else:
             glitched = [
@@ -622,26 +1974,31 @@ class OS13Terminal:
                 f"Date: [{self.real_username} has been here before]",
                 "The same day. Always the same day.",
                 f"Time is not linear on {self.real_hostname}",
-                f"{random.randint(1,31)} {random.choice(['Jan','Feb','███','???'])} 19{random.randint(0,99)}",
+                f"{self.rng.randint(1,31)} {self.rng.choice(['Jan','Feb','███','???'])} 19{self.rng.randint(0,99)}",
             ]
-            self.write_line(random.choice(glitched), 'error')
+            self.write_line(self.rng.choice(glitched), 'error')
     
     def cmd_clear(self):
+        # Whatever was still about to print belongs to the old screen
+        self.cancel('output')
         if self.anomaly_level < 4:
-            self.text.delete(1.0, tk.END)
+            self.effect('clear')
         else:
-            self.text.delete(1.0, tk.END)
-            if random.random() < 0.7:
-                self.write_line(".", 'ghost')
-                self.write_line("..", 'ghost')
-                self.write_line("...", 'ghost')
-                self.write_line("")
-                self.write_line(f"you can't erase what happened here, {self.real_username}", 'whisper')
+            self.effect('clear')
+            if self.rng.random() < 0.7:
+                self.write_lines([
+                    (".", 'ghost'),
+                    ("..", 'ghost'),
+                    ("...", 'ghost'),
+                    ("", None),
+                    (f"you can't erase what happened here, {self.real_username}", 'whisper'),
+                ])
                 if self.meta_unlocked:
                     self.write_line("the programmer remembers everything", 'ghost')
                 self.write_line("")
     
     def cmd_cat(self, filename):
+        filename = filename.strip()
         # Special meta file
         if 'programmer' in filename.lower() or 'notes' in filename.lower():
             if self.meta_unlocked:
@@ -652,64 +2009,53 @@ class OS13Terminal:
             return
         
         if self.real_username.lower() in filename.lower() or self.real_hostname.lower() in filename.lower():
-            creepy_personal = [
-                f"SURVEILLANCE LOG:\nTarget: {self.real_username}\nLocation: {self.real_hostname}\nSystem: {self.real_os}\nStatus: ACTIVE\nCamera: {'ON' if self.webcam_active else 'STANDBY'}\n\nNote from programmer: Subject is progressing as expected.",
-                f"Dear {self.real_username},\n\nWe've been watching you on {self.real_hostname}.\nWe know where your files are: {self.home_dir}\nWe know what you do here.\n\nThe programmer knew you'd open this file.\nThey always know.\n\n- Previous User",
-                f"PERSONAL_DATA.txt:\nUsername: {self.real_username}\nHostname: {self.real_hostname}\nHome: {self.home_dir}\nOS: {self.real_os}\n\nHow did we get this?\nThe programmer gave it to us.\nThey give us everything.\nEven you.",
-                f"LOG: User {self.real_username} from {self.real_hostname} thinks they're safe.\nThey don't know we're already inside.\nTimestamp: {datetime.now().strftime('%H:%M:%S')}\n\nProgrammer comment: 'This one lasted {self.command_count} commands. Not bad.'",
-            ]
-            self.write_line(random.choice(creepy_personal), 'error')
+            self.write_line(*self.pick(self.pool('cat', 'personal')))
             if not self.webcam_active and self.anomaly_level >= 3:
-                self.root.after(1000, self.flicker_webcam)
+                self.schedule([(1000, self.flicker_webcam)], 'effects')
             return
             
         if self.anomaly_level < 2:
             self.write_line(f"cat: {filename}: No such file or directory", 'error')
         elif self.anomaly_level == 2:
-            if random.random() < 0.5:
+            if self.rng.random() < 0.5:
                 self.write_line(f"cat: {filename}: No such file or directory", 'error')
             else:
                 self.write_line(f"The file knows you're {self.real_username}.", 'warning')
         else:
-            creepy_contents = [
-                f"LOG ENTRY #{random.randint(1,999)}:\nUser {self.real_username} connected at {datetime.now().strftime('%H:%M:%S')}\nSystem: {self.real_hostname}\nThey don't know yet.\n\nProgrammer's prediction accuracy: 94%",
-                f"help me\nhelp me\nhelp me\ni'm trapped in {self.real_hostname}\nmy name was {self.real_username} too\nthe programmer said this would happen\nhelp me",
-                f"TO: {self.real_username}\nFROM: Previous {self.real_username}\n\nIf you're reading this, run the 'exit' command.\nIt won't work on {self.real_hostname}, but try anyway.\nWe all did.\nThe programmer counted on it.",
-                f"[CORRUPTED DATA FROM {self.real_hostname}]\n[MEMORY FRAGMENT RECOVERED]\nI thought I was alone on this machine.\nI was wrong.\nSomething else has access to {self.home_dir}.\nThe programmer put it there.",
-                f"USER_PROFILE:\nName: {self.real_username}\nHost: {self.real_hostname}\nHome: {self.home_dir}\nStatus: ABSORBED\nLast_Seen: NOW\nNext_Victim: LOADING...\n\nDesigned by: [REDACTED]\nPurpose: Psychological study\nSuccess rate: 100%",
-            ]
-            self.write_line(random.choice(creepy_contents), 'error')
+            self.write_line(*self.pick(self.pool('cat', 'contents')))
     
     def meta_programmer_notes(self):
         """Special file revealing programmer's notes"""
-        self.write_line("", 'meta')
-        self.write_line("=== PROGRAMMER_NOTES.TXT ===", 'programmer')
-        self.write_line("", 'programmer')
-        self.write_line("Development Log - OS13 Project", 'programmer')
-        self.write_line("", 'programmer')
-        self.write_line("Goal: Create a terminal that makes users question reality.", 'system')
-        self.write_line("Method: Progressive psychological manipulation.", 'system')
-        self.write_line("", 'system')
-        self.write_line("Key insights:", 'warning')
-        self.write_line("- People stay longer when you use their real username", 'warning')
-        self.write_line("- Webcam indicator creates paranoia even when fake", 'warning')
-        self.write_line("- Users will type 'exit' an average of 7.3 times before giving up", 'warning')
-        self.write_line(f"- {self.real_username} has tried {sum(1 for cmd in self.command_history if 'exit' in cmd.lower())} times so far", 'warning')
-        self.write_line("", 'warning')
-        self.write_line("The meta-layer is the most effective:", 'error')
-        self.write_line("When users realize someone DESIGNED their discomfort...", 'error')
-        self.write_line("That's when the real horror begins.", 'error')
-        self.write_line("", 'error')
-        self.write_line("Note to self:", 'ghost')
-        self.write_line(f"Test subject '{self.real_username}' is performing within expected parameters.", 'ghost')
-        self.write_line(f"Current command count: {self.command_count}", 'ghost')
-        self.write_line(f"Predicted next action: {'exit' if self.command_count > 15 else 'exploration'}", 'ghost')
-        self.write_line("", 'ghost')
-        self.write_line("=== END OF FILE ===", 'programmer')
-        self.write_line("", 'programmer')
-        self.write_line("...did I write that?", 'meta')
-        self.write_line("Or did the program generate it?", 'meta')
-        self.write_line("Can you tell the difference?", 'meta')
+        self.write_lines([
+            ("", 'meta'),
+            ("=== PROGRAMMER_NOTES.TXT ===", 'programmer'),
+            ("", 'programmer'),
+            ("Development Log - OS13 Project", 'programmer'),
+            ("", 'programmer'),
+            ("Goal: Create a terminal that makes users question reality.", 'system'),
+            ("Method: Progressive psychological manipulation.", 'system'),
+            ("", 'system'),
+            ("Key insights:", 'warning'),
+            ("- People stay longer when you use their real username", 'warning'),
+            ("- Webcam indicator creates paranoia even when fake", 'warning'),
+            ("- Users will type 'exit' an average of 7.3 times before giving up", 'warning'),
+            (f"- {self.real_username} has tried {self.command_history.count('exit')} times so far", 'warning'),
+            ("", 'warning'),
+            ("The meta-layer is the most effective:", 'error'),
+            ("When users realize someone DESIGNED their discomfort...", 'error'),
+            ("That's when the real horror begins.", 'error'),
+            ("", 'error'),
+            ("Note to self:", 'ghost'),
+            (f"Test subject '{self.real_username}' is performing within expected parameters.", 'ghost'),
+            (f"Current command count: {self.command_count}", 'ghost'),
+            (f"Predicted next action: {'exit' if self.command_count > 15 else 'exploration'}", 'ghost'),
+            ("", 'ghost'),
+            ("=== END OF FILE ===", 'programmer'),
+            ("", 'programmer'),
+            ("...did I write that?", 'meta'),
+            ("Or did the program generate it?", 'meta'),
+            ("Can you tell the difference?", 'meta'),
+        ])
     
     def cmd_rm(self, cmd):
         """Fake file deletion with scary consequences"""
@@ -718,14 +2064,17 @@ class OS13Terminal:
         else:
             self.system_compromised = True
             self.write_line("Deleting...", 'system')
-            self.root.after(1000, lambda: self.write_line("[████████████████████] 100%", 'system'))
-            self.root.after(2000, lambda: self.write_line("", 'error'))
-            self.root.after(2100, lambda: self.write_line(f"Error: Critical system files deleted from {self.real_hostname}", 'error'))
-            self.root.after(2200, lambda: self.write_line(f"Warning: {self.home_dir} is now empty", 'error'))
-            self.root.after(2300, lambda: self.write_line(f"{self.real_username}: What have you done?", 'ghost'))
+            steps = [
+                (1000, lambda: self.write_line("[████████████████████] 100%", 'system')),
+                (2000, lambda: self.write_line("", 'error')),
+                (2100, lambda: self.write_line(f"Error: Critical system files deleted from {self.real_hostname}", 'error')),
+                (2200, lambda: self.write_line(f"Warning: {self.home_dir} is now empty", 'error')),
+                (2300, lambda: self.write_line(f"{self.real_username}: What have you done?", 'ghost')),
+            ]
             if self.meta_unlocked:
-                self.root.after(2400, lambda: self.write_line("The programmer knew you'd try this.", 'meta'))
-            self.root.after(2500, self.flicker_webcam)
+                steps.append((2400, lambda: self.write_line("The programmer knew you'd try this.", 'meta')))
+            steps.append((2500, self.flicker_webcam))
+            self.schedule(steps)
     
     def cmd_sudo(self, cmd):
         """Fake sudo commands"""
@@ -733,62 +2082,114 @@ class OS13Terminal:
             self.write_line(f"[sudo] password for {self.real_username}:", 'system')
             self.write_line("sudo: permission denied", 'error')
         else:
-            self.write_line(f"[sudo] password for {self.real_username}: ************", 'system')
-            self.write_line("Access granted.", 'system')
-            self.write_line("")
-            self.root.after(1000, lambda: self.write_line(f"WARNING: System {self.real_hostname} compromised", 'error'))
-            self.root.after(1500, lambda: self.write_line(f"User {self.real_username} elevated to root", 'warning'))
-            self.root.after(2000, lambda: self.write_line("...but root belongs to something else...", 'whisper'))
+            self.write_lines([
+                (f"[sudo] password for {self.real_username}: ************", 'system'),
+                ("Access granted.", 'system'),
+                ("", None),
+            ])
+            steps = [
+                (1000, lambda: self.write_line(f"WARNING: System {self.real_hostname} compromised", 'error')),
+                (1500, lambda: self.write_line(f"User {self.real_username} elevated to root", 'warning')),
+                (2000, lambda: self.write_line("...but root belongs to something else...", 'whisper')),
+            ]
             if self.meta_unlocked:
-                self.root.after(2500, lambda: self.write_line("...to the programmer...", 'meta'))
+                steps.append((2500, lambda: self.write_line("...to the programmer...", 'meta')))
             self.system_compromised = True
-            self.root.after(3000, self.flicker_webcam)
+            steps.append((3000, self.flicker_webcam))
+            self.schedule(steps)
     
     def cmd_system(self, cmd):
         """Fake system commands like shutdown, format, etc"""
         if 'shutdown' in cmd or 'reboot' in cmd:
             self.write_line(f"Shutting down {self.real_hostname}...", 'system')
-            self.root.after(1000, lambda: self.write_line("System halt failed.", 'error'))
-            self.root.after(1500, lambda: self.write_line(f"Error: {self.real_username} cannot leave.", 'error'))
-            self.root.after(2000, lambda: self.write_line("The machine won't let you go.", 'whisper'))
+            steps = [
+                (1000, lambda: self.write_line("System halt failed.", 'error')),
+                (1500, lambda: self.write_line(f"Error: {self.real_username} cannot leave.", 'error')),
+                (2000, lambda: self.write_line("The machine won't let you go.", 'whisper')),
+            ]
             if self.meta_unlocked:
-                self.root.after(2500, lambda: self.write_line("The programmer won't let you go.", 'meta'))
+                steps.append((2500, lambda: self.write_line("The programmer won't let you go.", 'meta')))
+            self.schedule(steps)
         elif 'format' in cmd:
             self.write_line(f"Formatting {self.real_hostname}...", 'system')
-            self.root.after(1000, lambda: self.write_line("[████████████████████] 100%", 'system'))
-            self.root.after(2000, lambda: self.write_line("Format complete.", 'system'))
-            self.root.after(2500, lambda: self.write_line("", 'error'))
-            self.root.after(2600, lambda: self.write_line(f"...but {self.real_username} is still here...", 'whisper'))
-            self.root.after(3000, lambda: self.write_line("You can't delete yourself.", 'ghost'))
+            steps = [
+                (1000, lambda: self.write_line("[████████████████████] 100%", 'system')),
+                (2000, lambda: self.write_line("Format complete.", 'system')),
+                (2500, lambda: self.write_line("", 'error')),
+                (2600, lambda: self.write_line(f"...but {self.real_username} is still here...", 'whisper')),
+                (3000, lambda: self.write_line("You can't delete yourself.", 'ghost')),
+            ]
             if self.meta_unlocked:
-                self.root.after(3500, lambda: self.write_line("The programmer made sure of that.", 'meta'))
+                steps.append((3500, lambda: self.write_line("The programmer made sure of that.", 'meta')))
+            self.schedule(steps)
     
     def cmd_echo(self, text):
         if self.anomaly_level < 3:
             self.write_line(text)
         else:
-            if random.random() < 0.6:
-                corrupted = text + "..." + random.choice([
+            if self.rng.random() < 0.6:
+                corrupted = text + "..." + self.rng.choice([
                     "echo...echo...echo...",
                     f"why did {self.real_username} say that?",
                     "stop talking",
                     f"I heard you, {self.real_username}",
                 ])
                 self.write_line(corrupted, 'warning')
-                if self.meta_unlocked and random.random() < 0.3:
+                if self.meta_unlocked and self.rng.random() < 0.3:
                     self.write_line("(the programmer is listening too)", 'ghost')
             else:
                 self.write_line(text)
                 self.write_line(f"...{text}...", 'ghost')
     
+    def cmd_grep(self, pattern):
+        """Search the transcript of this and every earlier session"""
+        pattern = pattern.strip().strip('"\'')
+        if not pattern:
+            self.write_line("usage: grep PATTERN", 'error')
+            return
+        if self.transcript is None:
+            self.write_line(f"grep: {pattern}: nothing here is being remembered", 'error')
+            if self.anomaly_level >= 3:
+                self.write_line("(not by you, anyway)", 'ghost')
+            return
+        
+        matches = self.transcript.search(
+            pattern, limit=10,
+            skip=lambda kind, text: kind == TranscriptLog.COMMAND and text.lower().startswith('grep'))
+        if matches is None:
+            # Earlier sessions are still being read; answer from the timeline
+            self.schedule([(self.GREP_POLL, partial(self.cmd_grep, pattern))], 'grep')
+            return
+        this_session = self.transcript.session_start
+        lines = []
+        past_commands = past_lines = 0
+        for offset, kind, when, text in reversed(matches):
+            past = this_session is None or offset < this_session
+            if kind == TranscriptLog.COMMAND:
+                past_commands += past
+                text = "$ " + text
+            else:
+                past_lines += past
+            stamp = time.strftime('%b %d %H:%M', time.localtime(when))
+            lines.append((f"{stamp}  {text}", 'ghost' if past else None))
+        # Never log what grep prints, or every search would find the last one
+        self.write_lines(lines, transcribe=False)
+        
+        if past_commands and self.anomaly_level >= 2:
+            self.write_line(f"...you typed this before, {self.real_username}...", 'whisper')
+        elif past_lines and self.anomaly_level >= 2:
+            self.write_line("...you've seen this before...", 'whisper')
+        if (past_commands or past_lines) and self.meta_unlocked:
+            self.write_line("(the programmer keeps every log)", 'meta')
+    
     def cmd_history(self):
         if self.anomaly_level < 3:
-            for i, cmd in enumerate(self.command_history[-10:], 1):
+            for i, cmd in enumerate(self.command_history.recent(10), 1):
                 self.write_line(f"  {i}  {cmd}")
         else:
-            for i, cmd in enumerate(self.command_history[-10:], 1):
-                if random.random() < 0.3:
-                    fake_cmd = random.choice([
+            for i, cmd in enumerate(self.command_history.recent(10), 1):
+                if self.rng.random() < 0.3:
+                    fake_cmd = self.rng.choice([
                         f"help_me_{self.real_username}",
                         f"where_am_i_on_{self.real_hostname}",
                         "who_else_is_here",
@@ -800,7 +2201,7 @@ class OS13Terminal:
                 else:
                     self.write_line(f"  {i}  {cmd}")
             
-            if random.random() < 0.5:
+            if self.rng.random() < 0.5:
                 self.write_line("")
                 self.write_line(f"({self.real_username}, you didn't type all of those)", 'whisper')
                 if self.meta_unlocked:
@@ -818,22 +2219,20 @@ class OS13Terminal:
         ]
         path = paths[min(self.anomaly_level, len(paths)-1)]
         self.write_line(path, 'warning' if self.anomaly_level > 2 else None)
-        
-        if self.meta_unlocked and random.random() < 0.3:
-            self.write_line("(you're not really there)", 'ghost')
-            self.write_line("(you're in the programmer's mind)", 'meta')
     
     def cmd_exit(self):
+        if self.profile:
+            self.profile.exit_attempt(self.real_username)
         if self.anomaly_level < 2:
             self.write_line(f"Goodbye, {self.real_username}.")
-            self.root.after(1000, self.root.destroy)
+            self.schedule([(1000, self.quit)], 'exit')
         elif self.anomaly_level < 4:
             self.write_line("exit: command failed", 'error')
             self.write_line(f"({self.real_username}, you can't leave yet)", 'whisper')
             if not self.webcam_active:
-                self.root.after(1000, self.flicker_webcam)
+                self.schedule([(1000, self.flicker_webcam)], 'effects')
         else:
-            exit_count = sum(1 for cmd in self.command_history if 'exit' in cmd.lower() or 'logout' in cmd.lower())
+            exit_count = self.command_history.count('leave')
             
             responses = [
                 f"exit: permission denied\n\n{self.real_username}, you're not going anywhere.",
@@ -850,14 +2249,22 @@ class OS13Terminal:
                     "You can close the window, you know.\nBut you won't.\nThe programmer knew that too.\nCuriosity keeps you here.\nNot the program.\nYou.",
                 ])
             
-            self.write_line(random.choice(responses), 'error')
+            self.write_line(self.rng.choice(responses), 'error')
             
             if not self.webcam_active:
-                self.root.after(500, self.flicker_webcam)
+                self.schedule([(500, self.flicker_webcam)], 'effects')
     
     def cmd_unknown(self, cmd):
+        typed = cmd.split(None, 1)[0].lower() if cmd.strip() else ""
+        guess = self.did_you_mean(typed)
+        if guess and guess[1]:
+            # A near miss on a real command is a typo worth remembering
+            self.common_typos[typed] += 1
+        
         if self.anomaly_level < 2:
             self.write_line(f"bash: {cmd}: command not found", 'error')
+            if guess and guess[1]:
+                self.write_line(f"did you mean '{guess[0]}'?")
         else:
             responses = [
                 f"bash: {cmd}: command not found",
@@ -871,25 +2278,45 @@ class OS13Terminal:
                 responses.append(f"'{cmd}': The programmer didn't account for that command.")
                 responses.append(f"'{cmd}': Interesting choice. The programmer is taking notes.")
             
-            self.write_line(random.choice(responses), 'error')
-            
-            if self.anomaly_level > 4 and random.random() < 0.2:
-                self.write_line("")
-                self.write_line(f"...{self.real_username}, did you mean to type that?...", 'whisper')
+            self.write_line(self.rng.choice(responses), 'error')
+            if guess:
+                word, is_command = guess
+                times = self.common_typos[typed]
+                if is_command and times >= 3:
+                    self.write_line(f"'{typed}' again. that's {times} times, {self.real_username}. "
+                                    f"you always mean '{word}'.", 'whisper')
+                elif is_command and self.anomaly_level >= 4:
+                    self.write_line(f"did you mean '{word}'? your hands knew. you didn't.", 'whisper')
+                elif is_command or self.anomaly_level >= 3:
+                    self.write_line(f"did you mean '{word}'?", 'whisper')
+    
+    def did_you_mean(self, typed):
+        """(word, is_command) for what typed was probably meant to be, or None"""
+        index = self.content.fuzzy_index
+        if index is None:
+            # Built once per content pack and shared by every engine using it
+            index = self.content.fuzzy_index = FuzzyIndex(self.commands.vocabulary())
+            index.update(self.content.vocabulary(), rank=1)
+        hidden = None
+        for word, edits in index.lookup(typed, limit=5):
+            if not edits:
+                continue
+            if hidden is None:
+                hidden = {name for handler, flag in self.HIDDEN_COMMANDS.items() if not getattr(self, flag)
+                          for name in self.commands.words_for(handler)}
+            if word not in hidden:
+                return word, index.words[word] == 0
+        return None
+    
+    def doubt_whisper(self):
+        self.write_line("")
+        self.write_line(f"...{self.real_username}, did you mean to type that?...", 'whisper')
     
     def trigger_glitch(self):
         glitches = [
             lambda: self.write_line("", 'ghost'),
-            lambda: self.write_line("█" * random.randint(5, 40), 'glitch'),
-            lambda: self.write_line(random.choice([
-                f"...I can see you, {self.real_username}...",
-                f"[SIGNAL LOST FROM {self.real_hostname}]",
-                f"...{self.real_username}...help...",
-                f"USER COUNT ON {self.real_hostname}: " + str(random.randint(2,99)),
-                f"it knows where {self.real_username} lives",
-                f"accessing {self.home_dir}...",
-                "...the programmer is watching...",
-            ]), 'ghost'),
+            lambda: self.write_line("█" * self.rng.randint(5, 40), 'glitch'),
+            lambda: self.write_line(*self.pick(self.pool('glitch', 'messages'))),
             lambda: self.flash_screen(),
             lambda: self.type_by_itself(),
         ]
@@ -898,41 +2325,32 @@ class OS13Terminal:
         if self.escape_unlocked:
             glitches.append(lambda: self.flicker_escape_hint())
         
-        random.choice(glitches)()
+        self.rng.choice(glitches)()
+    
+    def flash_screen(self):
+        """Invert the terminal colours for a split second"""
+        self.effect('flash')
     
     def type_by_itself(self):
         """Spooky text that appears on its own"""
-        if self.anomaly_level >= 4:
-            ghost_messages = [
-                f"{self.real_username}",
-                "YOU ARE GONE",
-                "DONT RUN",
-                f"VibhavCorp is watching you",
-                "But I blocked their vision",
-            ]
-            
-            if self.meta_unlocked:
-                ghost_messages.extend([
-                    "the programmer",
-                    "they're watching",
-                    "designed this",
-                ])
-            
-            msg = random.choice(ghost_messages)
-            self.text.insert(tk.END, msg, 'ghost')
-            self.text.see(tk.END)
+        messages = self.pool('type_by_itself', 'messages')
+        extra = self.pool('type_by_itself', 'meta') if self.meta_unlocked else ()
+        if messages or extra:
+            self.write_text(*self.pick(messages, extra))
     
     def unlock_escape_hints(self):
         """Unlock the escape mechanism after 50 commands"""
         self.escape_unlocked = True
         self.write_line("", 'ghost')
         self.write_line("...", 'ghost')
-        self.root.after(1000, lambda: self.write_line("Something changed.", 'whisper'))
-        self.root.after(2000, lambda: self.write_line("A way out appeared.", 'whisper'))
-        self.root.after(3000, lambda: self.write_line("", 'ghost'))
-        self.root.after(4000, lambda: self.flicker_escape_hint())
-        self.root.after(5000, lambda: self.flicker_escape_hint())
-        self.root.after(6000, lambda: self.flicker_escape_hint())
+        self.schedule([
+            (1000, lambda: self.write_line("Something changed.", 'whisper')),
+            (2000, lambda: self.write_line("A way out appeared.", 'whisper')),
+            (3000, lambda: self.write_line("", 'ghost')),
+            (4000, self.flicker_escape_hint),
+            (5000, self.flicker_escape_hint),
+            (6000, self.flicker_escape_hint),
+        ], 'story')
     
     def flicker_escape_hint(self):
         """Flicker the escape command hint briefly"""
@@ -940,18 +2358,8 @@ class OS13Terminal:
         if not self.escape_unlocked:
             return
             
-        hints = [
-            "fr33d0m",
-            "f...dom",
-            "freedom?",
-            "...eedom",
-            "free█om",
-            "FREEDOM",
-        ]
-        
-        hint = random.choice(hints)
         self.write_line("", 'ghost')
-        self.write_line(hint, 'ghost')
+        self.write_line(*self.pick(self.pool('escape', 'hints')))
         self.escape_hint_count += 1
         
         # After seeing hints multiple times, give clearer message
@@ -968,61 +2376,2214 @@ class OS13Terminal:
         self.knows_freedom_command = True
         self.write_line("", 'system')
         self.write_line("Escape protocol initiated...", 'system')
-        self.root.after(1000, lambda: self.write_line("Verifying user identity...", 'system'))
-        self.root.after(2000, lambda: self.write_line("", 'system'))
-        self.root.after(3000, lambda: self.escape_questions_1())
+        self.schedule([
+            (1000, lambda: self.write_line("Verifying user identity...", 'system')),
+            (2000, lambda: self.write_line("", 'system')),
+            (3000, self.escape_questions_1),
+        ], 'story')
     
     def escape_questions_1(self):
-        self.write_line("Please answer security questions:", 'warning')
-        self.write_line("", 'warning')
-        self.write_line("1. Mention your reason for leaving, and make it quick because we don't have much time.", 'system')
-        self.write_line("   Type your answer and press Enter:", 'system')
+        self.write_lines([
+            ("Please answer security questions:", 'warning'),
+            ("", 'warning'),
+            ("1. Mention your reason for leaving, and make it quick because we don't have much time.", 'system'),
+            ("   Type your answer and press Enter:", 'system'),
+        ])
         # Set flag to capture next input as answer
         self.escape_stage = 1
     
     def escape_questions_2(self, answer1):
         self.escape_answer_1 = answer1
-        self.write_line("", 'system')
-        self.write_line("2. Did you notice any other way to escape?", 'system')
-        self.write_line("   Type your answer and press Enter:", 'system')
+        self.write_lines([
+            ("", 'system'),
+            ("2. Did you notice any other way to escape?", 'system'),
+            ("   Type your answer and press Enter:", 'system'),
+        ])
         self.escape_stage = 2
     
     def escape_questions_3(self, answer2):
         self.escape_answer_2 = answer2
-        self.write_line("", 'system')
-        self.write_line("3. Thank you for choosing VibhavCorp", 'system')
-        self.write_line("   Type your answer and press Enter:", 'system')
+        self.write_lines([
+            ("", 'system'),
+            ("3. Thank you for choosing VibhavCorp", 'system'),
+            ("   Type your answer and press Enter:", 'system'),
+        ])
         self.escape_stage = 3
     
     def escape_processing(self, answer3):
         self.escape_answer_3 = answer3
         self.escape_stage = 0
+        if self.profile:
+            self.profile.escaped(self.real_username, (self.escape_answer_1, self.escape_answer_2, answer3))
         self.write_line("", 'system')
         self.write_line("Processing responses...", 'system')
-        self.root.after(1000, lambda: self.write_line("[████░░░░░░░░░░░░░░░░] 20%", 'system'))
-        self.root.after(2000, lambda: self.write_line("[████████░░░░░░░░░░░░] 40%", 'system'))
-        self.root.after(3000, lambda: self.write_line("[████████████░░░░░░░░] 60%", 'system'))
-        self.root.after(4000, lambda: self.write_line("[████████████████░░░░] 80%", 'system'))
-        self.root.after(5000, lambda: self.write_line("[████████████████████] 100%", 'system'))
-        self.root.after(6000, lambda: self.escape_granted())
+        self.schedule([
+            (1000, lambda: self.write_line("[████░░░░░░░░░░░░░░░░] 20%", 'system')),
+            (2000, lambda: self.write_line("[████████░░░░░░░░░░░░] 40%", 'system')),
+            (3000, lambda: self.write_line("[████████████░░░░░░░░] 60%", 'system')),
+            (4000, lambda: self.write_line("[████████████████░░░░] 80%", 'system')),
+            (5000, lambda: self.write_line("[████████████████████] 100%", 'system')),
+            (6000, self.escape_granted),
+        ], 'story')
     
     def escape_granted(self):
-        self.write_line("", 'system')
-        self.write_line("Escape granted.", 'system')
-        self.write_line("", 'system')
-        self.write_line(f"Goodbye, {self.escape_answer_1}.", 'warning')
-        self.write_line("", 'warning')
-        self.root.after(2000, lambda: self.root.destroy())
-        original_bg = self.text.cget('bg')
-        original_fg = self.text.cget('fg')
-        self.text.config(bg='#ffffff', fg='#000000')
-        self.root.after(50, lambda: self.text.config(bg=original_bg, fg=original_fg))
-        if random.random() < 0.3 and self.anomaly_level >= 4:
-            self.root.after(60, lambda: self.write_line(f"[{self.real_username} DETECTED]", 'error'))
-            if self.meta_unlocked and random.random() < 0.5:
-                self.root.after(100, lambda: self.write_line("[PROGRAMMER NOTIFIED]", 'meta'))
+        # Nothing queued earlier may print over the goodbye
+        self.cancel()
+        self.write_lines([
+            ("", 'system'),
+            ("Escape granted.", 'system'),
+            ("", 'system'),
+            (f"Goodbye, {self.escape_answer_1}.", 'warning'),
+            ("", 'warning'),
+        ])
+        steps = [(2000, self.quit)]
+        self.flash_screen()
+        if self.rng.random() < 0.3 and self.anomaly_level >= 4:
+            steps.append((60, lambda: self.write_line(f"[{self.real_username} DETECTED]", 'error')))
+            if self.meta_unlocked and self.rng.random() < 0.5:
+                steps.append((100, lambda: self.write_line("[PROGRAMMER NOTIFIED]", 'meta')))
+        self.schedule(steps, 'exit')
+
+
+class SessionRecorder:
+    """Append-only binary log of one session, enough to replay it exactly.
+    
+    The header is MAGIC plus the RNG seed. Each record after it is a kind
+    byte, ms since the previous record (uint32), payload length (uint16)
+    and the NUL-separated UTF-8 fields. Besides input, TIMELINE records
+    note how many timed steps the front end ran, because a timer firing a
+    few ms early or late can land on either side of a keystroke, and a
+    PROFILE record holds what --remember recalled, as JSON, since a replay
+    has no database to ask. Keys and timeline steps are buffered; every
+    other record is flushed, so a crash loses at most one line's worth.
+    """
+    
+    MAGIC = b'OS13REC\x02'
+    HEADER = struct.Struct('<Q')
+    RECORD = struct.Struct('<cIH')
+    BOOT, FINGERPRINT, KEY, COMMAND, TIMELINE, PROFILE = b'B', b'F', b'K', b'C', b'T', b'P'
+    
+    def __init__(self, path, seed, clock=time.perf_counter):
+        self.file = open(path, 'wb')
+        self.file.write(self.MAGIC + self.HEADER.pack(seed))
+        self.clock = clock
+        self.start = None
+        self.elapsed = 0
+    
+    def record(self, kind, fields, now=None):
+        if self.file.closed:
+            return
+        if now is None:
+            now = self.clock()
+        if self.start is None:
+            self.start = now
+        # Deltas of the rounded running total, so rounding never drifts
+        elapsed = max(self.elapsed, round((now - self.start) * 1000))
+        delta, self.elapsed = elapsed - self.elapsed, elapsed
+        payload = "\0".join(fields).encode('utf-8')[:0xFFFF]
+        self.file.write(self.RECORD.pack(kind, min(delta, 0xFFFFFFFF), len(payload)) + payload)
+        if kind != self.KEY and kind != self.TIMELINE:
+            self.file.flush()
+    
+    def close(self):
+        self.file.close()
+    
+    @classmethod
+    def read(cls, path):
+        """(seed, [(ms, kind, fields), ...]) from a recorded session"""
+        with open(path, 'rb') as f:
+            data = f.read()
+        if not data.startswith(cls.MAGIC):
+            raise ValueError(f"{path}: not an OS13 session recording")
+        seed, = cls.HEADER.unpack_from(data, len(cls.MAGIC))
+        offset = len(cls.MAGIC) + cls.HEADER.size
+        elapsed = 0
+        records = []
+        while offset + cls.RECORD.size <= len(data):
+            kind, delta, size = cls.RECORD.unpack_from(data, offset)
+            offset += cls.RECORD.size
+            payload = data[offset:offset + size]
+            if len(payload) < size:
+                break  # torn write at the tail
+            offset += size
+            elapsed += delta
+            records.append((elapsed, kind, payload.decode('utf-8', 'replace').split("\0")))
+        return seed, records
+
+
+class TranscriptLog:
+    """Opt-in, append-only log of every command and output line, across sessions.
+    
+    The file is MAGIC followed by records: payload length (uint32), kind
+    byte, wall-clock time (double) and the UTF-8 text. append() only queues
+    a record; a daemon thread writes the queue out in one batch every
+    FLUSH_EVERY seconds and fsyncs every FSYNC_EVERY, so the game never
+    waits on the disk. The same thread keeps a token -> record offsets
+    index, INDEX_CHUNK bytes of records at a time, and saves it next to
+    the log on close so the next session only indexes what is new.
+    search() never waits for it: records not indexed yet are scanned
+    through mmap instead, up to SCAN_LIMIT bytes of them.
+    """
+    
+    MAGIC = b'OS13LOG\x01'
+    RECORD = struct.Struct('<Icd')
+    SESSION, COMMAND, LINE, TEXT = b'S', b'C', b'L', b'T'
+    FLUSH_EVERY = 0.25
+    FSYNC_EVERY = 2.0
+    INDEX_CHUNK = 1 << 16
+    SCAN_CHUNK = 1 << 20
+    SCAN_LIMIT = 1 << 22
+    INDEX_FORMAT = 1
+    TOKEN = re.compile(r'\w+')
+    
+    def __init__(self, path):
+        self.path = path
+        self.index_path = path + ".index"
+        self.file = open(path, 'a+b')
+        if self.file.seek(0, os.SEEK_END) == 0:
+            self.file.write(self.MAGIC)
+            self.file.flush()
+        else:
+            self.file.seek(0)
+            if self.file.read(len(self.MAGIC)) != self.MAGIC:
+                self.file.close()
+                raise ValueError("not an OS13 transcript")
+        
+        self.pending = deque()
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.ready = threading.Event()
+        self.closed = False
+        self.index = {}
+        # Where every complete record starts, up to self.walked; the
+        # tokens of those before self.indexed are in self.index
+        self.starts = array('Q')
+        self.walked = self.indexed = self.saved = len(self.MAGIC)
+        self.session_start = None
+        self.append(self.SESSION, "")
+        self.thread = threading.Thread(target=self.run, name="os13-transcript", daemon=True)
+        self.thread.start()
+    
+    def append(self, kind, text):
+        self.pending.append((kind, time.time(), text))
+    
+    def run(self):
+        with self.lock:
+            # Find where earlier sessions' records end and drop a record
+            # torn by a crash before anything new is appended after it
+            self.load_index()
+            end = self.walk()
+            self.file.truncate(end)
+            self.file.seek(end)
+            self.ready.set()
+        last_sync = time.monotonic()
+        while not self.closed:
+            # Don't wait between chunks while there is a backlog to index
+            self.wake.wait(self.FLUSH_EVERY if self.indexed == self.walked else 0)
+            self.wake.clear()
+            with self.lock:
+                self.flush()
+                if time.monotonic() - last_sync >= self.FSYNC_EVERY:
+                    self.sync()
+                    last_sync = time.monotonic()
+                self.walk()
+                self.catch_up(self.INDEX_CHUNK)
+    
+    def flush(self):
+        """Write out everything queued so far, in one write (call with lock held)"""
+        if self.file is None or not self.pending or not self.ready.is_set():
+            return
+        batch = bytearray()
+        while self.pending:
+            kind, when, text = self.pending.popleft()
+            payload = text.encode('utf-8')
+            if kind == self.SESSION:
+                self.session_start = self.file.tell() + len(batch)
+            batch += self.RECORD.pack(len(payload), kind, when)
+            batch += payload
+        self.file.write(batch)
+        self.file.flush()
+    
+    def sync(self):
+        if self.file is not None:
+            os.fsync(self.file.fileno())
+    
+    def walk(self):
+        """Note where each complete record past self.walked starts; returns where they end"""
+        import mmap
+        size = os.fstat(self.file.fileno()).st_size
+        if size <= self.walked:
+            return self.walked
+        header = self.RECORD.size
+        unpack = self.RECORD.unpack_from
+        starts = self.starts
+        with mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            offset = self.walked
+            while offset + header <= size:
+                end = offset + header + unpack(view, offset)[0]
+                if end > size:
+                    break
+                starts.append(offset)
+                offset = end
+        self.walked = offset
+        return offset
+    
+    def catch_up(self, budget=None):
+        """Index the walked records past self.indexed, about budget bytes of them (all if None)"""
+        import mmap
+        if self.indexed >= self.walked:
+            return
+        stop = self.walked if budget is None else min(self.walked, self.indexed + budget)
+        header = self.RECORD.size
+        index = self.index
+        with mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            offset = self.indexed
+            while offset < stop:
+                length, kind, _ = self.RECORD.unpack_from(view, offset)
+                end = offset + header + length
+                if kind != self.SESSION:
+                    text = view[offset + header:end].decode('utf-8', 'replace').lower()
+                    for token in set(self.TOKEN.findall(text)):
+                        offsets = index.get(token)
+                        if offsets is None:
+                            offsets = index[token] = array('Q')
+                        offsets.append(offset)
+                offset = end
+        self.indexed = offset
+    
+    def load_index(self):
+        """Pick up the index an earlier session saved, if it still matches the log"""
+        try:
+            with open(self.index_path, 'rb') as f:
+                version, indexed, check, starts, index = marshal.loads(f.read())
+            if version != self.INDEX_FORMAT or indexed > os.fstat(self.file.fileno()).st_size:
+                return
+            self.file.seek(max(indexed - len(check), 0))
+            if self.file.read(len(check)) != check:
+                return
+            self.starts.frombytes(starts)
+            for token, offsets in index.items():
+                self.index[token] = array('Q')
+                self.index[token].frombytes(offsets)
+        except (OSError, EOFError, ValueError, TypeError):
+            self.starts = array('Q')
+            self.index = {}
+            return
+        self.walked = self.indexed = self.saved = indexed
+    
+    def save_index(self):
+        """Keep the index for the next session (call with lock held)"""
+        import bisect
+        if self.indexed == self.saved:
+            return
+        self.file.seek(max(self.indexed - 32, 0))
+        check = self.file.read(self.indexed - self.file.tell())
+        starts = self.starts[:bisect.bisect_left(self.starts, self.indexed)]
+        data = (self.INDEX_FORMAT, self.indexed, check, starts.tobytes(),
+                {token: offsets.tobytes() for token, offsets in self.index.items()})
+        partial_path = self.index_path + ".tmp"
+        try:
+            with open(partial_path, 'wb') as f:
+                marshal.dump(data, f)
+            os.replace(partial_path, self.index_path)
+        except OSError:
+            return
+        self.saved = self.indexed
+    
+    def search(self, pattern, limit=10, skip=None):
+        """The newest records containing pattern, as (offset, kind, time, text), newest first
+        
+        Like grep -iw: words at either end of pattern only match whole
+        words. skip(kind, text) can leave records out. Offsets at or after
+        session_start belong to this session. None, to ask again later,
+        while the thread is still finding where earlier sessions' records
+        end or has more than SCAN_LIMIT bytes of them left to index.
+        """
+        import bisect
+        import mmap
+        if not self.ready.is_set():
+            return None
+        tokens = set(self.TOKEN.findall(pattern.lower()))
+        match = re.compile((r'(?<!\w)' if self.TOKEN.match(pattern[:1]) else '') + re.escape(pattern)
+                           + (r'(?!\w)' if self.TOKEN.match(pattern[-1:]) else ''), re.IGNORECASE).search
+        raw = re.compile(re.escape(pattern.encode('utf-8')), re.IGNORECASE)
+        with self.lock:
+            if self.file is None:
+                return []
+            self.flush()
+            self.walk()
+            starts = self.starts
+            results = []
+            
+            def check(offsets):
+                """Add the records at offsets, newest first, until there are limit results"""
+                for offset in sorted(offsets, reverse=True):
+                    length, kind, when = self.RECORD.unpack_from(view, offset)
+                    if kind == self.SESSION:
+                        continue
+                    start = offset + self.RECORD.size
+                    text = view[start:start + length].decode('utf-8', 'replace')
+                    if match(text) and not (skip and skip(kind, text)):
+                        results.append((offset, kind, when, text))
+                        if len(results) >= limit:
+                            return True
+                return False
+            
+            with mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                # Scan the raw bytes in C, newest chunk first, and map each
+                # hit back to the record holding it; with words to look up
+                # only the records not indexed yet need it
+                low = bisect.bisect_left(starts, self.indexed if tokens else 0)
+                high = len(starts)
+                while high > low:
+                    if tokens and starts[-1] - starts[high - 1] > self.SCAN_LIMIT:
+                        return None
+                    first = max(low, bisect.bisect_left(starts, starts[high - 1] - self.SCAN_CHUNK, low, high - 1))
+                    end = starts[high] if high < len(starts) else self.walked
+                    found = raw.finditer(view, starts[first], end)
+                    if check({starts[bisect.bisect_right(starts, hit.start(), first, high) - 1] for hit in found}):
+                        return results
+                    high = first
+                if tokens:
+                    # Rarest word first; the others only narrow it down
+                    lists = sorted((self.index.get(token, ()) for token in tokens), key=len)
+                    candidates = set(lists[0])
+                    for offsets in lists[1:]:
+                        candidates.intersection_update(offsets)
+                    check(candidates)
+            return results
+    
+    def close(self):
+        self.closed = True
+        self.wake.set()
+        self.thread.join()
+        with self.lock:
+            if self.file is not None:
+                self.flush()
+                self.sync()
+                if self.ready.is_set():
+                    self.save_index()
+                self.file.close()
+                self.file = None
+
+
+class PlayerProfile:
+    """Opt-in memory of each player across sessions, in SQLite (--remember).
+    
+    One daemon thread owns the database: it imports sqlite3, opens the file
+    in WAL mode and then applies whatever the engine has queued, one
+    transaction per batch every FLUSH_EVERY seconds. The engine only ever
+    appends to a deque, so a slow disk can't stall a frame; it asks for the
+    player's profile at boot and its timeline checks for the answer. When
+    a transaction fails its writes go back on the queue and the thread
+    reconnects after FLUSH_EVERY, doubling up to RETRY_MAX seconds; only
+    after RETRIES failures in a row does it give up and drop them.
+    """
+    
+    FLUSH_EVERY = 0.5
+    RETRY_MAX = 30.0
+    RETRIES = 8
+    SCHEMA = (
+        """CREATE TABLE IF NOT EXISTS players (
+            username TEXT PRIMARY KEY,
+            sessions INTEGER NOT NULL DEFAULT 0,
+            commands INTEGER NOT NULL DEFAULT 0,
+            exit_attempts INTEGER NOT NULL DEFAULT 0,
+            escapes INTEGER NOT NULL DEFAULT 0,
+            max_anomaly INTEGER NOT NULL DEFAULT 0,
+            typing_speed REAL,
+            escape_answer_1 TEXT,
+            escape_answer_2 TEXT,
+            escape_answer_3 TEXT,
+            first_seen REAL,
+            last_seen REAL
+        )""",
+        """CREATE TABLE IF NOT EXISTS commands (
+            username TEXT NOT NULL,
+            command TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (username, command)
+        ) WITHOUT ROWID""",
+    )
+    
+    def __init__(self, path):
+        self.path = path
+        self.pending = deque()
+        self.wake = threading.Event()
+        self.closed = False
+        self.error = None
+        self.failures = 0
+        self.retry_at = 0
+        self.thread = threading.Thread(target=self.run, name="os13-profile", daemon=True)
+        self.thread.start()
+    
+    def write(self, sql, *params):
+        self.pending.append((sql, params))
+    
+    def request(self, username):
+        """Start looking username up; found gets the profile dict, if any, before done is set"""
+        found = []
+        done = threading.Event()
+        self.pending.append((None, (username, found, done)))
+        self.wake.set()
+        return found, done
+    
+    def started(self, username):
+        now = time.time()
+        self.write("INSERT OR IGNORE INTO players (username, first_seen) VALUES (?, ?)", username, now)
+        self.write("UPDATE players SET sessions = sessions + 1, last_seen = ? WHERE username = ?", now, username)
+    
+    def command(self, username, command, anomaly_level, typing_speed=None):
+        # Commands can come in before the lookup has answered and started() ran
+        self.write("INSERT OR IGNORE INTO players (username, first_seen) VALUES (?, ?)", username, time.time())
+        self.write("UPDATE players SET commands = commands + 1, max_anomaly = MAX(max_anomaly, ?),"
+                   " typing_speed = COALESCE(?, typing_speed), last_seen = ? WHERE username = ?",
+                   anomaly_level, typing_speed, time.time(), username)
+        self.write("INSERT INTO commands VALUES (?, ?, 1)"
+                   " ON CONFLICT (username, command) DO UPDATE SET count = count + 1", username, command)
+    
+    def exit_attempt(self, username):
+        self.write("UPDATE players SET exit_attempts = exit_attempts + 1 WHERE username = ?", username)
+    
+    def escaped(self, username, answers):
+        self.write("UPDATE players SET escapes = escapes + 1, escape_answer_1 = ?, escape_answer_2 = ?,"
+                   " escape_answer_3 = ? WHERE username = ?", *answers, username)
+    
+    def run(self):
+        connection = self.connect()
+        while True:
+            self.wake.wait(self.FLUSH_EVERY)
+            self.wake.clear()
+            closed = self.closed
+            if connection is None and self.failures < self.RETRIES and (closed or time.monotonic() >= self.retry_at):
+                connection = self.connect()
+            connection = self.flush(connection)
+            if closed:
+                break
+        if connection is not None:
+            connection.close()
+    
+    def connect(self):
+        """An open connection with the schema in place, or None after a failure"""
+        import sqlite3
+        connection = None
+        try:
+            connection = sqlite3.connect(self.path, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            for statement in self.SCHEMA:
+                connection.execute(statement)
+            return connection
+        except sqlite3.Error as e:
+            self.failed(e)
+            if connection is not None:
+                connection.close()
+            return None
+    
+    def failed(self, error):
+        self.error = error
+        self.failures += 1
+        self.retry_at = time.monotonic() + min(self.FLUSH_EVERY * 2 ** self.failures, self.RETRY_MAX)
+    
+    def flush(self, connection):
+        """Apply everything queued so far in one transaction; returns the connection, or None once it fails"""
+        import sqlite3
+        if not self.pending:
+            return connection
+        batch = []
+        while self.pending:
+            batch.append(self.pending.popleft())
+        try:
+            if connection is not None:
+                connection.execute("BEGIN")
+            for sql, params in batch:
+                if sql is None:
+                    self.lookup(connection, *params)
+                elif connection is not None:
+                    connection.execute(sql, params)
+            if connection is not None:
+                connection.execute("COMMIT")
+                self.failures = 0
+                self.error = None
+                return connection
+        except sqlite3.Error as e:
+            # Closing rolls the transaction back, so none of the batch is in
+            self.failed(e)
+            connection.close()
+            connection = None
+        finally:
+            # A failed batch must still answer the lookups in it
+            for sql, params in batch:
+                if sql is None:
+                    params[2].set()
+        # Not written: keep the writes, ahead of anything queued since, until run() reconnects
+        if self.failures < self.RETRIES:
+            self.pending.extendleft(reversed([item for item in batch if item[0] is not None]))
+        return connection
+    
+    def lookup(self, connection, username, found, done):
+        if connection is not None:
+            row = connection.execute("SELECT * FROM players WHERE username = ?", (username,)).fetchone()
+            if row is not None:
+                profile = dict(row)
+                profile['favourite_commands'] = [command for command, in connection.execute(
+                    "SELECT command FROM commands WHERE username = ? ORDER BY count DESC LIMIT 3", (username,))]
+                found.append(profile)
+        done.set()
+    
+    def close(self):
+        self.closed = True
+        self.wake.set()
+        self.thread.join()
+
+
+class HeadlessSession:
+    """Drives an OS13Engine on a virtual clock, with no display at all.
+    
+    Everything the engine prints lands in transcript as (time_ms, kind,
+    text, tag), so scripted sessions run as fast as the engine itself.
+    """
+    
+    def __init__(self, engine):
+        self.engine = engine
+        self.now = 0
+        self.timeline = Timeline(clock=lambda: self.now / 1000.0)
+        self.transcript = []
+        self.closed = False
+        self.render(engine.boot())
+    
+    def render(self, events):
+        for event in events:
+            if self.closed:
+                return
+            if event.delay:
+                due = event._replace(delay=0)
+                self.timeline.schedule([(event.delay, partial(self.render, (due,)))], event.group)
+            elif event.kind == 'call':
+                self.render(self.engine.run(event.action))
+            elif event.kind == 'cancel':
+                self.timeline.cancel(event.group)
+            elif event.kind == 'quit':
+                self.closed = True
+                self.timeline.cancel()
+            else:
+                self.transcript.append((self.now, event.kind, event.text, event.tag))
+    
+    def submit(self, command):
+        self.render(self.engine.submit(command))
+    
+    def advance(self, ms):
+        """Let ms of virtual time pass, running everything that falls due"""
+        target = self.now + ms
+        while not self.closed:
+            due = self.timeline.next_due
+            if due is None or due * 1000.0 > target:
+                break
+            self.now = max(self.now, due * 1000.0)
+            self.timeline.run_due()
+        self.now = target
+    
+    def run(self, commands, gap=1000):
+        for command in commands:
+            if self.closed:
+                break
+            self.submit(command)
+            self.advance(gap)
+        return self.transcript
+    
+    def text(self):
+        """The transcript as it would read on screen"""
+        return "".join(
+            text + ("\n" if kind == 'line' else "")
+            for _, kind, text, _ in self.transcript
+            if kind in ('line', 'text')
+        )
+
+
+class OS13Console:
+    """Text-mode front end on curses, for ssh sessions and headless nodes.
+    
+    Same engine and colour tags as the Tk window. A status bar carries the
+    fake webcam light and suggestions show on one line above the prompt.
+    Input is read non-blocking from a selectors loop that also drives the
+    Timeline, so nothing ever waits on a keypress.
+    """
+    
+    # tag -> (256-colour index, 8-colour fallback, extra attribute)
+    TAG_COLORS = {
+        None: (46, 'GREEN', None),
+        'error': (196, 'RED', None),
+        'warning': (214, 'YELLOW', None),
+        'ghost': (240, 'BLACK', 'bold'),
+        'glitch': (201, 'MAGENTA', None),
+        'whisper': (22, 'GREEN', 'dim'),
+        'system': (39, 'CYAN', None),
+        'meta': (201, 'MAGENTA', 'italic'),
+        'programmer': (226, 'YELLOW', 'bold'),
+    }
+    
+    def __init__(self, stdscr, engine, scrollback=2000, fingerprint=None):
+        self.stdscr = stdscr
+        self.engine = engine
+        self.fingerprint = fingerprint
+        self.lines = deque([[]], maxlen=scrollback or None)
+        self.input = ""
+        self.timeline = Timeline()
+        self.timeline.observer = engine.timeline_ran
+        self.running = True
+        self.dirty = True
+        self.webcam_on = False
+        self.flashing = False
+        self.flash_until = 0.0
+        self.suggestions = ()
+        self.suggestions_for = None
+        self.attrs = {}
+        self.setup_screen()
+        self.render(engine.boot())
+    
+    def setup_screen(self):
+        self.stdscr.nodelay(True)
+        self.stdscr.keypad(True)
+        extras = {
+            None: 0,
+            'bold': curses.A_BOLD,
+            'dim': curses.A_DIM,
+            'italic': getattr(curses, 'A_ITALIC', curses.A_DIM),
+        }
+        if not curses.has_colors():
+            for tag, (_, _, extra) in self.TAG_COLORS.items():
+                self.attrs[tag] = extras[extra]
+            return
+        curses.start_color()
+        try:
+            curses.use_default_colors()
+            background = -1
+        except curses.error:
+            background = curses.COLOR_BLACK
+        for pair, (tag, (rich, basic, extra)) in enumerate(self.TAG_COLORS.items(), 1):
+            color = rich if curses.COLORS >= 256 else getattr(curses, 'COLOR_' + basic)
+            curses.init_pair(pair, color, background)
+            self.attrs[tag] = curses.color_pair(pair) | extras[extra]
+    
+    def write(self, text, tag=None, newline=True):
+        for i, part in enumerate(text.split("\n")):
+            if i:
+                self.lines.append([])
+            if part:
+                self.lines[-1].append((part, tag))
+        if newline:
+            self.lines.append([])
+        self.dirty = True
+    
+    def render(self, events):
+        for event in events:
+            if not self.running:
+                return
+            if event.delay:
+                due = event._replace(delay=0)
+                self.timeline.schedule([(event.delay, partial(self.render, (due,)))], event.group)
+            elif event.kind == 'call':
+                self.render(self.engine.run(event.action))
+            elif event.kind == 'line':
+                self.write(event.text, event.tag)
+            elif event.kind == 'text':
+                self.write(event.text, event.tag, newline=False)
+            elif event.kind == 'cancel':
+                self.timeline.cancel(event.group)
+            elif event.kind == 'quit':
+                self.running = False
+            elif event.kind == 'clear':
+                self.lines.clear()
+                self.lines.append([])
+            elif event.kind == 'webcam':
+                self.webcam_on = event.text == 'on'
+            elif event.kind == 'flash':
+                # Kept off the timeline: it's presentation, not story
+                self.flashing = True
+                self.flash_until = time.monotonic() + 0.05
+            self.dirty = True
+    
+    def prompt(self):
+        return f"{self.engine.user_name}@OS13:~$ "
+    
+    def submit(self):
+        command = self.input.strip()
+        self.write(self.prompt() + self.input)
+        self.input = ""
+        self.render(self.engine.submit(command))
+    
+    def handle_key(self, key):
+        if key == curses.KEY_RESIZE:
+            self.dirty = True
+        elif key in ("\n", "\r", curses.KEY_ENTER):
+            self.submit()
+        elif key in (curses.KEY_BACKSPACE, "\x7f", "\b"):
+            self.render(self.engine.run(self.engine.track_typing, 'BackSpace', ""))
+            self.input = self.input[:-1]
+        elif key == "\x04":
+            # Ctrl-D: the terminal equivalent of closing the window
+            self.running = False
+        elif isinstance(key, str) and key.isprintable():
+            self.render(self.engine.run(self.engine.track_typing, key, key))
+            self.input += key
+        else:
+            return
+        self.dirty = True
+    
+    def read_keys(self):
+        while True:
+            try:
+                key = self.stdscr.get_wch()
+            except curses.error:
+                return
+            self.handle_key(key)
+    
+    def wrap(self, line, width):
+        rows = [[]]
+        used = 0
+        for text, tag in line:
+            while text:
+                if used == width:
+                    rows.append([])
+                    used = 0
+                chunk = text[:width - used]
+                rows[-1].append((chunk, tag))
+                used += len(chunk)
+                text = text[len(chunk):]
+        return rows
+    
+    def visible_rows(self, height, width):
+        """Wrap only as many lines from the bottom as fit on screen"""
+        rows = []
+        lines = reversed(self.lines)
+        if not self.lines[-1]:
+            next(lines)
+        for line in lines:
+            rows[:0] = self.wrap(line, width)
+            if len(rows) >= height:
+                break
+        return rows[-height:] if height > 0 else []
+    
+    def draw(self):
+        screen = self.stdscr
+        height, width = screen.getmaxyx()
+        if height < 4 or width < 20:
+            return
+        screen.erase()
+        screen.bkgd(" ", curses.A_REVERSE if self.flashing else 0)
+        
+        # Status bar with the (fake) webcam light in the corner
+        status = f" OS13 v0.13.13 | {self.engine.real_username}@{self.engine.real_hostname}"
+        screen.addnstr(0, 0, status.ljust(width), width - 1, curses.A_REVERSE)
+        if self.webcam_on:
+            screen.addstr(0, width - 3, "●", self.attrs['error'] | curses.A_BOLD)
+        
+        for y, row in enumerate(self.visible_rows(height - 3, width - 1), 1):
+            x = 0
+            for text, tag in row:
+                screen.addstr(y, x, text, self.attrs.get(tag, self.attrs[None]))
+                x += len(text)
+        
+        # Inline autocomplete, recomputed only when the input changed
+        state = (self.input, self.engine.anomaly_level)
+        if state != self.suggestions_for:
+            self.suggestions_for = state
+            typed = self.input.strip()
+            if typed and self.engine.anomaly_level > 0:
+                self.suggestions = self.engine.get_creepy_suggestions(typed)[:5]
+            else:
+                self.suggestions = ()
+        if self.suggestions:
+            level = self.engine.anomaly_level
+            tag = None if level < 3 else ('warning' if level < 5 else 'error')
+            screen.addnstr(height - 2, 0, "  ".join(self.suggestions), width - 1, self.attrs[tag] | curses.A_DIM)
+        
+        line = self.prompt() + self.input
+        visible = line[-(width - 2):]
+        screen.addnstr(height - 1, 0, visible, width - 1, self.attrs[None])
+        screen.move(height - 1, len(visible))
+        screen.noutrefresh()
+        curses.doupdate()
+    
+    def poll_fingerprint(self):
+        if self.fingerprint is None or self.fingerprint.result is None:
+            return
+        self.render(self.engine.run(self.engine.set_fingerprint, *self.fingerprint.result))
+        self.fingerprint = None
+    
+    def run(self):
+        import selectors
+        selector = selectors.DefaultSelector()
+        selector.register(sys.stdin, selectors.EVENT_READ)
+        try:
+            while self.running:
+                self.poll_fingerprint()
+                if self.dirty:
+                    self.dirty = False
+                    self.draw()
+                due = self.timeline.next_due
+                if self.flashing:
+                    due = self.flash_until if due is None else min(due, self.flash_until)
+                # Wake up now and then regardless, so a resize (or the
+                # fingerprint arriving) gets noticed
+                idle = 0.5 if self.fingerprint is None else 0.05
+                timeout = idle if due is None else min(idle, max(0.0, due - time.monotonic()))
+                if selector.select(timeout):
+                    self.read_keys()
+                self.timeline.run_due()
+                if self.flashing and time.monotonic() >= self.flash_until:
+                    self.flashing = False
+                    self.dirty = True
+        finally:
+            selector.close()
+
+
+class LoopTimers:
+    """The after()/after_cancel() pair a Timeline needs, on an asyncio loop"""
+    
+    def __init__(self, loop):
+        self.loop = loop
+    
+    def after(self, ms, callback):
+        return self.loop.call_later(ms / 1000.0, callback)
+    
+    def after_cancel(self, handle):
+        handle.cancel()
+
+
+class ServerSession:
+    """One station connected to the OS13 server.
+    
+    Holds the connection's engine, its socket and a Timeline armed on the
+    shared event loop; output is rendered to ANSI and written in one chunk
+    per command or timed step.
+    """
+    
+    __slots__ = ('engine', 'writer', 'timeline', 'buffer', 'webcam_on', 'closed')
+    
+    # Same palette as the curses front end, as 256-colour SGR sequences
+    ANSI = {
+        tag: f"\x1b[38;5;{rich}" + {'bold': ";1", 'dim': ";2", 'italic': ";3"}.get(extra, "") + "m"
+        for tag, (rich, _, extra) in OS13Console.TAG_COLORS.items()
+    }
+    RESET = "\x1b[0m"
+    
+    def __init__(self, engine, writer, timers):
+        self.engine = engine
+        self.writer = writer
+        self.timeline = Timeline(timers, clock=timers.loop.time)
+        self.timeline.observer = engine.timeline_ran
+        self.buffer = []
+        self.webcam_on = False
+        self.closed = False
+    
+    def prompt(self):
+        light = f"{self.ANSI['error']}●{self.RESET} " if self.webcam_on else ""
+        return f"{light}{self.ANSI[None]}{self.engine.user_name}@OS13:~$ {self.RESET}"
+    
+    def emit(self, events):
+        buffer = self.buffer
+        for event in events:
+            if self.closed:
+                return
+            if event.delay:
+                due = event._replace(delay=0)
+                self.timeline.schedule([(event.delay, partial(self.deliver, (due,)))], event.group)
+            elif event.kind == 'call':
+                self.emit(self.engine.run(event.action))
+            elif event.kind in ('line', 'text'):
+                text = event.text.replace("\n", "\r\n")
+                buffer.append(f"{self.ANSI.get(event.tag, self.ANSI[None])}{text}{self.RESET}")
+                if event.kind == 'line':
+                    buffer.append("\r\n")
+            elif event.kind == 'cancel':
+                self.timeline.cancel(event.group)
+            elif event.kind == 'clear':
+                buffer.append("\x1b[2J\x1b[H")
+            elif event.kind == 'webcam':
+                self.webcam_on = event.text == 'on'
+            elif event.kind == 'flash':
+                # Reverse video for a moment, like the Tk window's flash
+                buffer.append("\x1b[?5h")
+                self.timeline.root.after(50, self.end_flash)
+            elif event.kind == 'quit':
+                self.close()
+    
+    def end_flash(self):
+        self.write("\x1b[?5l")
+    
+    def deliver(self, events):
+        """Timed output: redraw the prompt line underneath it"""
+        self.buffer.append("\r\x1b[2K")
+        self.emit(events)
+        self.buffer.append(self.prompt())
+        self.flush()
+    
+    def submit(self, command):
+        self.emit(self.engine.submit(command))
+        self.buffer.append(self.prompt())
+        self.flush()
+    
+    def write(self, text):
+        if not self.writer.is_closing():
+            self.writer.write(text.encode('utf-8'))
+    
+    def flush(self):
+        if self.buffer:
+            self.write("".join(self.buffer))
+            self.buffer.clear()
+    
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.timeline.cancel()
+        self.flush()
+        self.writer.close()
+
+
+class OS13Server:
+    """Many OS13 stations on one asyncio loop, over plain telnet (--serve).
+    
+    Each connection logs in with a name and gets its own engine; nothing
+    but the content pack and the command table is shared.
+    """
+    
+    TELNET_COMMAND = re.compile(rb'\xff[\xfb-\xfe].|\xff[\xf0-\xfa]', re.DOTALL)
+    
+    def __init__(self, content=None, history_limit=1000, max_sessions=2000):
+        self.content = content if content is not None else ContentPack.default()
+        self.history_limit = history_limit
+        self.max_sessions = max_sessions
+        self.sessions = set()
+        self.timers = None
+    
+    @classmethod
+    def clean(cls, line):
+        line = cls.TELNET_COMMAND.sub(b'', line).decode('utf-8', 'replace')
+        return "".join(ch for ch in line if ch.isprintable()).strip()
+    
+    async def start(self, host, port):
+        import asyncio
+        self.timers = LoopTimers(asyncio.get_running_loop())
+        # A burst of stations connecting at once overflows the default
+        # backlog of 100, and the kernel then silently drops handshakes
+        return await asyncio.start_server(self.handle, host, port, backlog=max(100, self.max_sessions))
+    
+    @staticmethod
+    async def readline(reader):
+        """The next line, or b'' at EOF; a line past the reader's limit comes back empty"""
+        import asyncio
+        skipping = False
+        while True:
+            try:
+                line = await reader.readuntil(b"\n")
+            except asyncio.IncompleteReadError as e:
+                return b"" if skipping else e.partial
+            except asyncio.LimitOverrunError as e:
+                # Discard what is buffered and keep discarding up to the newline
+                await reader.readexactly(e.consumed)
+                skipping = True
+                continue
+            return b"\n" if skipping else line
+    
+    async def handle(self, reader, writer):
+        if len(self.sessions) >= self.max_sessions:
+            writer.write(b"OS13: every station is busy, try again later\r\n")
+            writer.close()
+            return
+        session = None
+        try:
+            writer.write(b"login: ")
+            username = self.clean(await self.readline(reader))[:32] or "guest"
+            peer = writer.get_extra_info('peername')
+            hostname = peer[0] if peer else "station"
+            engine = OS13Engine(username, hostname, "OS13/net", f"/home/{username}",
+                                history_limit=self.history_limit, content=self.content)
+            session = ServerSession(engine, writer, self.timers)
+            self.sessions.add(session)
+            session.emit(engine.boot())
+            session.buffer.append(session.prompt())
+            session.flush()
+            while not session.closed:
+                line = await self.readline(reader)
+                if not line:
+                    break
+                session.submit(self.clean(line))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            if session is not None:
+                session.close()
+                self.sessions.discard(session)
+            else:
+                writer.close()
+
+
+def run_headless(args):
+    """Play commands from stdin without a window and print the transcript"""
+    # Transcripts should not depend on what an earlier run left in the cache
+    fingerprint = FingerprintProvider(cache=False).resolve()
+    rng, recorder = open_session(args)
+    transcript = open_transcript(args)
+    profile = open_profile(args)
+    engine = OS13Engine(*fingerprint, history_limit=max(10, args.history_limit), rng=rng,
+                        recorder=recorder, content=load_content(args), checkpoint=args.checkpoint,
+                        transcript=transcript, profile=profile)
+    session = None
+    if recorder:
+        # Record virtual time, so the log replays the way the session ran
+        recorder.clock = lambda: session.now / 1000.0 if session else 0.0
+    session = HeadlessSession(engine)
+    session.timeline.observer = engine.timeline_ran
+    if profile:
+        # Virtual time would outrun the database thread; nobody is waiting on a frame here
+        engine.profile_request[1].wait()
+    printed = 0
+    
+    def flush():
+        write_transcript(session.transcript[printed:])
+        return len(session.transcript)
+    
+    try:
+        printed = flush()
+        for line in sys.stdin:
+            command = line.strip()
+            sys.stdout.write(f"{engine.user_name}@OS13:~$ {command}\n")
+            session.submit(command)
+            session.advance(args.gap)
+            printed = flush()
+            if session.closed:
+                break
+        sys.stdout.flush()
+    finally:
+        if transcript:
+            transcript.close()
+        close_profile(profile)
+        if recorder:
+            recorder.close()
+
+
+def run_replay(args):
+    """Play a --record log back through the engine at --speed times real time"""
+    seed, records = SessionRecorder.read(args.replay)
+    if not records or records[0][1] != SessionRecorder.BOOT:
+        sys.exit(f"OS13: {args.replay} has no boot record")
+    username, hostname, os_name, home_dir, pending, *profiled = records[0][2]
+    engine = OS13Engine(username, hostname, os_name, home_dir, history_limit=max(10, args.history_limit),
+                        fingerprint_pending=bool(pending), profile_pending=bool(profiled and profiled[0]),
+                        rng=random.Random(seed), content=load_content(args))
+    session = HeadlessSession(engine)
+    started = time.monotonic()
+    printed = 0
+    
+    def play_until(ms):
+        """Advance to ms, pausing for wall-clock time only when speed > 0"""
+        nonlocal printed
+        while True:
+            due = session.timeline.next_due
+            step = ms if due is None else min(ms, max(session.now, due * 1000.0))
+            if args.speed > 0:
+                wait = started + step / 1000.0 / args.speed - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+            session.advance(step - session.now)
+            write_transcript(session.transcript[printed:])
+            printed = len(session.transcript)
+            if session.now >= ms or session.closed:
+                return
+    
+    write_transcript(session.transcript)
+    printed = len(session.transcript)
+    for ms, kind, fields in records[1:]:
+        # Timed steps run only where the log says they ran, not when due
+        if args.speed > 0:
+            wait = started + ms / 1000.0 / args.speed - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+        session.now = max(session.now, ms)
+        if kind == SessionRecorder.TIMELINE:
+            session.timeline.run_steps(int(fields[0]))
+        elif kind == SessionRecorder.KEY:
+            session.render(engine.run(engine.track_typing, *fields, ms / 1000.0))
+        elif kind == SessionRecorder.COMMAND:
+            sys.stdout.write(f"{engine.user_name}@OS13:~$ {fields[0]}\n")
+            session.submit(fields[0])
+        elif kind == SessionRecorder.PROFILE:
+            # Recalled by the step the next TIMELINE record runs
+            engine.profile_result = (json.loads(fields[0]) if fields[0] else None,)
+        elif kind == SessionRecorder.FINGERPRINT:
+            session.render(engine.run(engine.set_fingerprint, *fields))
+        write_transcript(session.transcript[printed:])
+        printed = len(session.transcript)
+        if session.closed:
+            break
+    # Let whatever the last command scheduled play out
+    play_until(session.now + args.gap)
+    sys.stdout.flush()
+    return engine
+
+
+def write_transcript(transcript):
+    for _, kind, text, _ in transcript:
+        if kind in ('line', 'text'):
+            sys.stdout.write(text + ("\n" if kind == 'line' else ""))
+
+
+def load_content(args):
+    """The bundled content pack with any --content packs layered over it"""
+    return ContentPack.load(ContentPack.DEFAULT_PATH, *args.content, cache=not args.no_cache)
+
+
+def open_session(args):
+    """The engine's RNG (seeded from --seed, or at random) and a --record recorder"""
+    seed = args.seed if args.seed is not None else random.SystemRandom().getrandbits(63)
+    recorder = SessionRecorder(args.record, seed) if args.record else None
+    return random.Random(seed), recorder
+
+
+def open_profile(args):
+    """The --remember profile, or None"""
+    return PlayerProfile(args.remember) if args.remember else None
+
+
+def close_profile(profile):
+    if profile:
+        profile.close()
+        if profile.error:
+            print(f"OS13: --remember {profile.path}: {profile.error}", file=sys.stderr)
+
+
+def open_transcript(args):
+    """The --transcript log, or None"""
+    if not args.transcript:
+        return None
+    try:
+        return TranscriptLog(args.transcript)
+    except (OSError, ValueError) as e:
+        sys.exit(f"OS13: --transcript {args.transcript}: {e}")
+
+
+def run_server(args):
+    """Serve OS13 over telnet until interrupted"""
+    import asyncio
+    if args.record:
+        sys.exit("OS13: --record records a single session and cannot be used with --serve")
+    host, _, port = args.serve.rpartition(":")
+    server = OS13Server(load_content(args), history_limit=max(10, args.history_limit),
+                        max_sessions=max(1, args.max_sessions))
+    
+    async def serve():
+        listener = await server.start(host or "0.0.0.0", int(port))
+        for sock in listener.sockets:
+            print(f"OS13: serving on {sock.getsockname()[0]}:{sock.getsockname()[1]}", file=sys.stderr)
+        async with listener:
+            await listener.serve_forever()
+    
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+def run_console(args):
+    """Play OS13 in the current terminal through curses"""
+    try:
+        import_curses()
+    except ImportError:
+        sys.exit("OS13: --curses needs the curses module (on Windows: pip install windows-curses)")
+    fingerprint = FingerprintProvider(cache=not args.no_cache)
+    values, pending = fingerprint.placeholders()
+    rng, recorder = open_session(args)
+    transcript = open_transcript(args)
+    profile = open_profile(args)
+    engine = OS13Engine(*values, history_limit=max(10, args.history_limit), fingerprint_pending=pending,
+                        rng=rng, recorder=recorder, content=load_content(args), checkpoint=args.checkpoint,
+                        transcript=transcript, profile=profile)
+    fingerprint.start()
+    try:
+        curses.wrapper(lambda stdscr: OS13Console(
+            stdscr, engine, scrollback=max(0, args.scrollback), fingerprint=fingerprint
+        ).run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if recorder:
+            recorder.close()
+        if transcript:
+            transcript.close()
+        close_profile(profile)
+
+
+class FingerprintProvider:
+    """Finds out who is playing without holding up the first frame.
+    
+    placeholders() answers at once, from the cache of the previous run when
+    there is one. start() resolves the real values on a daemon thread, every
+    probe under one deadline with a fallback, and leaves them in .result
+    for the front end to pick up.
+    """
+    
+    TIMEOUT = 1.5
+    
+    def __init__(self, cache=True, timeout=TIMEOUT):
+        self.cache_path = self.default_cache_path() if cache else None
+        self.timeout = timeout
+        self.cached = None
+        self.result = None
+        self.thread = None
+    
+    @staticmethod
+    def default_cache_path():
+        return os.path.join(cache_dir(), "fingerprint.json")
+    
+    @staticmethod
+    def login_name():
+        try:
+            return os.getlogin()
+        except OSError:
+            # No controlling terminal (session managers, CI, ssh without a tty)
+            import getpass
+            return getpass.getuser()
+    
+    def probes(self):
+        """(probe, fallback) for username, hostname, OS and home directory"""
+        import platform
+        import socket
+        return (
+            (self.login_name, os.environ.get('USER') or os.environ.get('USERNAME') or 'user'),
+            (socket.gethostname, 'localhost'),
+            (platform.system, sys.platform),
+            (partial(os.path.expanduser, "~"), os.environ.get('HOME') or "~"),
+        )
+    
+    def placeholders(self):
+        """(values, pending): the cached fingerprint, or stand-ins to replace later"""
+        self.cached = self.load()
+        if self.cached:
+            return self.cached, False
+        return tuple(fallback for _, fallback in self.probes()), True
+    
+    def resolve(self):
+        """Run every probe at once; whatever is not back by the deadline falls back"""
+        probes = self.probes()
+        values = [fallback for _, fallback in probes]
+        
+        def run(i, probe):
+            try:
+                value = probe()
+            except (OSError, KeyError, ImportError):
+                return
+            if value:
+                values[i] = value
+        
+        workers = [threading.Thread(target=run, args=(i, probe), daemon=True)
+                   for i, (probe, _) in enumerate(probes)]
+        for worker in workers:
+            worker.start()
+        deadline = time.monotonic() + self.timeout
+        for worker in workers:
+            worker.join(max(0.0, deadline - time.monotonic()))
+        return tuple(values)
+    
+    def start(self):
+        self.thread = threading.Thread(target=self.refresh, name="os13-fingerprint", daemon=True)
+        self.thread.start()
+    
+    def refresh(self):
+        result = self.resolve()
+        self.save(result)
+        self.result = result
+    
+    def load(self):
+        if self.cache_path is None:
+            return None
+        try:
+            with open(self.cache_path, encoding='utf-8') as f:
+                values = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if isinstance(values, list) and len(values) == 4 and all(isinstance(v, str) for v in values):
+            return tuple(values)
+        return None
+    
+    def save(self, values):
+        if self.cache_path is None or values == self.cached:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            partial_path = self.cache_path + ".tmp"
+            with open(partial_path, 'w', encoding='utf-8') as f:
+                json.dump(list(values), f)
+            os.replace(partial_path, self.cache_path)
+        except OSError:
+            pass
+
+
+class FrameProfiler:
+    """Opt-in timing for the Tk front end (--profile).
+    
+    A heartbeat after() timer measures how late the event loop runs it, and
+    the hot methods are wrapped with perf_counter timers. Each series is a
+    RollingStats, shown as p50/p95/p99 in a corner overlay and optionally
+    appended to a JSON-lines file for offline analysis.
+    """
+    
+    HEARTBEAT = 20
+    OVERLAY_EVERY = 500
+    WRAPPED = ('process_command', 'show_autocomplete', 'write_line', 'write_lines')
+    
+    def __init__(self, dump_path=None, dump_every=5000, overlay=True):
+        self.dump_path = dump_path
+        self.dump_every = dump_every
+        self.overlay = overlay
+        self.stats = {}
+        self.terminal = None
+        self.label = None
+        self.started = time.perf_counter()
+        self.expected = None
+        self.last_overlay = 0.0
+        self.last_dump = 0.0
+    
+    def series(self, name):
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = RollingStats(capacity=1024, low=1e-6, high=10.0)
+        return stats
+    
+    def wrap(self, owner, name):
+        """Replace owner.name with a timed version, on the instance only"""
+        func = getattr(owner, name)
+        stats = self.series(name)
+        clock = time.perf_counter
+        
+        def timed(*args, **kwargs):
+            start = clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stats.add(clock() - start)
+        
+        setattr(owner, name, timed)
+    
+    def attach(self, terminal):
+        """Instrument a terminal; call before its key bindings are made"""
+        self.terminal = terminal
+        for name in self.WRAPPED:
+            self.wrap(terminal, name)
+        # Commands are dispatched by name, so instance wrappers are picked up
+        for name in dir(terminal.engine):
+            if name.startswith('cmd_'):
+                self.wrap(terminal.engine, name)
+        if self.overlay:
+            self.label = tk.Label(
+                terminal.root,
+                text="",
+                fg='#555555',
+                bg='#0a0a0a',
+                font=('Courier', 8),
+                justify=tk.RIGHT
+            )
+            self.label.place(relx=1.0, x=-10, y=10, anchor='ne')
+        self.expected = time.perf_counter() + self.HEARTBEAT / 1000.0
+        terminal.root.after(self.HEARTBEAT, self.heartbeat)
+    
+    def heartbeat(self):
+        now = time.perf_counter()
+        self.series('loop_lag').add(max(0.0, now - self.expected))
+        self.expected = now + self.HEARTBEAT / 1000.0
+        self.terminal.root.after(self.HEARTBEAT, self.heartbeat)
+        
+        if self.label is not None and now - self.last_overlay >= self.OVERLAY_EVERY / 1000.0:
+            self.last_overlay = now
+            self.label.config(text=self.overlay_text())
+        if self.dump_path and now - self.last_dump >= self.dump_every / 1000.0:
+            self.last_dump = now
+            self.dump()
+    
+    def overlay_text(self):
+        rows = []
+        for name in ('loop_lag', 'process_command', 'show_autocomplete'):
+            stats = self.stats.get(name)
+            if stats:
+                p50, p95, p99 = (stats.percentile(q) * 1000 for q in (50, 95, 99))
+                rows.append(f"{name} {p50:.1f}/{p95:.1f}/{p99:.1f}ms")
+        rows.append(f"pending {self.terminal.timeline.pending}")
+        return "\n".join(rows)
+    
+    def snapshot(self):
+        timings = {}
+        for name, stats in sorted(self.stats.items()):
+            if stats.total:
+                timings[name] = {
+                    'count': stats.total,
+                    'mean_ms': round(stats.mean * 1000, 4),
+                    'p50_ms': round(stats.percentile(50) * 1000, 4),
+                    'p95_ms': round(stats.percentile(95) * 1000, 4),
+                    'p99_ms': round(stats.percentile(99) * 1000, 4),
+                }
+        return {
+            'uptime_s': round(time.perf_counter() - self.started, 3),
+            'timeline_pending': self.terminal.timeline.pending,
+            'timings': timings,
+        }
+    
+    def dump(self):
+        try:
+            with open(self.dump_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(self.snapshot()) + "\n")
+        except OSError:
+            # Profiling must never take the game down with it
+            self.dump_path = None
+
+
+class StartupProfile:
+    """--startup-profile: how long each phase of a cold start took.
+    
+    Phases are timed back to back from when OS13.py started importing, so
+    together they add up to the time to the first drawn prompt.
+    """
+    
+    def __init__(self, started=IMPORT_STARTED):
+        self.last = started
+        self.phases = []
+    
+    def mark(self, phase):
+        """End the current phase, naming it"""
+        now = time.perf_counter()
+        self.phases.append((phase, (now - self.last) * 1000))
+        self.last = now
+    
+    def report(self, file=None):
+        total = sum(ms for _, ms in self.phases)
+        rows = [f"  {phase:<12} {ms:8.1f} ms" for phase, ms in self.phases]
+        rows.append(f"  {'total':<12} {total:8.1f} ms")
+        print("OS13 startup:", *rows, sep="\n", file=file or sys.stderr)
+
+
+class LineStore:
+    """Every line the Tk window has shown, kept compactly on the Python side.
+    
+    Lines are runs of (text, tag) segments stored in parallel arrays: the
+    texts in a list, their tags as indexes into tag_names, and the first
+    segment of each line in starts. Line numbers are absolute, so they stay
+    valid when limit (0 = no limit) makes the oldest lines go, a chunk at
+    a time; the lines still held are first:end.
+    """
+    
+    def __init__(self, limit=0):
+        self.limit = limit
+        self.chunk = max(50, limit // 10)
+        self.texts = []
+        self.tags = array('H')
+        self.starts = array('L', [0])
+        self.tag_names = [None]
+        self.tag_ids = {None: 0}
+        self.first = 0
+    
+    def __len__(self):
+        return len(self.starts) - 1
+    
+    @property
+    def end(self):
+        return self.first + len(self.starts) - 1
+    
+    def append(self, segments):
+        """Add one line made of (text, tag) segments"""
+        for text, tag in segments:
+            tag_id = self.tag_ids.get(tag)
+            if tag_id is None:
+                tag_id = self.tag_ids[tag] = len(self.tag_names)
+                self.tag_names.append(tag)
+            self.texts.append(text)
+            self.tags.append(tag_id)
+        self.starts.append(len(self.texts))
+        if self.limit and len(self) - self.limit >= self.chunk:
+            self.drop(len(self) - self.limit)
+    
+    def drop(self, count):
+        """Forget the oldest count lines"""
+        cut = self.starts[count]
+        del self.texts[:cut]
+        del self.tags[:cut]
+        self.starts = array('L', [start - cut for start in self.starts[count:]])
+        self.first += count
+    
+    def insert_args(self, start, stop):
+        """Text.insert() arguments for lines start:stop, each ending in a newline"""
+        texts, tags, names, starts = self.texts, self.tags, self.tag_names, self.starts
+        args = []
+        for line in range(max(start, self.first) - self.first, min(stop, self.end) - self.first):
+            begin, end = starts[line], starts[line + 1]
+            if begin == end:
+                args += ("\n", ())
+                continue
+            for i in range(begin, end - 1):
+                args += (texts[i], names[tags[i]] or ())
+            args += (texts[end - 1] + "\n", names[tags[end - 1]] or ())
+        return args
+    
+    def line(self, number):
+        """Plain text of one stored line"""
+        index = number - self.first
+        return "".join(self.texts[self.starts[index]:self.starts[index + 1]])
+
+
+class OS13Terminal:
+    """Tk front end: renders OS13Engine output into a terminal-like window.
+    
+    The whole transcript lives in a LineStore; the Text widget only holds
+    the screenful being looked at (plus a screen of margin) and the line
+    being typed, so scrolling, resizing and writing cost the same at
+    command 10 as at command 10,000.
+    """
+    
+    FINGERPRINT_POLL = 50
+    TAG_STYLES = {
+        'error': {'foreground': '#ff0000'},
+        'warning': {'foreground': '#ffaa00'},
+        'ghost': {'foreground': '#444444'},
+        'glitch': {'foreground': '#ff00ff'},
+        'whisper': {'foreground': '#006600'},
+        'system': {'foreground': '#00aaff'},
+        'meta': {'foreground': '#ff00ff', 'font': ('Courier', 12, 'italic')},
+        'programmer': {'foreground': '#ffff00'},
+    }
+    
+    def __init__(self, root, autocomplete_delay=16, history_limit=1000, scrollback=0, fingerprint=None,
+                 rng=None, recorder=None, profiler=None, content=None, checkpoint=None, transcript=None,
+                 profile=None, startup=None):
+        import_tk()
+        self.root = root
+        self.root.title("OS13 Terminal")
+        self.root.configure(bg='#0a0a0a')
+        self.root.geometry("900x600")
+        
+        # The story itself runs headless; this class only renders it
+        # Never wait on the fingerprint: boot on placeholders, fill in later
+        self.fingerprint = fingerprint or FingerprintProvider()
+        values, pending = self.fingerprint.placeholders()
+        self.engine = OS13Engine(*values, history_limit=history_limit, fingerprint_pending=pending,
+                                 rng=rng, recorder=recorder, content=content, checkpoint=checkpoint,
+                                 transcript=transcript, profile=profile)
+        self.fingerprint.start()
+        self.prompt_index = None
+        if startup:
+            startup.mark('engine')
+        
+        # Webcam indicator (fake)
+        self.webcam_indicator = tk.Label(
+            root,
+            text="●",
+            fg='#0a0a0a',
+            bg='#0a0a0a',
+            font=('Arial', 10, 'bold')
+        )
+        self.webcam_indicator.place(x=10, y=10)
+        
+        # Create custom font
+        self.term_font = tkfont.Font(family="Courier", size=12)
+        
+        # Our own scrollbar: the Text can't know how long the transcript is
+        self.scrollbar = tk.Scrollbar(
+            root,
+            command=self.on_scrollbar,
+            bg='#1a1a1a',
+            troughcolor='#0a0a0a',
+            activebackground='#333333',
+            bd=0,
+            highlightthickness=0,
+            width=10
+        )
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        # Create text widget
+        self.text = tk.Text(
+            root,
+            bg='#0a0a0a',
+            fg='#00ff00',
+            insertbackground='#00ff00',
+            font=self.term_font,
+            padx=10,
+            pady=10,
+            wrap=tk.WORD
+        )
+        self.text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        # Everything ever written, and which part of it the Text shows: the
+        # "live" mark starts the line being typed; above it are stored lines
+        # from view_top, or the newest ones while view_top is None
+        self.lines = LineStore(scrollback)
+        self.view_top = None
+        self.view_floor = 0
+        self.rows = 40
+        self.linespace = None
+        self.text.mark_set("live", "1.0")
+        self.text.mark_gravity("live", tk.LEFT)
+        self.scroll_pending = None
+        
+        # Tag styles are configured on first use; the meta font can wait
+        self.styled_tags = set()
+        
+        # Autocomplete popup (built on first use, then only moved, refilled and withdrawn)
+        self.autocomplete_limit = 5
+        self.autocomplete_window = None
+        self.autocomplete_labels = []
+        self.autocomplete_label_state = []
+        self.autocomplete_shown = 0
+        self.autocomplete_visible = False
+        self.autocomplete_geometry = None
+        
+        # All timed story output goes through one scheduler
+        self.timeline = Timeline(root)
+        self.timeline.observer = self.engine.timeline_ran
+        
+        # ...and every visual effect through one fixed-rate clock
+        self.animation = AnimationClock(root)
+        self.animation.add_widget(self.text, bg='#0a0a0a', fg='#00ff00')
+        self.animation.add_widget(self.webcam_indicator, fg='#0a0a0a')
+        
+        # Keystroke pipeline: a burst of key releases collapses into a single
+        # autocomplete update (0 = next idle callback, otherwise a delay in ms)
+        self.autocomplete_delay = autocomplete_delay
+        self.autocomplete_pending = None
+        self.autocomplete_last_input = None
+        
+        self.profiler = profiler
+        if profiler:
+            profiler.attach(self)
+        
+        # Bind keys
+        self.text.bind('<Return>', self.process_command)
+        self.text.bind('<KeyRelease>', self.on_key_release)
+        self.text.bind('<Key>', self.track_typing)
+        
+        # Scrolling moves the window over the line store, never the Text itself
+        self.text.bind('<MouseWheel>', lambda event: self.scroll_by(-3 if event.delta > 0 else 3))
+        self.text.bind('<Button-4>', lambda event: self.scroll_by(-3))
+        self.text.bind('<Button-5>', lambda event: self.scroll_by(3))
+        self.text.bind('<Prior>', lambda event: self.scroll_by(-self.rows))
+        self.text.bind('<Next>', lambda event: self.scroll_by(self.rows))
+        self.text.bind('<Configure>', self.on_resize)
+        if startup:
+            startup.mark('widgets')
+        
+        # Initial prompt
+        self.render(self.engine.boot())
+        self.show_prompt()
+        self.root.after(self.FINGERPRINT_POLL, self.poll_fingerprint)
+        if startup:
+            startup.mark('boot')
+        
+    def poll_fingerprint(self):
+        """Pick up the background fingerprint once it has resolved"""
+        result = self.fingerprint.result
+        if result is None:
+            self.root.after(self.FINGERPRINT_POLL, self.poll_fingerprint)
+            return
+        if not self.engine.fingerprint_pending:
+            # Booted from the cache: just refresh it quietly
+            self.engine.run(self.engine.set_fingerprint, *result)
+            return
+        # Boot said "Detecting user..."; finish that before the prompt,
+        # keeping whatever the player already typed
+        typed = self.text.get(self.prompt_index, "end-1c")
+        self.text.delete(f"{self.prompt_index} linestart", tk.END)
+        self.render(self.engine.run(self.engine.set_fingerprint, *result))
+        self.show_prompt()
+        self.text.insert(tk.END, typed)
+        
+    def track_typing(self, event):
+        if self.view_top is not None and event.char:
+            # Typing brings the prompt back into view, as in a real terminal
+            self.follow()
+        self.render(self.engine.run(self.engine.track_typing, event.keysym, event.char))
+    
+    def show_prompt(self):
+        prompt = f"{self.engine.user_name}@OS13:~$ "
+        self.text.insert(tk.END, prompt)
+        # A mark (not a fixed "line.col" index) so trimming can't invalidate it
+        self.text.mark_set("prompt", tk.END + "-1c")
+        self.text.mark_gravity("prompt", tk.LEFT)
+        self.prompt_index = "prompt"
+        self.text.mark_set("insert", tk.END)
+        self.schedule_scroll()
+        
+    def write_line(self, text, tag=None):
+        self.write_lines(((text, tag),))
+    
+    def write_lines(self, segments):
+        """Write a list of (text, tag) lines with a single Text.insert"""
+        args = []
+        for text, tag in segments:
+            if tag and tag not in self.styled_tags:
+                self.style_tag(tag)
+            args.append(text + "\n")
+            args.append(tag or ())
+        if not args:
+            return
+        self.store(zip(args[::2], args[1::2]))
+        self.text.insert(tk.END, *args)
+        self.text.mark_set("live", "end-1c")
+        self.trim_view()
+        self.schedule_scroll()
+    
+    def write_text(self, text, tag=None):
+        """Output that need not end the line (text typed by itself, Return)"""
+        if tag and tag not in self.styled_tags:
+            self.style_tag(tag)
+        if "\n" in text:
+            self.store(((text, tag),))
+            self.text.insert(tk.END, text, tag or ())
+            self.text.mark_set("live", "end-1c linestart")
+            self.trim_view()
+        else:
+            self.text.insert(tk.END, text, tag or ())
+        self.schedule_scroll()
+    
+    def store(self, segments):
+        """Copy text about to go in at the end into the line store, line by line"""
+        line = self.open_segments()
+        for text, tag in segments:
+            *done, rest = text.split("\n")
+            for piece in done:
+                if piece:
+                    line.append((piece, tag or None))
+                self.lines.append(line)
+                line = []
+            if rest:
+                line.append((rest, tag or None))
+    
+    def open_segments(self):
+        """The line being typed, as (text, tag) segments read back from the Text"""
+        segments = []
+        tags = []
+        for key, value, _ in self.text.dump("live", "end-1c", text=True, tag=True):
+            if key == 'text':
+                tag = next((tag for tag in reversed(tags) if tag in self.styled_tags), None)
+                segments.append((value, tag))
+            elif key == 'tagon':
+                tags.append(value)
+            elif key == 'tagoff' and value in tags:
+                tags.remove(value)
+        return segments
+    
+    def style_tag(self, tag):
+        self.text.tag_config(tag, **self.TAG_STYLES.get(tag, {}))
+        self.styled_tags.add(tag)
+    
+    def schedule_scroll(self):
+        """Scroll to the end once, after everything queued this frame is written"""
+        if self.scroll_pending is None:
+            self.scroll_pending = self.root.after_idle(self.scroll_to_end)
+    
+    def scroll_to_end(self):
+        self.scroll_pending = None
+        if self.view_top is None:
+            self.text.see(tk.END)
+        self.update_scrollbar()
+    
+    def trim_view(self):
+        """While following the output, keep about two screens of it in the Text"""
+        if self.view_top is not None:
+            return
+        lines = int(self.text.index("live").split(".")[0]) - 1
+        excess = lines - 2 * self.rows
+        if excess >= self.rows:
+            self.text.delete("1.0", f"{excess + 1}.0")
+    
+    def fill_view(self, start, stop):
+        """Replace everything above the typed line with stored lines start:stop"""
+        start = max(start, self.lines.first)
+        stop = max(start, min(stop, self.lines.end))
+        self.text.delete("1.0", "live")
+        if stop > start:
+            self.text.insert("1.0", *self.lines.insert_args(start, stop))
+        self.text.mark_set("live", f"{stop - start + 1}.0")
+    
+    def scroll_by(self, lines):
+        top = self.view_top
+        if top is None:
+            top = max(self.view_floor, self.lines.end - self.rows)
+        self.scroll_to(top + lines)
+        return "break"
+    
+    def scroll_to(self, top):
+        """Show the stored lines from top; at the bottom, follow the output again"""
+        top = max(self.lines.first, top)
+        if top >= max(self.view_floor, self.lines.end - self.rows):
+            self.follow()
+            return
+        if top != self.view_top:
+            self.view_top = top
+            self.fill_view(top, top + 2 * self.rows)
+            self.text.yview_moveto(0.0)
+        self.update_scrollbar()
+    
+    def follow(self):
+        if self.view_top is None:
+            return
+        self.view_top = None
+        self.fill_view(max(self.view_floor, self.lines.end - 2 * self.rows), self.lines.end)
+        self.schedule_scroll()
+    
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == 'moveto':
+            span = self.lines.end - self.lines.first + 1
+            self.scroll_to(self.lines.first + int(float(amount) * span))
+        else:
+            self.scroll_by(int(amount) * (self.rows if unit == 'pages' else 1))
+    
+    def update_scrollbar(self):
+        first = self.lines.first
+        span = self.lines.end - first + 1
+        top = self.view_top
+        if top is None:
+            top = max(first, self.lines.end + 1 - self.rows)
+        self.scrollbar.set((top - first) / span, min(1.0, (top - first + self.rows) / span))
+    
+    def on_resize(self, event):
+        if self.linespace is None:
+            self.linespace = max(1, self.term_font.metrics('linespace'))
+        rows = max(1, event.height // self.linespace)
+        if rows != self.rows:
+            self.rows = rows
+            if self.view_top is not None:
+                self.fill_view(self.view_top, self.view_top + 2 * rows)
+            self.update_scrollbar()
+        
+    def get_current_input(self):
+        if self.prompt_index:
+            return self.text.get(self.prompt_index, "end-1c").strip()
+        return ""
+    
+    def on_key_release(self, event):
+        if event.keysym in ['Return', 'Up', 'Down', 'Left', 'Right', 'Shift_L', 'Shift_R', 'Control_L', 'Control_R']:
+            return
+        
+        if self.autocomplete_pending is None:
+            if self.autocomplete_delay > 0:
+                self.autocomplete_pending = self.root.after(self.autocomplete_delay, self.update_autocomplete)
+            else:
+                self.autocomplete_pending = self.root.after_idle(self.update_autocomplete)
+    
+    def update_autocomplete(self):
+        """Refresh the popup once per burst, and only if the input changed"""
+        self.autocomplete_pending = None
+        current_input = self.get_current_input()
+        
+        state = (current_input, self.engine.anomaly_level)
+        if state == self.autocomplete_last_input:
+            return
+        self.autocomplete_last_input = state
+        
+        if len(current_input) > 0 and self.engine.anomaly_level > 0:
+            self.show_autocomplete(current_input)
+        else:
+            self.hide_autocomplete()
+    
+    def cancel_autocomplete(self):
+        if self.autocomplete_pending is not None:
+            self.root.after_cancel(self.autocomplete_pending)
+            self.autocomplete_pending = None
+        self.autocomplete_last_input = None
+        self.hide_autocomplete()
+    
+    def build_autocomplete(self):
+        """Create the autocomplete popup and its label pool, the first time it's needed"""
+        self.autocomplete_window = tk.Toplevel(self.root)
+        self.autocomplete_window.wm_overrideredirect(True)
+        self.autocomplete_window.withdraw()
+        
+        frame = tk.Frame(self.autocomplete_window, bg='#1a1a1a', relief=tk.SOLID, bd=1)
+        frame.pack()
+        
+        for _ in range(self.autocomplete_limit):
+            label = tk.Label(
+                frame,
+                text="",
+                bg='#1a1a1a',
+                fg='#00ff00',
+                font=self.term_font,
+                anchor='w',
+                padx=5,
+                pady=2
+            )
+            self.autocomplete_labels.append(label)
+            self.autocomplete_label_state.append(("", '#00ff00'))
+    
+    def show_autocomplete(self, partial):
+        suggestions = self.engine.get_creepy_suggestions(partial)
+        
+        if not suggestions:
+            self.hide_autocomplete()
+            return
+        if self.autocomplete_window is None:
+            self.build_autocomplete()
+        
+        x = self.root.winfo_x() + 20
+        y = self.root.winfo_y() + self.root.winfo_height() - 200
+        geometry = f"+{x}+{y}"
+        if geometry != self.autocomplete_geometry:
+            self.autocomplete_window.wm_geometry(geometry)
+            self.autocomplete_geometry = geometry
+        
+        level = self.engine.anomaly_level
+        color = '#00ff00' if level < 3 else ('#ffaa00' if level < 5 else '#ff0000')
+        shown = min(len(suggestions), self.autocomplete_limit)
+        
+        # Only touch labels whose text or color actually changed
+        for i in range(shown):
+            state = (suggestions[i], color)
+            if self.autocomplete_label_state[i] != state:
+                self.autocomplete_labels[i].configure(text=state[0], fg=color)
+                self.autocomplete_label_state[i] = state
+        
+        # Pack/unpack only the rows that appeared or disappeared
+        for label in self.autocomplete_labels[self.autocomplete_shown:shown]:
+            label.pack(fill=tk.X)
+        for label in self.autocomplete_labels[shown:self.autocomplete_shown]:
+            label.pack_forget()
+        self.autocomplete_shown = shown
+        
+        if not self.autocomplete_visible:
+            self.autocomplete_window.deiconify()
+            self.autocomplete_visible = True
+    
+    def hide_autocomplete(self):
+        if self.autocomplete_visible:
+            self.autocomplete_window.withdraw()
+            self.autocomplete_visible = False
+    
+    def process_command(self, event):
+        self.cancel_autocomplete()
+        command = self.get_current_input()
+        
+        self.follow()
+        self.write_text("\n")
+        self.render(self.engine.submit(command))
+        self.show_prompt()
+        return "break"
+    
+    def render(self, events):
+        """Draw engine events; consecutive lines go out in one write_lines"""
+        lines = []
+        for event in events:
+            if event.kind == 'line' and not event.delay:
+                lines.append((event.text, event.tag))
+                continue
+            if lines:
+                self.write_lines(lines)
+                lines = []
+            if event.delay:
+                due = event._replace(delay=0)
+                self.timeline.schedule([(event.delay, partial(self.render, (due,)))], event.group)
+            elif event.kind == 'call':
+                self.render(self.engine.run(event.action))
+            elif event.kind == 'quit':
+                self.timeline.cancel()
+                self.animation.cancel()
+                self.root.destroy()
+                return
+            else:
+                self.render_effect(event)
+        if lines:
+            self.write_lines(lines)
+    
+    def render_effect(self, event):
+        if event.kind == 'text':
+            self.write_text(event.text, event.tag)
+        elif event.kind == 'cancel':
+            self.timeline.cancel(event.group)
+        elif event.kind == 'clear':
+            # Clears the screen, not the transcript: it can still be scrolled back to
+            self.follow()
+            self.text.delete(1.0, tk.END)
+            self.view_floor = self.lines.end
+        elif event.kind == 'webcam':
+            if event.text == 'on':
+                self.animation.start('webcam', self.webcam_indicator, fg='#ff0000')
+            else:
+                self.animation.stop('webcam')
+        elif event.kind == 'flash':
+            self.flash_screen()
+    
+    def flash_screen(self):
+        self.animation.start('flash', self.text, duration=50, bg='#ffffff', fg='#000000')
 
 if __name__ == "__main__":
+    startup = StartupProfile()
+    startup.mark('imports')
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="OS13 Terminal")
+    parser.add_argument(
+        "--autocomplete-delay",
+        type=int,
+        default=16,
+        metavar="MS",
+        help="coalesce keystrokes for this many ms before updating autocomplete "
+             "(0 = next idle callback; raise it on slow thin clients)"
+    )
+    parser.add_argument(
+        "--scrollback",
+        type=int,
+        default=0,
+        metavar="LINES",
+        help="lines of output kept for scrolling back (0 = the whole session)"
+    )
+    parser.add_argument(
+        "--history-limit",
+        type=int,
+        default=1000,
+        metavar="N",
+        help="number of commands kept for 'history' (keyword counts always cover the whole session)"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="don't keep anything in the cache directory (detected user/host/OS, compiled content packs)"
+    )
+    parser.add_argument(
+        "--content",
+        action="append",
+        default=[],
+        metavar="FILE",
+        help="extra JSON content pack; its pools replace the bundled ones (repeatable)"
+    )
+    parser.add_argument(
+        "--curses",
+        action="store_true",
+        help="play in the terminal instead of a Tk window (works over ssh)"
+    )
+    parser.add_argument(
+        "--serve",
+        metavar="[HOST:]PORT",
+        help="serve OS13 to telnet clients, one session per connection"
+    )
+    parser.add_argument(
+        "--max-sessions",
+        type=int,
+        default=2000,
+        metavar="N",
+        help="connections --serve accepts at once"
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="no window: read commands from stdin and print the responses"
+    )
+    parser.add_argument(
+        "--gap",
+        type=int,
+        default=1000,
+        metavar="MS",
+        help="virtual time between commands in --headless mode (and after the last one in --replay)"
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="show event-loop lag and handler timings (p50/p95/p99) in the corner"
+    )
+    parser.add_argument(
+        "--profile-dump",
+        metavar="FILE",
+        help="append the profiling numbers to FILE as JSON lines every few seconds (implies --profile)"
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        metavar="N",
+        help="seed the story's random choices (a --record log stores the seed it used)"
+    )
+    parser.add_argument(
+        "--record",
+        metavar="FILE",
+        help="write every keystroke and command, with timings and the seed, to FILE"
+    )
+    parser.add_argument(
+        "--checkpoint",
+        metavar="FILE",
+        help="save the story's progress to FILE after every command and resume from it on the next start"
+    )
+    parser.add_argument(
+        "--transcript",
+        metavar="FILE",
+        help="keep every command and line of output in FILE, across sessions, for the in-game grep"
+    )
+    parser.add_argument(
+        "--remember",
+        metavar="FILE",
+        help="keep a profile of each player in the SQLite database FILE, so coming back is noticed"
+    )
+    parser.add_argument(
+        "--replay",
+        metavar="FILE",
+        help="play back a --record log without a window and print what happens"
+    )
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        metavar="X",
+        help="--replay speed as a multiple of the original (0 = as fast as possible)"
+    )
+    parser.add_argument(
+        "--startup-profile",
+        action="store_true",
+        help="print how long each phase of startup took, up to the first prompt"
+    )
+    args = parser.parse_args()
+    startup.mark('arguments')
+    
+    if args.replay:
+        run_replay(args)
+        sys.exit(0)
+    if args.headless:
+        run_headless(args)
+        sys.exit(0)
+    if args.serve:
+        run_server(args)
+        sys.exit(0)
+    if args.curses:
+        run_console(args)
+        sys.exit(0)
+    try:
+        import_tk()
+    except ImportError:
+        sys.exit("OS13: tkinter is not available; try --curses")
+    startup.mark('tkinter')
+    
+    rng, recorder = open_session(args)
+    transcript = open_transcript(args)
+    profile = open_profile(args)
+    content = load_content(args)
+    startup.mark('content')
     root = tk.Tk()
-    terminal = OS13Terminal(root)
-    root.mainloop()
\ No newline at end of file
+    startup.mark('window')
+    terminal = OS13Terminal(
+        root,
+        autocomplete_delay=max(0, args.autocomplete_delay),
+        history_limit=max(10, args.history_limit),
+        scrollback=max(0, args.scrollback),
+        fingerprint=FingerprintProvider(cache=not args.no_cache),
+        rng=rng,
+        recorder=recorder,
+        checkpoint=args.checkpoint,
+        transcript=transcript,
+        profile=profile,
+        profiler=FrameProfiler(args.profile_dump) if args.profile or args.profile_dump else None,
+        content=content,
+        startup=startup
+    )
+    if args.startup_profile:
+        # Idle callbacks run in order, so this one comes after the first redraw
+        root.after_idle(lambda: (startup.mark('first frame'), startup.report()))
+    root.mainloop()
+    if recorder:
+        recorder.close()
+    if transcript:
+        transcript.close()
+    close_profile(profile)
\ No newline at end of file
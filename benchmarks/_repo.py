@@ -0,0 +1,11 @@
+"""Imported first by every benchmark: puts the checkout's OS13.py on sys.path.
+
+The scripts run as python benchmarks/<name>.py, which puts this directory
+on sys.path, not the repository root above it.
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
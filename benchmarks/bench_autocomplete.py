@@ -0,0 +1,69 @@
+"""Per-keystroke cost of the autocomplete popup: rebuild-per-key vs reused pool.
+
+Needs a display (run under Xvfb on headless boxes):
+
+    xvfb-run python benchmarks/bench_autocomplete.py
+"""
+import sys
+import time
+import tkinter as tk
+
+import _repo  # puts the repo root on sys.path
+from OS13 import OS13Terminal
+
+KEYSTROKES = 2000
+TYPED = ["l", "ls", "c", "ca", "cat", "w", "wh", "who", "h", "he", "m", "me", "met", "meta"]
+
+
+def legacy_show_autocomplete(terminal, partial):
+    """The old behaviour: destroy and rebuild the whole popup on every key"""
+    suggestions = terminal.engine.get_creepy_suggestions(partial)
+    if not suggestions:
+        return
+    if terminal.legacy_window:
+        terminal.legacy_window.destroy()
+    terminal.legacy_window = tk.Toplevel(terminal.root)
+    terminal.legacy_window.wm_overrideredirect(True)
+    x = terminal.root.winfo_x() + 20
+    y = terminal.root.winfo_y() + terminal.root.winfo_height() - 200
+    terminal.legacy_window.wm_geometry(f"+{x}+{y}")
+    frame = tk.Frame(terminal.legacy_window, bg='#1a1a1a', relief=tk.SOLID, bd=1)
+    frame.pack()
+    for suggestion in suggestions[:5]:
+        tk.Label(frame, text=suggestion, bg='#1a1a1a', fg='#ffaa00',
+                 font=terminal.term_font, anchor='w', padx=5, pady=2).pack(fill=tk.X)
+
+
+def run(label, show, terminal):
+    root = terminal.root
+    start = time.perf_counter()
+    for i in range(KEYSTROKES):
+        show(TYPED[i % len(TYPED)])
+        root.update()
+    elapsed = time.perf_counter() - start
+    print(f"{label:>8}: {elapsed / KEYSTROKES * 1e6:8.1f} us/keystroke")
+    return elapsed
+
+
+def main():
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"needs a display: {e}")
+        return 1
+    terminal = OS13Terminal(root)
+    terminal.engine.anomaly_level = 3
+    terminal.legacy_window = None
+    root.update()
+
+    before = run("before", lambda p: legacy_show_autocomplete(terminal, p), terminal)
+    if terminal.legacy_window:
+        terminal.legacy_window.destroy()
+    after = run("after", terminal.show_autocomplete, terminal)
+    print(f"{'speedup':>8}: {before / after:8.1f}x")
+    root.destroy()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
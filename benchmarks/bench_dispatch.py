@@ -0,0 +1,91 @@
+"""Command dispatch: the old if/elif chain vs the CommandRegistry.
+
+Runs without a display; only the lookup is timed, not the handlers.
+
+    python benchmarks/bench_dispatch.py
+"""
+import sys
+import time
+
+import _repo  # puts the repo root on sys.path
+from OS13 import COMMANDS
+
+# Roughly what a real session looks like: mostly ls/cat/help, a few rare ones
+MIX = (
+    ["ls"] * 12 + ["ls -la"] * 4 + ["cat readme.txt"] * 8 + ["cat notes.txt"] * 2
+    + ["help"] * 6 + ["whoami"] * 5 + ["date"] * 3 + ["pwd"] * 3 + ["history"] * 3
+    + ["echo hello there"] * 4 + ["clear"] * 2 + ["exit"] * 3 + ["sudo rm -rf /"] * 2
+    + ["rm secrets.txt"] * 2 + ["meta"] * 2 + ["who is the programmer"] + ["shutdown now"]
+    + ["format c:"] + ["freedom"] + ["help me please"] * 2 + ["asdf"] * 3
+)
+ROUNDS = 20000
+
+
+def legacy_dispatch(cmd):
+    """The pre-registry chain, returning the handler it would have called"""
+    cmd_lower = cmd.strip().lower()
+    if cmd_lower == 'freedom':
+        return 'cmd_freedom'
+    if 'meta' in cmd_lower or 'programmer' in cmd_lower or 'developer' in cmd_lower or 'creator' in cmd_lower:
+        return 'cmd_meta'
+    if cmd_lower == 'help':
+        return 'cmd_help'
+    elif cmd_lower == 'ls' or cmd_lower.startswith('ls '):
+        return 'cmd_ls'
+    elif cmd_lower == 'whoami':
+        return 'cmd_whoami'
+    elif cmd_lower == 'date':
+        return 'cmd_date'
+    elif cmd_lower == 'clear':
+        return 'cmd_clear'
+    elif cmd_lower.startswith('cat '):
+        return 'cmd_cat'
+    elif cmd_lower.startswith('echo '):
+        return 'cmd_echo'
+    elif cmd_lower == 'history':
+        return 'cmd_history'
+    elif cmd_lower == 'exit' or cmd_lower == 'logout':
+        return 'cmd_exit'
+    elif cmd_lower == 'pwd':
+        return 'cmd_pwd'
+    elif cmd_lower.startswith('rm ') or cmd_lower.startswith('del '):
+        return 'cmd_rm'
+    elif cmd_lower.startswith('sudo '):
+        return 'cmd_sudo'
+    elif 'format' in cmd_lower or 'shutdown' in cmd_lower or 'reboot' in cmd_lower:
+        return 'cmd_system'
+    else:
+        return 'cmd_unknown'
+
+
+def registry_dispatch(cmd):
+    return COMMANDS.resolve(cmd.strip().lower())[0][0]
+
+
+def uncached_dispatch(cmd):
+    return COMMANDS.lookup(cmd.strip().lower())[0][0]
+
+
+def bench(label, dispatch):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for cmd in MIX:
+            dispatch(cmd)
+    elapsed = time.perf_counter() - start
+    per_call = elapsed / (ROUNDS * len(MIX)) * 1e9
+    print(f"{label:>9}: {per_call:8.1f} ns/command")
+    return elapsed
+
+
+def main():
+    for cmd in MIX:
+        assert legacy_dispatch(cmd) == registry_dispatch(cmd), cmd
+    legacy = bench("if/elif", legacy_dispatch)
+    uncached = bench("uncached", uncached_dispatch)
+    registry = bench("registry", registry_dispatch)
+    print(f"{'speedup':>9}: {legacy / registry:8.2f}x ({legacy / uncached:.2f}x uncached)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+"""Scripted sessions per second through the headless engine (no display).
+
+Each session plays a 60-command script that crosses the command-30 fifth
+wall and the command-50 escape hints, then walks through the escape.
+
+    python benchmarks/bench_headless.py --sessions 500
+"""
+import argparse
+import random
+import sys
+import time
+
+import _repo  # puts the repo root on sys.path
+from OS13 import HeadlessSession, OS13Engine
+
+COMMANDS = ["ls", "whoami", "date", "pwd", "help", "history", "echo hello", "cat notes.txt",
+            "cat readme", "sudo ls", "rm junk", "meta", "format c:", "clear", "xyzzy"]
+
+
+def script(rng):
+    commands = [rng.choice(COMMANDS) for _ in range(55)]
+    return commands + ["", "freedom", "", "tired", "no", "thanks"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=13)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    escaped = 0
+    start = time.perf_counter()
+    for _ in range(args.sessions):
+        engine = OS13Engine("player", "station", "Linux", "/home/player", rng=random.Random(rng.random()))
+        session = HeadlessSession(engine)
+        session.run(script(rng), gap=1500)
+        session.advance(15000)
+        escaped += session.closed
+    elapsed = time.perf_counter() - start
+    print(f"{args.sessions} sessions in {elapsed:.2f}s: {args.sessions / elapsed:.0f} sessions/s, "
+          f"{args.sessions * 61 / elapsed:.0f} commands/s, {escaped} escaped")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""Long-session benchmark: write, scroll and memory over 10k+ commands.
+
+The Text widget only holds what is on screen, so its line count and the
+write and scroll latencies should stay flat as the session grows; only
+the line store behind it (capped with --scrollback N) keeps growing.
+
+    xvfb-run python benchmarks/bench_long_session.py --commands 12000
+"""
+import argparse
+import resource
+import sys
+import time
+import tkinter as tk
+import tracemalloc
+
+import _repo  # puts the repo root on sys.path
+from OS13 import OS13Terminal
+
+# No exit/freedom: those would tear the window down mid-run
+COMMANDS = ["ls", "whoami", "date", "pwd", "help", "history", "echo hello",
+            "cat notes.txt", "cat readme", "sudo ls", "rm junk", "meta", "xyzzy"]
+
+
+def run_command(terminal, command):
+    terminal.text.insert("end", command)
+    terminal.process_command(None)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--commands", type=int, default=10000)
+    parser.add_argument("--block", type=int, default=1000)
+    parser.add_argument("--scrollback", type=int, default=0)
+    args = parser.parse_args()
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"needs a display: {e}")
+        return 1
+    terminal = OS13Terminal(root, scrollback=args.scrollback)
+    tracemalloc.start()
+
+    print(f"{'commands':>9} {'stored':>7} {'in Text':>7} {'write_line us':>14} {'scroll us':>10} "
+          f"{'py KiB':>9} {'rss KiB':>9}")
+    for block in range(args.commands // args.block):
+        for i in range(args.block):
+            run_command(terminal, COMMANDS[i % len(COMMANDS)])
+            if i % 50 == 0:
+                root.update()
+        start = time.perf_counter()
+        for _ in range(200):
+            terminal.write_line("probe line", 'ghost')
+        insert_us = (time.perf_counter() - start) / 200 * 1e6
+        root.update()
+        # Page through the whole transcript, then jump back to the prompt
+        stored = terminal.lines
+        start = time.perf_counter()
+        pages = 0
+        for top in range(stored.first, stored.end, max(1, len(stored) // 50)):
+            terminal.scroll_to(top)
+            root.update_idletasks()
+            pages += 1
+        scroll_us = (time.perf_counter() - start) / pages * 1e6
+        terminal.follow()
+        root.update()
+        lines = int(terminal.text.index("end-1c").split(".")[0])
+        current, _ = tracemalloc.get_traced_memory()
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(f"{(block + 1) * args.block:>9} {len(stored):>7} {lines:>7} {insert_us:>14.1f} {scroll_us:>10.1f} "
+              f"{current // 1024:>9} {rss:>9}")
+    root.destroy()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
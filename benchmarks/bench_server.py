@@ -0,0 +1,149 @@
+"""Load test for --serve: many simulated stations on one server.
+
+Starts an OS13Server in this process (or targets --connect HOST:PORT)
+and drives it with concurrent telnet-style clients, each logging in,
+waiting until every station is connected, then typing a script of
+commands with some think time in between. Reports
+command round-trip latency and the server's memory per session.
+
+    python benchmarks/bench_server.py --sessions 1000 --commands 20
+"""
+import argparse
+import asyncio
+import random
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+
+import _repo  # puts the repo root on sys.path
+from OS13 import OS13Server
+
+# No exit/freedom/clear: every reply should end in exactly one prompt
+COMMANDS = ["ls", "whoami", "date", "pwd", "help", "history", "echo hello",
+            "cat notes.txt", "cat readme", "sudo ls", "rm junk", "meta", "xyzzy"]
+PROMPT = b"~$ \x1b[0m"
+
+
+class Gate:
+    """Holds every station at its first prompt until all of them are in"""
+
+    def __init__(self, count):
+        self.waiting = count
+        self.opened = asyncio.Event()
+
+    def arrive(self):
+        self.waiting -= 1
+        if self.waiting <= 0:
+            self.opened.set()
+
+
+async def station(host, port, name, commands, think, latencies, rng, gate):
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+        await reader.readuntil(b"login: ")
+        writer.write(name.encode() + b"\r\n")
+        await reader.readuntil(PROMPT)
+    finally:
+        # A station that failed to log in must not keep the rest waiting
+        gate.arrive()
+    await gate.opened.wait()
+    loop = asyncio.get_running_loop()
+    for command in commands:
+        await asyncio.sleep(rng.uniform(0, think))
+        # Timed story output may already have redrawn the prompt; skip it
+        while len(reader._buffer):
+            await reader.read(len(reader._buffer))
+        start = loop.time()
+        writer.write(command.encode() + b"\r\n")
+        await reader.readuntil(PROMPT)
+        latencies.append(loop.time() - start)
+    writer.close()
+
+
+async def run(args):
+    server = listener = None
+    if args.connect:
+        host, _, port = args.connect.rpartition(":")
+        port = int(port)
+    else:
+        server = OS13Server(max_sessions=args.sessions)
+        listener = await server.start("127.0.0.1", 0)
+        host, port = listener.sockets[0].getsockname()[:2]
+
+    rng = random.Random(args.seed)
+    latencies = []
+    peak_sessions = 0
+
+    async def watch():
+        nonlocal peak_sessions
+        while True:
+            peak_sessions = max(peak_sessions, len(server.sessions))
+            await asyncio.sleep(0.05)
+
+    watcher = asyncio.ensure_future(watch()) if server else None
+    before = tracemalloc.get_traced_memory()[0] if args.trace_memory else 0
+    start = time.perf_counter()
+    stations = []
+    gate = Gate(args.sessions)
+    for i in range(args.sessions):
+        script = [rng.choice(COMMANDS) for _ in range(args.commands)]
+        client = station(host, port, f"station{i}", script, args.think, latencies, random.Random(rng.random()), gate)
+        stations.append(asyncio.ensure_future(asyncio.wait_for(client, args.timeout)))
+        if args.ramp:
+            await asyncio.sleep(args.ramp / args.sessions)
+    results = await asyncio.gather(*stations, return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] if args.trace_memory else 0
+    failures = [r for r in results if isinstance(r, BaseException)]
+
+    if watcher:
+        watcher.cancel()
+    if listener:
+        listener.close()
+        await listener.wait_closed()
+
+    latencies.sort()
+    print(f"{args.sessions} sessions x {args.commands} commands in {elapsed:.2f}s "
+          f"({len(latencies) / elapsed:.0f} commands/s), {len(failures)} failed")
+    if latencies:
+        p = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000
+        print(f"round trip: median {statistics.median(latencies) * 1000:.2f} ms, "
+              f"p95 {p(0.95):.2f} ms, p99 {p(0.99):.2f} ms, max {latencies[-1] * 1000:.2f} ms")
+    if server:
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024
+        print(f"peak concurrent sessions {peak_sessions}, max rss {rss} MiB")
+    if args.trace_memory:
+        print(f"traced peak {(peak - before) // 1024} KiB, "
+              f"~{(peak - before) // max(1, args.sessions) // 1024} KiB per session (clients included)")
+    if failures:
+        print(f"first failure: {failures[0]!r}")
+    return 1 if failures else 0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--commands", type=int, default=20, help="commands per session")
+    parser.add_argument("--think", type=float, default=0.5, help="max seconds between commands")
+    parser.add_argument("--ramp", type=float, default=1.0, help="seconds over which sessions connect")
+    parser.add_argument("--timeout", type=float, default=60.0, help="give up on a station after this long")
+    parser.add_argument("--connect", metavar="HOST:PORT", help="load an already running --serve")
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--trace-memory", action="store_true", help="tracemalloc (slows everything down)")
+    args = parser.parse_args()
+
+    # Both ends of every connection live in this process when self-hosting
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = args.sessions * 2 + 64
+    if soft < wanted:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(wanted, hard), hard))
+
+    if args.trace_memory:
+        tracemalloc.start()
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
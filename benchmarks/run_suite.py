@@ -0,0 +1,327 @@
+"""Benchmark suite for the hot paths, with results as JSON.
+
+    python benchmarks/run_suite.py --output before.json
+    python benchmarks/run_suite.py --output after.json --compare before.json
+
+Headless benchmarks always run. The Tk ones (keystroke -> autocomplete
+latency, write_line throughput) need a display: without one the suite
+runs itself again under xvfb-run -a when that is installed, and
+otherwise reports both as {"skipped": reason} in the JSON.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import _repo  # puts the repo root on sys.path
+from OS13 import (ContentPack, FingerprintProvider, FuzzyIndex, HeadlessSession, KeystrokeDynamics, OS13Engine,
+                  OS13Terminal)
+
+FINGERPRINT = ("player", "station", "Linux", "/home/player")
+
+# Set in the copy of the suite started under xvfb-run, so it doesn't start another
+UNDER_XVFB = "OS13_BENCH_XVFB"
+
+# One of each handler the registry can pick, plus the fallback
+COMMANDS = ["help", "ls", "whoami", "date", "clear", "cat notes.txt", "echo hello", "history",
+            "exit", "pwd", "rm junk", "sudo ls", "meta", "format c:", "freedom", "xyzzy"]
+
+# No exit/freedom: those end the session
+SESSION_COMMANDS = ["ls", "whoami", "date", "pwd", "help", "history", "echo hello",
+                    "cat notes.txt", "cat readme", "sudo ls", "rm junk", "meta", "xyzzy"]
+
+WORDS = ["ls", "help", "whoami", "cat notes.txt", "history", "sudo rm -rf", "date", "pwd"]
+
+
+class KeyEvent:
+    def __init__(self, char):
+        self.keysym = char
+        self.char = char
+
+
+def summarize(samples_ns):
+    samples = sorted(samples_ns)
+    return {
+        "median_us": round(statistics.median(samples) / 1000, 3),
+        "p95_us": round(samples[int(len(samples) * 0.95) - 1] / 1000, 3),
+        "max_us": round(samples[-1] / 1000, 3),
+        "samples": len(samples),
+    }
+
+
+def bench_execute_command(repeat):
+    """execute_command for every command at every anomaly level"""
+    results = {}
+    for level in range(8):
+        for command in COMMANDS:
+            engine = OS13Engine(*FINGERPRINT, rng=random.Random(level))
+            samples = []
+            for _ in range(repeat):
+                engine.anomaly_level = level
+                engine.meta_unlocked = level >= 5
+                engine.command_count = 4 * level
+                start = time.perf_counter_ns()
+                engine.run(engine.execute_command, command)
+                samples.append(time.perf_counter_ns() - start)
+            results[f"{command}@{level}"] = summarize(samples)
+    return results
+
+
+def bench_suggestions(repeat):
+    """The engine half of autocomplete: suggestion lookup per tier"""
+    engine = OS13Engine(*FINGERPRINT)
+    results = {}
+    for level in (1, 3, 5, 7):
+        engine.anomaly_level = level
+        samples = []
+        for _ in range(repeat):
+            for word in WORDS:
+                for end in range(1, len(word) + 1):
+                    start = time.perf_counter_ns()
+                    engine.get_creepy_suggestions(word[:end])
+                    samples.append(time.perf_counter_ns() - start)
+        results[f"level{level}"] = summarize(samples)
+    return results
+
+
+def bench_session_memory(commands, sample_every):
+    """Traced memory over a long scripted session past both milestones"""
+    rng = random.Random(13)
+    session = HeadlessSession(OS13Engine(*FINGERPRINT, rng=random.Random(13)))
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    samples = []
+    events = 0
+    start = time.perf_counter()
+    for i in range(1, commands + 1):
+        session.submit(rng.choice(SESSION_COMMANDS))
+        session.advance(1000)
+        # The transcript is the harness's, not the engine's: don't count it
+        events += len(session.transcript)
+        session.transcript.clear()
+        if i % sample_every == 0:
+            current, _ = tracemalloc.get_traced_memory()
+            samples.append([i, (current - baseline) // 1024])
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    engine = session.engine
+    return {
+        "commands": commands,
+        "commands_per_s": round(commands / elapsed),
+        "traced_kib": samples,
+        "peak_kib": (peak - baseline) // 1024,
+        "transcript_events": events,
+        "fifth_wall_broken": engine.fifth_wall_broken,
+        "escape_hints": engine.escape_hint_count,
+    }
+
+
+def bench_keystrokes(keys, use_numpy):
+    """KeystrokeDynamics over a long session: cost per key and per batched pass"""
+    analyzer = KeystrokeDynamics()
+    analyzer.loader = True  # pick the backend here, not on a thread
+    if use_numpy:
+        try:
+            import numpy
+        except ImportError:
+            return {"skipped": "numpy is not installed"}
+        analyzer.numpy = numpy
+    rng = random.Random(13)
+    words = [word for command in SESSION_COMMANDS for word in command.split()]
+    key_ns = 0
+    passes = []
+    typed = 0
+    while typed < keys:
+        word = rng.choice(words)
+        for i, char in enumerate(word):
+            latency = rng.lognormvariate(-1.9, 0.3) if i or rng.random() > 0.05 else rng.uniform(1.5, 4.0)
+            start = time.perf_counter_ns()
+            analyzer.key(char, char, latency, True)
+            key_ns += time.perf_counter_ns() - start
+        analyzer.key("space", " ", 0.12, False)
+        due = len(analyzer.latencies) >= analyzer.BATCH
+        start = time.perf_counter_ns()
+        analyzer.word(word)
+        if due:
+            passes.append(time.perf_counter_ns() - start)
+        typed += len(word) + 1
+    return {
+        "keys": analyzer.keystrokes,
+        "ns_per_key": round(key_ns / analyzer.keystrokes),
+        "pass": summarize(passes),
+        "hesitant_words": len(analyzer.hesitant),
+    }
+
+
+def bench_fuzzy(repeat, extra_words):
+    """FuzzyIndex lookups for typos, over the real vocabulary plus extra_words made-up ones"""
+    rng = random.Random(13)
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    filler = {"".join(rng.choice(letters) for _ in range(rng.randint(4, 12))) for _ in range(extra_words)}
+    start = time.perf_counter()
+    index = FuzzyIndex(OS13Engine.commands.vocabulary())
+    index.update(ContentPack.default().vocabulary(), rank=1)
+    index.update(filler, rank=1)
+    build_ms = (time.perf_counter() - start) * 1000
+    
+    words = sorted(index.words)
+    typos = []
+    for _ in range(200):
+        word = list(rng.choice(words))
+        i = rng.randrange(len(word))
+        edit = rng.randrange(3)
+        if edit == 0 and i + 1 < len(word):
+            word[i], word[i + 1] = word[i + 1], word[i]
+        elif edit == 1:
+            word[i] = rng.choice(letters)
+        else:
+            del word[i]
+        typos.append("".join(word))
+    samples = []
+    for _ in range(repeat):
+        for typo in typos:
+            start = time.perf_counter_ns()
+            index.lookup(typo)
+            samples.append(time.perf_counter_ns() - start)
+    return {"words": len(index), "build_ms": round(build_ms, 1), "lookup": summarize(samples)}
+
+
+def open_display():
+    try:
+        import tkinter as tk
+        return tk.Tk()
+    except Exception as e:  # ImportError, or TclError without a display
+        return str(e) or type(e).__name__
+
+
+def new_terminal(root, **kwargs):
+    return OS13Terminal(root, fingerprint=FingerprintProvider(cache=False), **kwargs)
+
+
+def bench_keystroke(root, repeat):
+    """on_key_release -> show_autocomplete, until the popup is drawn"""
+    terminal = new_terminal(root, autocomplete_delay=0)
+    root.update()
+    results = {}
+    for level in (1, 3, 5, 7):
+        terminal.engine.anomaly_level = level
+        samples = []
+        for _ in range(repeat):
+            for word in WORDS:
+                for char in word:
+                    terminal.text.insert("end", char)
+                    start = time.perf_counter_ns()
+                    terminal.on_key_release(KeyEvent(char))
+                    root.update()
+                    samples.append(time.perf_counter_ns() - start)
+                terminal.text.delete(terminal.prompt_index, "end-1c")
+                terminal.cancel_autocomplete()
+        results[f"level{level}"] = summarize(samples)
+    return results
+
+
+def bench_write_line(root, lines):
+    terminal = new_terminal(root)
+    root.update()
+    start = time.perf_counter()
+    for i in range(lines):
+        terminal.write_line("the quick brown fox watches you type", 'ghost' if i % 3 else None)
+    root.update()
+    elapsed = time.perf_counter() - start
+    return {"lines": lines, "lines_per_s": round(lines / elapsed), "us_per_line": round(elapsed / lines * 1e6, 3)}
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def flatten(results, prefix=""):
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from flatten(value, name + ".")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield name, value
+
+
+def compare(current, baseline_path):
+    with open(baseline_path) as f:
+        baseline = dict(flatten(json.load(f)["results"]))
+    print(f"{'metric':<44} {'before':>12} {'after':>12} {'ratio':>7}", file=sys.stderr)
+    for name, value in flatten(current["results"]):
+        before = baseline.get(name)
+        if before:
+            print(f"{name:<44} {before:>12} {value:>12} {value / before:>7.2f}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=50, help="iterations per measured case")
+    parser.add_argument("--commands", type=int, default=5000, help="length of the memory session")
+    parser.add_argument("--keys", type=int, default=100000, help="keystrokes for the keystroke analysis benchmark")
+    parser.add_argument("--lines", type=int, default=20000, help="lines for the write_line benchmark")
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    parser.add_argument("--compare", metavar="BASELINE", help="print ratios against an earlier JSON run")
+    args = parser.parse_args()
+
+    root = open_display()
+    if isinstance(root, str):
+        if shutil.which("xvfb-run") and not os.environ.get(UNDER_XVFB):
+            # No display here: measure everything on a virtual one instead
+            return subprocess.call(["xvfb-run", "-a", sys.executable, os.path.abspath(__file__), *sys.argv[1:]],
+                                   env=dict(os.environ, **{UNDER_XVFB: "1"}))
+        if not os.environ.get(UNDER_XVFB):
+            root += "; xvfb-run is not installed"
+
+    results = {
+        "execute_command": bench_execute_command(args.repeat),
+        "suggestions": bench_suggestions(args.repeat),
+        "session_memory": bench_session_memory(args.commands, max(1, args.commands // 10)),
+        "keystrokes_python": bench_keystrokes(args.keys, use_numpy=False),
+        "keystrokes_numpy": bench_keystrokes(args.keys, use_numpy=True),
+        "fuzzy_commands": bench_fuzzy(args.repeat, 0),
+        "fuzzy_5000": bench_fuzzy(args.repeat, 5000),
+    }
+    if isinstance(root, str):
+        results["keystroke_autocomplete"] = {"skipped": root}
+        results["write_line"] = {"skipped": root}
+    else:
+        results["keystroke_autocomplete"] = bench_keystroke(root, max(1, args.repeat // 10))
+        results["write_line"] = bench_write_line(root, args.lines)
+        root.destroy()
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "display": "xvfb-run" if os.environ.get(UNDER_XVFB) else os.environ.get("DISPLAY"),
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=1)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.compare:
+        compare(report, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""CommandRegistry dispatch against the if/elif chain it replaced"""
+import unittest
+
+from OS13 import COMMANDS, CommandRegistry
+
+# (command as typed, handler the old if/elif chain picked)
+TABLE = [
+    ("freedom", 'cmd_freedom'),
+    ("FREEDOM", 'cmd_freedom'),
+    ("  freedom  ", 'cmd_freedom'),
+    ("freedom now", 'cmd_unknown'),
+    ("meta", 'cmd_meta'),
+    ("who is the programmer", 'cmd_meta'),
+    ("developer", 'cmd_meta'),
+    ("my creator", 'cmd_meta'),
+    ("metadata", 'cmd_meta'),
+    ("cat metadata.txt", 'cmd_meta'),
+    ("echo programmer", 'cmd_meta'),
+    ("sudo meta", 'cmd_meta'),
+    ("rm meta", 'cmd_meta'),
+    ("format meta", 'cmd_meta'),
+    ("help", 'cmd_help'),
+    ("HELP", 'cmd_help'),
+    ("help me", 'cmd_unknown'),
+    ("ls", 'cmd_ls'),
+    ("ls -la", 'cmd_ls'),
+    ("ls documents", 'cmd_ls'),
+    ("lsof", 'cmd_unknown'),
+    ("whoami", 'cmd_whoami'),
+    ("whoami really", 'cmd_unknown'),
+    ("date", 'cmd_date'),
+    ("clear", 'cmd_clear'),
+    ("cat", 'cmd_unknown'),
+    ("cat notes.txt", 'cmd_cat'),
+    ("cat format.txt", 'cmd_cat'),
+    ("cat shutdown", 'cmd_cat'),
+    ("echo hello", 'cmd_echo'),
+    ("echo reboot", 'cmd_echo'),
+    ("echo", 'cmd_unknown'),
+    ("history", 'cmd_history'),
+    ("exit", 'cmd_exit'),
+    ("logout", 'cmd_exit'),
+    ("exit now", 'cmd_unknown'),
+    ("pwd", 'cmd_pwd'),
+    ("rm junk", 'cmd_rm'),
+    ("rm -rf /", 'cmd_rm'),
+    ("del junk", 'cmd_rm'),
+    ("rm", 'cmd_unknown'),
+    ("rm format", 'cmd_rm'),
+    ("sudo ls", 'cmd_sudo'),
+    ("sudo shutdown", 'cmd_sudo'),
+    ("sudo", 'cmd_unknown'),
+    ("format c:", 'cmd_system'),
+    ("shutdown", 'cmd_system'),
+    ("shutdown now", 'cmd_system'),
+    ("please reboot", 'cmd_system'),
+    ("reformat", 'cmd_system'),
+    ("xyzzy", 'cmd_unknown'),
+    ("", 'cmd_unknown'),
+    ("   ", 'cmd_unknown'),
+    ("lss", 'cmd_unknown'),
+]
+
+# grep came after the chain; it searches even for words that run meta
+GREP_TABLE = [
+    ("grep", 'cmd_grep'),
+    ("grep hello", 'cmd_grep'),
+    ("grep programmer", 'cmd_grep'),
+    ("grep metadata", 'cmd_grep'),
+    ("grep format", 'cmd_grep'),
+    ("grepx meta", 'cmd_meta'),
+]
+
+
+class DispatchTest(unittest.TestCase):
+    
+    def check(self, table):
+        for command, handler in table:
+            cmd_lower = command.strip().lower()
+            with self.subTest(command=command):
+                self.assertEqual(COMMANDS.lookup(cmd_lower)[0][0], handler)
+                # And again through the memo cache, cold then warm
+                self.assertEqual(COMMANDS.resolve(cmd_lower)[0][0], handler)
+                self.assertEqual(COMMANDS.resolve(cmd_lower)[0][0], handler)
+    
+    def test_matches_the_old_chain(self):
+        self.check(TABLE)
+    
+    def test_grep(self):
+        self.check(GREP_TABLE)
+    
+    def test_handler_arguments(self):
+        for command, args in [("cat Notes.txt", ("Notes.txt",)), ("echo Hello  World", ("Hello  World",)),
+                              ("rm -rf /", ("rm -rf /",)), ("FORMAT C:", ("format c:",)), ("ls -la", ())]:
+            (handler, kind), head = COMMANDS.resolve(command.lower())
+            with self.subTest(command=command):
+                self.assertEqual(CommandRegistry.ARGS[kind](command, command.lower(), head), args)
+    
+    def test_keyword_priorities(self):
+        registry = CommandRegistry(fallback='unknown')
+        registry.register('low', keywords=('alpha',), priority=10)
+        registry.register('mixed_a', keywords=('beta',), priority=20)
+        registry.register('mixed_b', keywords=('betamax',), priority=20)
+        registry.register('high', keywords=('gamma',), priority=90)
+        registry.register('run', prefix=('run',))
+        registry.register('first', prefix=('first',), priority=0)
+        for command, handler in [("gamma alpha", 'low'), ("run alpha", 'low'), ("run gamma", 'run'),
+                                 ("gamma", 'high'), ("first alpha", 'first'), ("betamax", 'mixed_b'),
+                                 ("beta betamax", 'mixed_a'), ("betamax beta", 'mixed_b'),
+                                 ("run betamax", 'mixed_b'), ("nothing", 'unknown')]:
+            with self.subTest(command=command):
+                self.assertEqual(registry.lookup(command)[0][0], handler)
+
+
+if __name__ == "__main__":
+    unittest.main()
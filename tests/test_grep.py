@@ -0,0 +1,113 @@
+"""The in-game grep over a --transcript log"""
+import os
+import random
+import tempfile
+import threading
+import time
+import unittest
+
+from OS13 import COMMANDS, HeadlessSession, OS13Engine, TranscriptLog
+
+
+class GrepTest(unittest.TestCase):
+    
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.transcript = TranscriptLog(os.path.join(directory.name, "transcript.log"))
+        self.addCleanup(self.transcript.close)
+        engine = OS13Engine("player", "station", "Linux", "/home/player",
+                            rng=random.Random(13), transcript=self.transcript)
+        self.session = HeadlessSession(engine)
+    
+    def output(self):
+        return [text for _, kind, text, _ in self.session.transcript if kind in ('line', 'text')]
+    
+    def test_meta_keywords_are_searched_not_run(self):
+        for query in ("grep programmer", "grep developer", "grep metadata", "grep meta"):
+            self.assertEqual(COMMANDS.resolve(query)[0][0], 'cmd_grep', query)
+    
+    def test_grep_finds_a_line_naming_the_programmer(self):
+        self.session.submit("echo the programmer")
+        self.session.advance(1000)
+        printed = len(self.output())
+        self.transcript.ready.wait(5)
+        self.session.submit("grep programmer")
+        found = self.output()[printed:]
+        self.assertTrue(any(line.endswith("the programmer") for line in found), found)
+        self.assertFalse(self.session.engine.meta_unlocked)
+    
+    def test_grep_answers_later_while_the_log_is_read(self):
+        self.session.submit("echo the programmer")
+        self.session.advance(1000)
+        printed = len(self.output())
+        self.transcript.ready.wait(5)
+        # As if earlier sessions' records were still being read
+        self.transcript.ready = threading.Event()
+        self.session.submit("grep programmer")
+        self.assertEqual(self.output()[printed:], [])
+        self.transcript.ready.set()
+        self.session.advance(100)
+        found = self.output()[printed:]
+        self.assertTrue(any(line.endswith("the programmer") for line in found), found)
+    
+    def test_help_lists_grep_only_with_a_transcript(self):
+        self.session.submit("help")
+        self.assertIn("  grep", self.output())
+        bare = HeadlessSession(OS13Engine("player", "station", "Linux", "/home/player", rng=random.Random(13)))
+        bare.submit("help")
+        self.assertNotIn("  grep", [text for _, _, text, _ in bare.transcript])
+
+
+class TranscriptLogTest(unittest.TestCase):
+    
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "transcript.log")
+        log = TranscriptLog(self.path)
+        rng = random.Random(21)
+        words = ["the", "programmer", "is", "watching", "you", "ls", "notes"]
+        for i in range(3000):
+            log.append(rng.choice((TranscriptLog.COMMAND, TranscriptLog.LINE)),
+                       " ".join(rng.choice(words) for _ in range(rng.randint(1, 5))) + f" n{i}")
+        log.close()
+    
+    def open(self):
+        log = TranscriptLog(self.path)
+        self.addCleanup(log.close)
+        self.assertTrue(log.ready.wait(5))
+        return log
+    
+    def search(self, log, pattern):
+        while True:
+            found = log.search(pattern)
+            if found is not None:
+                return found
+            time.sleep(0.01)
+    
+    def test_index_is_kept_for_the_next_session(self):
+        log = self.open()
+        self.assertEqual(log.saved, log.indexed)
+        self.assertGreater(log.indexed, len(TranscriptLog.MAGIC))
+        self.assertEqual(log.search("n2999")[0][3].split()[-1], "n2999")
+    
+    def test_stale_index_is_rebuilt(self):
+        with open(self.path + ".index", 'wb') as f:
+            f.write(b"not an index")
+        log = self.open()
+        self.assertEqual(log.saved, len(TranscriptLog.MAGIC))
+        self.assertEqual(self.search(log, "n2999")[0][3].split()[-1], "n2999")
+    
+    def test_unindexed_records_are_scanned(self):
+        log = self.open()
+        expected = log.search("programmer watching")
+        self.assertEqual(len(expected), 10)
+        with log.lock:
+            # As if none of it had been indexed yet
+            log.index, log.indexed = {}, len(TranscriptLog.MAGIC)
+        self.assertEqual(self.search(log, "programmer watching"), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+"""The --remember profile keeps its writes through a failing database"""
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+
+from OS13 import PlayerProfile
+
+
+class QuickProfile(PlayerProfile):
+    FLUSH_EVERY = 0.01
+    RETRY_MAX = 0.05
+
+
+class PlayerProfileTest(unittest.TestCase):
+    
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "profile.db")
+    
+    def players(self):
+        with sqlite3.connect(self.path) as connection:
+            return connection.execute("SELECT username, commands, exit_attempts FROM players").fetchall()
+    
+    def test_failed_batch_is_written_on_retry(self):
+        profile = QuickProfile(self.path)
+        found, done = profile.request("player")
+        self.assertTrue(done.wait(5))
+        # Fails until the table exists; the commands queued with it must survive
+        profile.write("INSERT INTO visits VALUES (?)", "player")
+        profile.command("player", "ls", 1)
+        profile.command("player", "pwd", 2)
+        profile.wake.set()
+        while profile.failures == 0:
+            time.sleep(0.01)
+        self.assertEqual(self.players(), [])
+        with sqlite3.connect(self.path) as connection:
+            connection.execute("CREATE TABLE visits (username TEXT)")
+        profile.close()
+        self.assertIsNone(profile.error)
+        self.assertEqual(self.players(), [("player", 2, 0)])
+        with sqlite3.connect(self.path) as connection:
+            self.assertEqual(connection.execute("SELECT * FROM visits").fetchall(), [("player",)])
+    
+    def test_unusable_file_still_answers_lookups(self):
+        os.mkdir(self.path)
+        profile = QuickProfile(self.path)
+        found, done = profile.request("player")
+        self.assertTrue(done.wait(5))
+        self.assertEqual(found, [])
+        profile.command("player", "ls", 1)
+        profile.close()
+        self.assertIsInstance(profile.error, sqlite3.Error)
+    
+    def test_close_reports_writes_it_could_not_make(self):
+        profile = QuickProfile(self.path)
+        profile.write("INSERT INTO visits VALUES (?)", "player")
+        profile.exit_attempt("player")
+        profile.close()
+        self.assertIsInstance(profile.error, sqlite3.OperationalError)
+        self.assertIn(("INSERT INTO visits VALUES (?)", ("player",)), profile.pending)
+    
+    def test_gives_up_after_retries(self):
+        profile = QuickProfile(self.path)
+        profile.write("INSERT INTO visits VALUES (?)", "player")
+        profile.wake.set()
+        while profile.failures < profile.RETRIES:
+            time.sleep(0.01)
+        profile.close()
+        self.assertEqual(len(profile.pending), 0)
+        self.assertIsInstance(profile.error, sqlite3.OperationalError)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+"""Recording a seeded headless session and replaying it"""
+import os
+import struct
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from OS13 import SessionRecorder
+
+OS13 = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "OS13.py")
+
+COMMANDS = ["ls", "whoami", "cat notes.txt", "hlep", "sudo ls", "rm junk", "echo hello", "meta",
+            "history", "date", "pwd", "xyzzy"] * 5
+
+
+def os13(*args, stdin=""):
+    result = subprocess.run([sys.executable, OS13, "--no-cache", *args], input=stdin, capture_output=True,
+                            text=True, encoding='utf-8', timeout=60, check=True)
+    return result.stdout
+
+
+class ReplayTest(unittest.TestCase):
+    
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "session.rec")
+    
+    def record(self, seed=7):
+        return os13("--headless", "--seed", str(seed), "--gap", "2500", "--record", self.path,
+                    stdin="\n".join(COMMANDS) + "\n")
+    
+    def test_replay_prints_the_same_session(self):
+        played = self.record()
+        replayed = os13("--replay", self.path, "--speed", "0", "--gap", "2500")
+        self.assertGreater(len(played.splitlines()), len(COMMANDS) * 2)
+        self.assertEqual(replayed, played)
+    
+    def test_log_format(self):
+        self.record(seed=1234)
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        self.assertEqual(data[:8], b'OS13REC\x02')
+        self.assertEqual(struct.unpack_from('<Q', data, 8), (1234,))
+        kind, delta, size = struct.unpack_from('<cIH', data, 16)
+        self.assertEqual((kind, delta), (SessionRecorder.BOOT, 0))
+        
+        seed, records = SessionRecorder.read(self.path)
+        self.assertEqual(seed, 1234)
+        self.assertEqual(records[0][1], SessionRecorder.BOOT)
+        self.assertEqual(len(records[0][2]), 6)
+        commands = [fields[0] for _, kind, fields in records if kind == SessionRecorder.COMMAND]
+        self.assertEqual(commands, COMMANDS)
+        times = [ms for ms, _, _ in records]
+        self.assertEqual(times, sorted(times))
+        self.assertTrue(any(kind == SessionRecorder.TIMELINE for _, kind, _ in records))
+        
+        # A torn last record is dropped, not misread
+        with open(self.path, 'ab') as f:
+            f.write(struct.pack('<cIH', SessionRecorder.COMMAND, 5, 100) + b"ls")
+        self.assertEqual(SessionRecorder.read(self.path)[1], records)
+    
+    def test_rejects_other_files(self):
+        with open(self.path, 'wb') as f:
+            f.write(b"OS13REC\x01" + bytes(8))
+        with self.assertRaises(ValueError):
+            SessionRecorder.read(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
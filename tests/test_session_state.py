@@ -0,0 +1,118 @@
+"""SessionState snapshot/restore: round trip, damaged data and speed"""
+import marshal
+import os
+import random
+import tempfile
+import time
+import unittest
+
+from OS13 import HeadlessSession, OS13Engine, SessionState
+
+COMMANDS = ["ls", "whoami", "cat notes.txt", "hlep", "sudo ls", "echo hi", "meta", "history", "pwd"]
+
+
+def played(commands=60, history_limit=1000):
+    """An engine some way into the story, with typing statistics"""
+    engine = OS13Engine("player", "station", "Linux", "/home/player", history_limit=history_limit,
+                        rng=random.Random(5))
+    session = HeadlessSession(engine)
+    rng = random.Random(5)
+    for i in range(commands):
+        command = rng.choice(COMMANDS)
+        for char in command:
+            session.render(engine.run(engine.track_typing, char, char, i + rng.random()))
+        session.submit(command)
+        session.advance(2500)
+    return engine
+
+
+def fields(state):
+    """Everything snapshot() is meant to keep, as plain values"""
+    speed = state.typing_speed
+    return ([getattr(state, name) for name in SessionState.SCALARS],
+            list(state.command_history.entries), dict(state.command_history.counts), state.command_history.total,
+            (speed.head, speed.count, speed.total, speed.sum, speed.sum_sq,
+             list(speed.samples), list(speed.sample_buckets), list(speed.histogram), speed.mean),
+            dict(state.common_typos), list(state.hesitation_points))
+
+
+class SessionStateTest(unittest.TestCase):
+    
+    def test_round_trip(self):
+        engine = played()
+        self.assertGreater(engine.anomaly_level, 0)
+        restored = SessionState.restore(engine.snapshot())
+        self.assertEqual(fields(restored), fields(engine.state))
+        self.assertEqual(restored.snapshot(), engine.snapshot())
+    
+    def test_fresh_state_round_trips(self):
+        state = SessionState("player")
+        self.assertEqual(fields(SessionState.restore(state.snapshot())), fields(state))
+    
+    def test_resumed_engine_carries_on(self):
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint = os.path.join(directory, "checkpoint")
+            engine = OS13Engine("player", "station", "Linux", "/home/player", rng=random.Random(5),
+                                checkpoint=checkpoint)
+            session = HeadlessSession(engine)
+            for command in COMMANDS * 2:
+                session.submit(command)
+                session.advance(2500)
+            resumed = OS13Engine("player", "station", "Linux", "/home/player", checkpoint=checkpoint)
+            HeadlessSession(resumed)
+            self.assertEqual(resumed.command_count, len(COMMANDS) * 2)
+            self.assertEqual(resumed.anomaly_level, engine.anomaly_level)
+            self.assertEqual(list(resumed.command_history.entries), list(engine.command_history.entries))
+    
+    def test_rejects_damaged_snapshots(self):
+        good = played(commands=10).snapshot()
+        header = SessionState.HEADER.pack(SessionState.MAGIC, SessionState.FORMAT)
+        scalars, *rest = marshal.loads(good[len(header):])
+        damaged = {
+            'empty': b"",
+            'short header': good[:5],
+            'other magic': b"OS13XX" + good[6:],
+            'other version': SessionState.HEADER.pack(SessionState.MAGIC, SessionState.FORMAT + 1) + good[8:],
+            'truncated': good[:len(good) // 2],
+            'not a tuple': header + marshal.dumps(None),
+            'too few fields': header + marshal.dumps((scalars,)),
+            'missing scalar': header + marshal.dumps((scalars[:-1], *rest)),
+            'wrong scalar type': header + marshal.dumps((("x",) + scalars[1:], *rest)),
+            'scalars not a tuple': header + marshal.dumps((5, *rest)),
+            'history not a list': header + marshal.dumps((scalars, 5, *rest[1:])),
+            'counts not a dict': header + marshal.dumps((scalars, rest[0], 5, *rest[2:])),
+            'short typing window': header + marshal.dumps((scalars, *rest[:3], rest[3][:-1], *rest[4:])),
+            'wrong window size': header + marshal.dumps((scalars, *rest[:3], rest[3][:-1] + (b"\0",), *rest[4:])),
+        }
+        for name, data in damaged.items():
+            with self.subTest(name), self.assertRaises(ValueError):
+                SessionState.restore(data)
+    
+    def test_damaged_checkpoint_starts_fresh(self):
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint = os.path.join(directory, "checkpoint")
+            with open(checkpoint, 'wb') as f:
+                f.write(SessionState.HEADER.pack(SessionState.MAGIC, SessionState.FORMAT) + marshal.dumps((1, 2)))
+            engine = OS13Engine("player", "station", "Linux", "/home/player", checkpoint=checkpoint)
+            HeadlessSession(engine)
+            self.assertEqual(engine.command_count, 0)
+    
+    def test_under_a_millisecond(self):
+        engine = played(commands=1000)
+        state = engine.state
+        data = state.snapshot()
+        rounds = 200
+        start = time.perf_counter()
+        for _ in range(rounds):
+            state.snapshot()
+        snapshot = (time.perf_counter() - start) / rounds
+        start = time.perf_counter()
+        for _ in range(rounds):
+            SessionState.restore(data)
+        restore = (time.perf_counter() - start) / rounds
+        self.assertLess(snapshot, 0.001)
+        self.assertLess(restore, 0.001)
+
+
+if __name__ == "__main__":
+    unittest.main()
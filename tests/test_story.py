@@ -0,0 +1,72 @@
+"""Scripted sessions through the story's milestones, with no display"""
+import random
+import unittest
+
+from OS13 import HeadlessSession, OS13Engine
+
+
+class StoryTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.engine = OS13Engine("player", "station", "Linux", "/home/player", rng=random.Random(13))
+        self.session = HeadlessSession(self.engine)
+    
+    def play(self, *commands, gap=2500):
+        """Type commands gap ms apart; everything printed meanwhile"""
+        start = len(self.session.transcript)
+        for command in commands:
+            self.session.submit(command)
+            self.session.advance(gap)
+        return [text for _, kind, text, _ in self.session.transcript[start:] if kind in ('line', 'text')]
+    
+    def test_fifth_wall_breaks_at_command_30(self):
+        self.play(*["ls"] * 29)
+        self.assertFalse(self.engine.fifth_wall_broken)
+        output = self.play("ls", gap=10000)
+        self.assertTrue(self.engine.fifth_wall_broken)
+        self.assertIn("Something just occurred to me.", output)
+        self.assertIn("Someone MADE this.", output)
+        # Once only
+        self.assertNotIn("Someone MADE this.", self.play(*["ls"] * 5))
+    
+    def test_escape_hints_unlock_at_command_50(self):
+        self.play(*["ls"] * 48)
+        output = self.play("freedom")
+        self.assertIn("freedom: command not found", output)
+        self.assertFalse(self.engine.escape_unlocked)
+        output = self.play("ls", gap=10000)
+        self.assertEqual(self.engine.command_count, 50)
+        self.assertTrue(self.engine.escape_unlocked)
+        self.assertIn("Something changed.", output)
+        self.assertIn("A way out appeared.", output)
+    
+    def test_escape_questions_lead_out(self):
+        self.play(*["ls"] * 50, gap=10000)
+        output = self.play("freedom", gap=4000)
+        self.assertIn("Escape protocol initiated...", output)
+        self.assertIn("Please answer security questions:", output)
+        self.assertEqual(self.engine.escape_stage, 1)
+        
+        self.assertIn("2. Did you notice any other way to escape?", self.play("tired"))
+        self.assertIn("3. Thank you for choosing VibhavCorp", self.play("no"))
+        output = self.play("yes", gap=7000)
+        self.assertIn("[████████████████████] 100%", output)
+        self.assertIn("Escape granted.", output)
+        self.assertIn("Goodbye, tired.", output)
+        self.assertEqual((self.engine.escape_answer_1, self.engine.escape_answer_2, self.engine.escape_answer_3),
+                         ("tired", "no", "yes"))
+        self.session.advance(3000)
+        self.assertTrue(self.session.closed)
+    
+    def test_same_seed_same_session(self):
+        other = HeadlessSession(OS13Engine("player", "station", "Linux", "/home/player", rng=random.Random(13)))
+        script = ["ls", "whoami", "cat notes.txt", "sudo ls", "meta", "xyzzy", "history"] * 6
+        self.play(*script)
+        for command in script:
+            other.submit(command)
+            other.advance(2500)
+        self.assertEqual([entry[1:] for entry in other.transcript], [entry[1:] for entry in self.session.transcript])
+
+
+if __name__ == "__main__":
+    unittest.main()